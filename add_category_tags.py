@@ -1,6 +1,8 @@
 import json
 import re
 
+from catalog import VideoCatalog, use_catalog
+
 def extract_categories_from_title(title):
     """Extract potential categories from video title"""
     # Common category keywords
@@ -83,8 +85,38 @@ def extract_categories_from_title(title):
     
     return found_categories
 
+def add_category_tags_to_catalog():
+    """Add category tags in the SQLite catalog, rewriting only rows whose tags changed"""
+    with VideoCatalog() as catalog:
+        changed = []
+        category_count = {}
+        for i, video in enumerate(catalog.iter_videos()):
+            categories = extract_categories_from_title(video.get('title', ''))
+            if video.get('categories') != categories:
+                video['categories'] = categories
+                changed.append(video)
+            for category in categories:
+                category_count[category] = category_count.get(category, 0) + 1
+            
+            # Show progress
+            if (i + 1) % 5000 == 0:
+                print(f"Processed {i + 1} videos...")
+        
+        catalog.upsert_many(changed)
+        print(f"Successfully updated {len(changed)} of {catalog.count()} videos with category tags!")
+    
+    return category_count
+
 def add_category_tags_to_videos():
     """Add category tags to all videos in videos.json"""
+    if use_catalog():
+        category_count = add_category_tags_to_catalog()
+        sorted_categories = sorted(category_count.items(), key=lambda x: x[1], reverse=True)
+        print("\nTop 20 categories:")
+        for category, count in sorted_categories[:20]:
+            print(f"  {category}: {count} videos")
+        return
+    
     try:
         # Read the videos file
         with open('videos.json', 'r', encoding='utf-8') as f:
@@ -4,15 +4,18 @@ Additional Scraper for WHentai - Focuses on specific categories to add more vide
 This scraper targets specific categories to maximize video count
 """
 
-import requests
-from bs4 import BeautifulSoup
 import json
 import os
-import time
-import random
 import re
 from urllib.parse import urljoin, urlparse
-from datetime import datetime
+
+import cassette
+import html_parser
+from crawl_engine import CrawlEngine
+from crawl_frontier import CrawlFrontier
+from listing_parser import parse_listing_cards
+from page_cache import PageCache
+from out_token import external_url_from_detail_url
 
 # === CONFIG ===
 BASE = "https://www.cartoonpornvideos.com"
@@ -45,15 +48,12 @@ HEADERS = {
     "User-Agent": "Mozilla/5.0 (compatible; WHentaiAdditionalScraper/1.0; +https://yourdomain.example/)",
     "Accept-Language": "en-US,en;q=0.9"
 }
-REQUEST_DELAY = (1.0, 2.0)  # Slightly longer delay to be respectful
 TIMEOUT = 20  # Increased timeout
 MAX_ITEMS_PER_CATEGORY = 2000  # Items per category
 MAX_PAGES_PER_CATEGORY = 25    # Pages per category
+PER_HOST_CONCURRENCY = 4  # requests in flight at once (rate: rate_limiter.py)
 
 # === Helpers ===
-def quiet_sleep():
-    time.sleep(random.uniform(*REQUEST_DELAY))
-
 def is_external_link(href):
     if not href:
         return False
@@ -68,134 +68,11 @@ def make_absolute(href, base=BASE):
     return urljoin(base, href)
 
 # === Core scraping using requests + BS4 ===
-def fetch_html(url):
-    resp = requests.get(url, headers=HEADERS, timeout=TIMEOUT)
-    resp.raise_for_status()
-    return resp.text
-
 def parse_category_page(html):
     """
     Parse category pages and return a list of items with metadata
     """
-    soup = BeautifulSoup(html, "html.parser")
-    items = []
-
-    # Find video items using multiple selectors
-    selectors = [
-        ".video-item", ".item", ".thumb", ".video", ".video-block", 
-        ".video-thumb", ".thumb-block", ".item-col"
-    ]
-    
-    video_items = []
-    for selector in selectors:
-        items_found = soup.select(selector)
-        if items_found:
-            video_items.extend(items_found)
-        if len(video_items) > 50:  # Stop if we found enough items
-            break
-    
-    # If no specific video items found, try a more general approach
-    if not video_items:
-        anchors = soup.select("a[href*='/video/']")  # Look for video links specifically
-    else:
-        anchors = []
-        for item in video_items:
-            # Find anchor tags within video items
-            anchor = item.find("a")
-            if anchor and anchor.get('href'):
-                anchors.append(anchor)
-            # Also look for direct video links
-            video_links = item.select("a[href*='/video/']")
-            anchors.extend(video_links)
-
-    seen = set()
-    for a in anchors:
-        href = a.get('href')
-        if not href:
-            continue
-            
-        img = a.find("img")
-        if not img:
-            # Try to find image in parent elements
-            img = a.find_parent().find("img") if a.find_parent() else None
-            
-        # Title heuristics
-        title = ""
-        # Try alt attribute from img
-        if img:
-            title = img.get('alt', '')
-        
-        # Try title attribute from anchor
-        if not title:
-            title = a.get('title', '')
-            
-        # Try text content
-        if not title:
-            title = a.get_text().strip()
-            
-        # Try parent container header text
-        if not title:
-            header = a.find_previous(["h3", "h2", "h4"])
-            if header:
-                title = header.get_text().strip()
-                
-        if not title:
-            continue
-            
-        detail_url = make_absolute(href)
-        thumbnail = ""
-        
-        # Get thumbnail
-        if img:
-            thumbnail = img.get('src', '') or img.get('data-src', '')
-        thumbnail = make_absolute(thumbnail, base=detail_url)
-        
-        title_str = str(title) if title else ""
-        key = (title_str.strip(), detail_url)
-        if key in seen:
-            continue
-        seen.add(key)
-        
-        # Extract metadata
-        duration = ""
-        views = ""
-        upload_date = ""
-        
-        # Look for duration
-        duration_elem = a.find_next(class_=re.compile(r'duration|time', re.I)) or a.find_parent().find(class_=re.compile(r'duration|time', re.I))
-        if duration_elem:
-            duration_text = duration_elem.get_text().strip()
-            duration_match = re.search(r'(\d+:\d+|\d+\s*(?:min|minutes?))', duration_text)
-            if duration_match:
-                duration = duration_match.group(1)
-        
-        # Look for views
-        views_elem = a.find_next(class_=re.compile(r'views?|watched', re.I)) or a.find_parent().find(class_=re.compile(r'views?|watched', re.I))
-        if views_elem:
-            views_text = views_elem.get_text().strip()
-            views_match = re.search(r'([\d.,]+[KM]?)', views_text)
-            if views_match:
-                views = views_match.group(1)
-        
-        # Look for date
-        date_elem = a.find_next(class_=re.compile(r'date|timeago|uploaded', re.I)) or a.find_parent().find(class_=re.compile(r'date|timeago|uploaded', re.I))
-        if date_elem:
-            upload_date = date_elem.get_text().strip()
-        
-        items.append({
-            "title": title_str.strip(),
-            "thumbnail": thumbnail,
-            "detail_url": detail_url,
-            "duration": duration,
-            "views": views,
-            "upload_date": upload_date,
-            "scraped_at": datetime.now().isoformat()
-        })
-        
-        if len(items) >= MAX_ITEMS_PER_CATEGORY:
-            break
-
-    return items
+    return parse_listing_cards(html, MAX_ITEMS_PER_CATEGORY, timestamp=True)
 
 def find_category_pagination_links(soup):
     """
@@ -224,14 +101,14 @@ def extract_external_from_detail(detail_html, detail_url):
     """
     Extract external URL from detail page
     """
-    soup = BeautifulSoup(detail_html, "html.parser")
+    doc = html_parser.parse(detail_html)
     
     # Check for meta refresh redirect
-    meta_refresh = soup.find("meta", attrs={"http-equiv": "refresh"})
-    if meta_refresh:
-        content = meta_refresh.get('content', '')
+    meta_refresh = doc.css_first('meta[http-equiv="refresh"]')
+    if meta_refresh is not None:
+        content = meta_refresh.attributes.get('content') or ""
         if content:
-            url_match = re.search(r'url=([^;]+)', str(content), re.IGNORECASE)
+            url_match = re.search(r'url=([^;]+)', content, re.IGNORECASE)
             if url_match:
                 redirect_url = url_match.group(1).strip()
                 absolute_redirect = make_absolute(redirect_url, base=detail_url)
@@ -240,8 +117,9 @@ def extract_external_from_detail(detail_html, detail_url):
     
     # Collect candidate anchors
     candidates = []
-    for a in soup.find_all("a", href=True):
-        href = str(a.get('href', '')).strip()
+    for a in doc.css("a[href]"):
+        attributes = a.attributes
+        href = (attributes.get('href') or "").strip()
         if not href:
             continue
             
@@ -249,14 +127,14 @@ def extract_external_from_detail(detail_html, detail_url):
         if is_external_link(absolute):
             score = 0
             # Score based on attributes
-            if a.get('target', '') == "_blank":
+            if attributes.get('target') == "_blank":
                 score += 3
-            if "nofollow" in a.get('rel', []):
+            if "nofollow" in (attributes.get('rel') or "").split():
                 score += 2
-            cls = " ".join(a.get('class', []))
+            cls = attributes.get('class') or ""
             if any(keyword in cls.lower() for keyword in ["external", "download", "host", "watch"]):
                 score += 3
-            text = a.get_text().lower()
+            text = a.text().lower()
             if any(keyword in text for keyword in ["watch", "video", "open", "play", "download", "continue", "click", "link"]):
                 score += 2
             candidates.append((score, absolute, text))
@@ -272,52 +150,101 @@ def extract_external_from_detail(detail_html, detail_url):
         
     return ""
 
-def scrape_category(category_path):
+def find_category_pagination_urls(html):
+    """Pagination links of a category page, for the crawl engine"""
+    return find_category_pagination_links(html_parser.make_soup(html))
+
+def resolve_external_urls(items, engine):
+    """
+    Fill in external_url for new items.
+
+    The /out/?l= tokens are decoded offline first; only the detail pages whose
+    token could not be decoded are fetched, concurrently through the engine.
+    """
+    pending = []
+    for item in items:
+        if not item.get("external_url"):
+            item["external_url"] = external_url_from_detail_url(item["detail_url"])
+            if not item["external_url"]:
+                pending.append(item)
+    if not pending:
+        return
+    print(f"Fetching {len(pending)} detail pages that could not be decoded offline")
+    pages = engine.fetch_all([item["detail_url"] for item in pending])
+    for item in pending:
+        detail_html = pages.get(item["detail_url"])
+        try:
+            item["external_url"] = extract_external_from_detail(detail_html, item["detail_url"]) if detail_html else ""
+        except Exception as e:
+            print(f"Could not extract external URL for {item['detail_url']}: {e}")
+            item["external_url"] = ""
+
+def scrape_categories(category_paths, engine, max_pages=MAX_PAGES_PER_CATEGORY):
     """
-    Scrape a specific category
+    Scrape several categories concurrently
+
+    Args:
+        category_paths (list): Category paths to crawl
+        engine (CrawlEngine): Engine that fetches the pages
+        max_pages (int): Pages per category
+
+    Returns:
+        dict: category path -> items found (at most MAX_ITEMS_PER_CATEGORY each)
+    """
+    start_urls = [BASE + category_path for category_path in category_paths]
+    results = engine.crawl(start_urls, parse_category_page, max_pages,
+                           find_links=find_category_pagination_urls)
+    return {
+        category_path: results[BASE + category_path][:MAX_ITEMS_PER_CATEGORY]
+        for category_path in category_paths
+    }
+
+def scrape(is_known=None, max_pages=MAX_PAGES_PER_CATEGORY, limit=None, frontier=None):
+    """
+    Crawl every category and return the videos that are new, with their
+    external URLs resolved. Nothing is saved.
+
+    Args:
+        is_known (callable): is_known(video) -> True for videos already stored
+        max_pages (int): Pages per category
+        limit (int): Stop after the category that brings the new videos to
+            this many (None for no limit)
+        frontier (CrawlFrontier): Resume state of an interrupted run; the
+            caller finishes it once the videos are saved
     """
-    print(f"Scraping category: {category_path}")
-    all_items = []
+    # Fetch all categories and their pagination pages concurrently, resuming an interrupted run
+    # and revalidating unchanged pages against the page cache
+    page_cache = PageCache()
+    engine = CrawlEngine(per_host=PER_HOST_CONCURRENCY, headers=HEADERS, timeout=TIMEOUT,
+                         frontier=frontier, cache=page_cache)
+    results = scrape_categories(SPECIFIC_CATEGORIES, engine, max_pages)
+    page_cache.close()
     
-    try:
-        # Fetch the first page
-        start_url = BASE + category_path
-        print(f"Fetching {start_url}")
-        html = fetch_html(start_url)
-        soup = BeautifulSoup(html, "html.parser")
+    # Process each category
+    new_videos = []
+    seen = set()
+    for category_path, items in results.items():
+        print(f"\n=== Category {category_path}: {len(items)} items found ===")
         
-        # Parse videos from the first page
-        items = parse_category_page(html)
-        print(f"Found {len(items)} videos on the first page")
-        all_items.extend(items)
+        # Add new items, avoiding duplicates
+        new_items = 0
+        for item in items:
+            detail_url = item.get("detail_url")
+            if detail_url and detail_url not in seen and not (is_known and is_known(item)):
+                new_videos.append(item)
+                seen.add(detail_url)
+                new_items += 1
         
-        # Find pagination links
-        pagination_links = find_category_pagination_links(soup)
-        print(f"Found {len(pagination_links)} pagination links")
+        print(f"Added {new_items} new videos from category {category_path}")
         
-        # Process additional pages
-        for page_url in pagination_links[:MAX_PAGES_PER_CATEGORY-1]:
-            if len(all_items) >= MAX_ITEMS_PER_CATEGORY:
-                break
-                
-            print(f"Fetching {page_url}")
-            try:
-                html = fetch_html(page_url)
-                items = parse_category_page(html)
-                print(f"Found {len(items)} videos on {page_url}")
-                all_items.extend(items)
-                
-                # Add delay between requests
-                quiet_sleep()
-                
-            except Exception as e:
-                print(f"Could not fetch {page_url}: {e}")
-                continue
-                
-    except Exception as e:
-        print(f"Error scraping category {category_path}: {e}")
+        # Check if we've reached a reasonable limit
+        if limit is not None and len(new_videos) >= limit:
+            print("Reached maximum video limit, stopping...")
+            break
     
-    return all_items
+    # Try to extract external URLs that are not already present
+    resolve_external_urls(new_videos, engine)
+    return new_videos
 
 def main():
     print(f"Starting additional scraping from {len(SPECIFIC_CATEGORIES)} categories...")
@@ -336,51 +263,21 @@ def main():
     # Track processed URLs to avoid duplicates
     processed_urls = {video.get("detail_url") for video in all_videos if video.get("detail_url")}
     
-    # Process each category
-    for category_path in SPECIFIC_CATEGORIES:
-        print(f"\n=== Scraping category {category_path} ===")
-        
-        items = scrape_category(category_path)
-        print(f"Total items found in category: {len(items)}")
-        
-        # Add new items, avoiding duplicates
-        new_items = 0
-        for item in items:
-            detail_url = item.get("detail_url")
-            if detail_url and detail_url not in processed_urls:
-                # Try to extract external URL if not already present
-                if not item.get("external_url"):
-                    try:
-                        print(f"Fetching detail page: {detail_url}")
-                        detail_html = fetch_html(detail_url)
-                        external_url = extract_external_from_detail(detail_html, detail_url)
-                        item["external_url"] = external_url
-                        print(f"Extracted external URL: {external_url}")
-                    except Exception as e:
-                        print(f"Could not fetch detail page for {detail_url}: {e}")
-                        item["external_url"] = ""
-                
-                all_videos.append(item)
-                processed_urls.add(detail_url)
-                new_items += 1
-                
-                # Add delay between requests
-                quiet_sleep()
-        
-        print(f"Added {new_items} new videos from category {category_path}")
-        
-        # Check if we've reached a reasonable limit
-        if len(all_videos) >= len(SPECIFIC_CATEGORIES) * MAX_ITEMS_PER_CATEGORY:
-            print("Reached maximum video limit, stopping...")
-            break
+    frontier = CrawlFrontier("additional")
+    room = max(0, len(SPECIFIC_CATEGORIES) * MAX_ITEMS_PER_CATEGORY - len(all_videos))
+    all_videos.extend(scrape(lambda video: video["detail_url"] in processed_urls,
+                             limit=room, frontier=frontier))
     
     # Save all videos to JSON file
     print(f"\nSaving {len(all_videos)} videos to {OUT_FILE}")
     with open(OUT_FILE, "w", encoding="utf-8") as f:
         json.dump(all_videos, f, ensure_ascii=False, indent=2)
+    frontier.finish()
+    frontier.close()
     
     print("Additional scraping completed!")
     print(f"Total videos in file: {len(all_videos)}")
 
 if __name__ == "__main__":
+    cassette.prepare_run()
     main()
\ No newline at end of file
@@ -3,23 +3,15 @@
 Script to analyze thumbnail issues in detail
 """
 
-import json
 import re
 from urllib.parse import urlparse
 
+from video_record import load_compact_videos
+
 def load_videos(file_path):
-    """Load videos from JSON file"""
+    """Load videos from JSON file as compact Video records"""
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read().strip()
-            
-        # Fix any issues with the JSON format
-        if content.endswith(','):
-            content = content[:-1] + ']'
-            
-        # Parse the JSON
-        data = json.loads(content)
-        return data
+        return load_compact_videos(file_path)
     except Exception as e:
         print(f"Error loading videos from {file_path}: {e}")
         return []
@@ -5,8 +5,21 @@ import os
 import sys
 from datetime import datetime
 
+from video_record import load_compact_videos
+
 app = Flask(__name__)
 
+# Compact Video records, reloaded only when videos.json changes on disk
+_videos_cache = {'mtime': None, 'videos': []}
+
+def load_videos():
+    """Return the cached list of Video records, reloading videos.json if it changed"""
+    mtime = os.path.getmtime('videos.json')
+    if _videos_cache['mtime'] != mtime:
+        _videos_cache['videos'] = load_compact_videos('videos.json')
+        _videos_cache['mtime'] = mtime
+    return _videos_cache['videos']
+
 # Simple route to serve static files
 @app.route('/')
 def index():
@@ -20,9 +33,8 @@ def static_files(filename):
 @app.route('/api/videos')
 def api_videos():
     try:
-        with open('videos.json', 'r', encoding='utf-8') as f:
-            videos = json.load(f)
-        return jsonify(videos)
+        videos = load_videos()
+        return jsonify([video.to_dict() for video in videos])
     except FileNotFoundError:
         return jsonify([])
 
@@ -35,8 +47,7 @@ def scrape():
         if result.returncode == 0:
             # Reload videos after scraping
             try:
-                with open('videos.json', 'r', encoding='utf-8') as f:
-                    videos = json.load(f)
+                videos = load_videos()
                 return jsonify({
                     'success': True, 
                     'message': 'Scraping completed successfully',
@@ -82,8 +93,7 @@ def scraping_status():
 @app.route('/api/stats')
 def video_stats():
     try:
-        with open('videos.json', 'r', encoding='utf-8') as f:
-            videos = json.load(f)
+        videos = load_videos()
         
         # Calculate statistics
         total_videos = len(videos)
@@ -103,8 +113,8 @@ def video_stats():
         # Get category statistics
         category_count = {}
         for video in videos:
-            if 'categories' in video and isinstance(video['categories'], list):
-                for category in video['categories']:
+            if 'categories' in video:
+                for category in video.categories or ():
                     if category:  # Only count non-empty categories
                         category_count[category] = category_count.get(category, 0) + 1
         
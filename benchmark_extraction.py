@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Extraction benchmark: the old per-scraper card parsing vs extraction_spec.py
+
+Two of the old hand-written card parsers are kept here for reference:
+
+  - mega's get_video_data_from_page: find() chains wrapped in
+    getattr/try/except per field
+  - additional's parse_category_page: per-anchor find_next() lookups for
+    duration, views and date, which scan the rest of the document every time
+
+Both are timed against the compiled VIDEO_CARDS extractor on the bundled
+sample_page.html and on synthetic listing pages of growing size, on every
+installed html_parser backend. mega's records must be identical; for the
+category parser the titles, links and thumbnails must be (the old
+find_next() lookups could pick up another card's metadata).
+
+On the default html.parser backend the spec matches the card fields in one
+walk over each card's tags, without soupsieve or node wrappers, and works
+out the selectors a tag matches once per distinct tag: on sample_page.html
+it extracts the cards of a parsed page 1.9-2.5x faster than the old find()
+chains. Building the html.parser tree is the same for both and takes most of
+the time, so a whole page parses only 1.0-1.2x faster; lxml gives about 1.4x
+and selectolax 11-17x. The benchmark prints both figures. On every backend it
+also removes the find_next() cost that grows with the page: ~0.3 ms/card
+instead of up to 7 ms/card at 800 cards.
+
+    python benchmark_extraction.py [max_cards]
+"""
+
+import re
+import sys
+import time
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup
+
+import html_parser
+from extraction_spec import BASE, VIDEO_CARDS
+from listing_parser import video_items
+from mega_scraper import parse_video_cards
+
+SAMPLE_PAGE = "sample_page.html"
+DEFAULT_MAX_CARDS = 800
+REPEATS = 5  # runs per timing, the best one counts
+IDENTITY_FIELDS = ("title", "detail_url", "thumbnail")
+
+
+def legacy_mega(html):
+    """mega_scraper's original per-field find() chains (html.parser)"""
+    return legacy_mega_cards(BeautifulSoup(html, "html.parser"))
+
+
+def legacy_mega_cards(soup):
+    """The find() chains of legacy_mega on an already parsed page"""
+    videos = []
+    for item in soup.find_all('div', class_='card sub group'):
+        title = "Untitled"
+        try:
+            title_elem = item.find('a', {'class': 'item-title item-link rate-link font-medium'})
+            if title_elem:
+                title = title_elem.get_text(strip=True)
+        except Exception:
+            pass
+        thumbnail = ""
+        try:
+            thumb_elem = item.find('img', {'class': 'item-image'})
+            if thumb_elem and thumb_elem.get('src'):
+                thumbnail = thumb_elem.get('src')
+        except Exception:
+            pass
+        detail_url = ""
+        try:
+            link_elem = item.find('a', {'class': 'item-title item-link rate-link font-medium'})
+            if link_elem and link_elem.get('href'):
+                detail_url = link_elem.get('href')
+        except Exception:
+            pass
+        categories = []
+        try:
+            for cat in item.find_all('a', {'class': 'item-source block text-xsm'}):
+                cat_text = cat.get_text(strip=True)
+                if cat_text and cat_text not in categories:
+                    categories.append(cat_text)
+        except Exception:
+            pass
+        if title and thumbnail and detail_url:
+            videos.append({"title": title, "thumbnail": thumbnail, "detail_url": detail_url,
+                           "external_url": "", "categories": categories})
+    return videos
+
+
+def legacy_category_page(html):
+    """additional_scraper's original parse_category_page, find_next() per anchor (html.parser)"""
+    soup = BeautifulSoup(html, "html.parser")
+    cards = []
+    for selector in (".video-item", ".item", ".thumb", ".video", ".video-block",
+                     ".video-thumb", ".thumb-block", ".item-col"):
+        cards.extend(soup.select(selector))
+        if len(cards) > 50:
+            break
+    anchors = [card.find("a") for card in cards if card.find("a")] if cards else soup.select("a[href]")
+    items = []
+    seen = set()
+    for a in anchors:
+        href = a.get('href')
+        img = a.find("img") or (a.find_parent().find("img") if a.find_parent() else None)
+        title = (img.get('alt', '') if img else '') or a.get('title', '') or a.get_text().strip()
+        if not href or not img or not title:
+            continue
+        detail_url = urljoin(BASE, href)
+        key = (title.strip(), detail_url)
+        if key in seen:
+            continue
+        seen.add(key)
+        item = {"title": key[0], "detail_url": detail_url,
+                "thumbnail": urljoin(detail_url, img.get('src', '') or img.get('data-src', ''))}
+        for field, classes in (("duration", r'duration|time'), ("views", r'views?|watched'),
+                               ("upload_date", r'date|timeago|uploaded')):
+            elem = a.find_next(class_=re.compile(classes, re.I))
+            item[field] = elem.get_text().strip() if elem else ""
+        items.append(item)
+    return items
+
+
+def spec_cards(doc):
+    """VIDEO_CARDS on an already parsed page"""
+    return [VIDEO_CARDS.record(card) for card in VIDEO_CARDS.cards(doc)]
+
+
+def spec_category_page(html):
+    return video_items(VIDEO_CARDS.extract(html))
+
+
+def identity(items):
+    return [tuple(item[field] for field in IDENTITY_FIELDS) for item in items]
+
+
+def build_page(cards):
+    """A listing page with `cards` cards, most without views or date of their own"""
+    parts = ["<html><body><h2>Popular</h2><div class='videos'>"]
+    for i in range(cards):
+        duration = "" if i % 10 == 9 else f"<span class='duration'>{i % 60}:{i % 50:02d}</span>"
+        views = f"<span class='views'>{i}.{i % 10}K views</span>" if i % 10 == 0 else ""
+        parts.append(
+            f"<div class='video-item'><a href='/video/{i}' title='Video {i}'>"
+            f"<img src='/thumbs/{i}.jpg' alt='Video {i}'></a>{duration}{views}"
+            f"<p>Some description text</p></div>"
+        )
+    parts.append("</div><footer><span class='date'>Updated today</span></footer></body></html>")
+    return "".join(parts)
+
+
+def timed(parse, html, repeats=REPEATS):
+    """Best time of `repeats` runs, and the output"""
+    best = None
+    for _ in range(repeats):
+        started = time.perf_counter()
+        output = parse(html)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, output
+
+
+def main(argv):
+    max_cards = int(argv[1]) if len(argv) > 1 else DEFAULT_MAX_CARDS
+    with open(SAMPLE_PAGE, "r", encoding="utf-8") as f:
+        sample = f.read()
+    backends = list(reversed(html_parser.available_backends()))
+    print("=== WHentai Extraction Benchmark ===")
+
+    all_identical = True
+    old_time, old_videos = timed(legacy_mega, sample)
+    soup_doc = html_parser.parse(sample, "html.parser")
+    old_extract, _ = timed(legacy_mega_cards, soup_doc.tag)
+    new_extract, _ = timed(spec_cards, soup_doc)
+    print(f"\n{SAMPLE_PAGE}, mega cards on a parsed html.parser tree: legacy find() chains "
+          f"{old_extract * 1000:.1f} ms, spec {new_extract * 1000:.1f} ms  {old_extract / new_extract:.1f}x")
+    print(f"\n{SAMPLE_PAGE}, mega cards with parsing: legacy find() chains {old_time:.3f}s ({len(old_videos)} videos)")
+    for backend in backends:
+        html_parser.set_backend(backend)
+        new_time, new_videos = timed(parse_video_cards, sample)
+        identical = new_videos == old_videos
+        all_identical = all_identical and identical
+        print(f"  spec on {backend:<12} {new_time:.3f}s  {old_time / new_time:>5.1f}x  "
+              f"identical: {'yes' if identical else 'NO'}")
+
+    print(f"\nSynthetic listing pages, category cards (ms/card)")
+    print(f"  {'cards':>6} {'find_next':>10} " + " ".join(f"{backend:>12}" for backend in backends) + "  same cards")
+    cards = 50
+    while cards <= max_cards:
+        html = build_page(cards)
+        old_time, old_items = timed(legacy_category_page, html)
+        columns = []
+        same = True
+        for backend in backends:
+            html_parser.set_backend(backend)
+            new_time, new_items = timed(spec_category_page, html)
+            same = same and identity(new_items) == identity(old_items)
+            columns.append(f"{new_time / cards * 1000:>12.3f}")
+        all_identical = all_identical and same
+        print(f"  {cards:>6} {old_time / cards * 1000:>10.3f} {' '.join(columns)}  {'yes' if same else 'NO'}")
+        cards *= 2
+
+    html_parser.set_backend(html_parser.PARSER_BACKEND)
+    print(f"\nOutputs identical: {'yes' if all_identical else 'NO'}")
+    return all_identical
+
+
+if __name__ == "__main__":
+    success = main(sys.argv)
+    sys.exit(0 if success else 1)
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Memory benchmark: plain dict records vs compact Video records
+
+Builds a synthetic catalog of N videos from videos_sample.json (every record
+gets a unique title, thumbnail id and detail URL, like the real data) and
+reports the bytes held per video as decoded dicts and as video_record.Video.
+
+    python benchmark_memory.py              # 58,000 and 1,000,000 videos
+    python benchmark_memory.py 10000 50000  # custom sizes
+"""
+
+import gc
+import json
+import sys
+import time
+import tracemalloc
+
+from video_record import Video
+
+SAMPLE_FILE = "videos_sample.json"
+DEFAULT_SIZES = [58000, 1000000]
+BATCH_SIZE = 10000  # records decoded per json.loads call, like a chunked file read
+
+
+def synthetic_batches(sample, total):
+    """Yield JSON array strings holding `total` unique records built from the sample"""
+    templates = [json.dumps(video, ensure_ascii=False) for video in sample]
+    for start in range(0, total, BATCH_SIZE):
+        parts = []
+        for i in range(start, min(start + BATCH_SIZE, total)):
+            base = sample[i % len(sample)]
+            unique = f"{i:07d}"
+            text = templates[i % len(sample)]
+            # Make title, thumbnail id and detail token unique per record
+            text = text.replace(base['title'], f"{base['title']} #{unique}", 1)
+            thumb_id = base['thumbnail'].split('/thumbnail/')[1].split('/')[0]
+            text = text.replace(thumb_id, unique + thumb_id[7:])
+            text = text.replace('/out/?l=', f'/out/?l={unique}', 1)
+            parts.append(text)
+        yield "[" + ",".join(parts) + "]"
+
+
+def measure(sample, total, compact):
+    """Return (bytes held, seconds) for a list of `total` records"""
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    records = []
+    for batch in synthetic_batches(sample, total):
+        decoded = json.loads(batch)
+        if compact:
+            records.extend(Video.from_dict(video) for video in decoded)
+        else:
+            records.extend(decoded)
+        del decoded, batch
+    elapsed = time.perf_counter() - started
+    gc.collect()
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert len(records) == total
+    del records
+    return held, elapsed
+
+
+def main(argv):
+    sizes = [int(arg) for arg in argv[1:]] or DEFAULT_SIZES
+    with open(SAMPLE_FILE, 'r', encoding='utf-8') as f:
+        sample = json.load(f)
+
+    print("=== WHentai Video Record Memory Benchmark ===\n")
+    print(f"{'videos':>10} {'dict B/video':>14} {'Video B/video':>14} {'saved':>7} {'dict MB':>9} {'Video MB':>9}")
+    for total in sizes:
+        dict_bytes, dict_time = measure(sample, total, compact=False)
+        video_bytes, video_time = measure(sample, total, compact=True)
+        saved = 1 - video_bytes / dict_bytes
+        print(f"{total:>10,} {dict_bytes / total:>14.0f} {video_bytes / total:>14.0f} {saved:>6.0%} "
+              f"{dict_bytes / 1e6:>9.1f} {video_bytes / 1e6:>9.1f}")
+        print(f"{'':>10} build time: dict {dict_time:.1f}s, Video {video_time:.1f}s")
+
+
+if __name__ == "__main__":
+    main(sys.argv)
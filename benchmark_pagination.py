@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Pagination benchmark: one page at a time vs predictive prefetch
+
+Crawls a few deep listings on stub_server.py (each response delayed like a
+real round trip) the way enhanced_scraper.py does: the first page's
+pagination links teach the engine the ?page=N scheme, then the pages are
+walked until one is empty, with
+
+  - prefetch 1: every page waits for the previous one
+  - prefetch N: pages N+1.. are requested while page N is parsed, within
+    the per-host limits
+
+Reports wall time, requests (including pages prefetched past the end) and
+checks that both found the same videos.
+
+    python benchmark_pagination.py [sources] [pages] [delay]
+"""
+
+import sys
+import time
+
+import rate_limiter
+from crawl_engine import PREFETCH_PAGES, CrawlEngine
+from enhanced_scraper import find_pagination_urls, parse_listing
+from stub_server import start_stub_server
+
+DEFAULT_SOURCES = 4
+DEFAULT_PAGES = 20
+DEFAULT_DELAY = 0.2
+PER_HOST = 8
+
+
+def crawl(server, sources, pages, prefetch):
+    """Crawl the listings once; returns (seconds, requests, titles per source)"""
+    urls = [f"{server.base_url}/category/c{i}" for i in range(sources)]
+    before = server.state.counts["requests"]
+    started = time.time()
+    engine = CrawlEngine(per_host=PER_HOST, parse_workers=0, prefetch=prefetch)
+    results = engine.crawl(urls, parse_listing, pages + 5, find_links=find_pagination_urls)
+    titles = {url: [video["title"] for video in videos] for url, videos in results.items()}
+    return time.time() - started, server.state.counts["requests"] - before, titles
+
+
+def main(argv):
+    sources = int(argv[1]) if len(argv) > 1 else DEFAULT_SOURCES
+    pages = int(argv[2]) if len(argv) > 2 else DEFAULT_PAGES
+    delay = float(argv[3]) if len(argv) > 3 else DEFAULT_DELAY
+
+    print("=== WHentai Pagination Benchmark ===")
+    print(f"{sources} sources x {pages} pages, {delay:.2f}s per response, {PER_HOST} requests per host\n")
+    server = start_stub_server(pages=pages, response_delay=delay)
+    rate_limiter.configure_host(server.base_url, 500.0, burst=50)
+    try:
+        rows = [(prefetch, *crawl(server, sources, pages, prefetch)) for prefetch in (1, PREFETCH_PAGES)]
+    finally:
+        server.shutdown()
+
+    print(f"\n{'prefetch':>8} {'seconds':>8} {'requests':>9} {'videos':>7}")
+    for prefetch, seconds, requests, titles in rows:
+        print(f"{prefetch:>8} {seconds:>8.2f} {requests:>9} {sum(map(len, titles.values())):>7}")
+    identical = rows[0][3] == rows[1][3]
+    print(f"\nPrefetch: {rows[0][1] / rows[1][1]:.1f}x faster, same videos: {'yes' if identical else 'NO'}")
+    return identical
+
+
+if __name__ == "__main__":
+    success = main(sys.argv)
+    sys.exit(0 if success else 1)
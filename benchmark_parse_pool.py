@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Parse stage benchmark: parsing on the fetch threads vs a parse process pool
+
+Crawls listings on stub_server.py with the crawl engine twice:
+
+  - threads: every page is parsed on the worker thread that fetched it, so
+    all parsing shares one core through the GIL
+  - processes: pages go to a pool of parse processes and the videos come
+    back as packed tuples
+
+Reports wall time, CPU time spent in the crawling process and checks that
+both runs found the same videos. The gain grows with the number of cores;
+on a single core the process pool only adds pickling overhead.
+
+    python benchmark_parse_pool.py [sources] [parse_workers]
+"""
+
+import os
+import sys
+import time
+
+import rate_limiter
+from crawl_engine import CrawlEngine
+from mega_scraper import parse_video_cards
+from stub_server import start_stub_server
+
+DEFAULT_SOURCES = 20
+PAGES = 5
+
+
+def crawl(server, sources, parse_workers):
+    """Crawl the listings once; returns (seconds, cpu seconds, results)"""
+    urls = [f"{server.base_url}/category/c{i}" for i in range(sources)]
+    started, cpu_started = time.time(), time.process_time()
+    engine = CrawlEngine(per_host=8, parse_workers=parse_workers)
+    results = engine.crawl(urls, parse_video_cards, PAGES + 1)
+    return time.time() - started, time.process_time() - cpu_started, results
+
+
+def main(argv):
+    sources = int(argv[1]) if len(argv) > 1 else DEFAULT_SOURCES
+    workers = int(argv[2]) if len(argv) > 2 else max(2, (os.cpu_count() or 1) - 1)
+
+    print("=== WHentai Parse Pool Benchmark ===")
+    print(f"{sources} sources x {PAGES} pages, {workers} parse processes, {os.cpu_count()} cores\n")
+    server = start_stub_server(pages=PAGES)
+    rate_limiter.configure_host(server.base_url, 500.0, burst=50)
+    try:
+        thread_seconds, thread_cpu, thread_results = crawl(server, sources, 0)
+        pool_seconds, pool_cpu, pool_results = crawl(server, sources, workers)
+    finally:
+        server.shutdown()
+
+    videos = sum(len(items) for items in thread_results.values())
+    print(f"{'parse stage':<12} {'seconds':>8} {'main cpu':>9} {'videos':>7}")
+    print(f"{'threads':<12} {thread_seconds:>8.2f} {thread_cpu:>9.2f} {videos:>7}")
+    print(f"{'processes':<12} {pool_seconds:>8.2f} {pool_cpu:>9.2f} "
+          f"{sum(len(items) for items in pool_results.values()):>7}")
+    identical = pool_results == thread_results
+    print(f"\nProcess pool: {thread_seconds / pool_seconds:.1f}x, same videos: {'yes' if identical else 'NO'}")
+    return identical
+
+
+if __name__ == "__main__":
+    success = main(sys.argv)
+    sys.exit(0 if success else 1)
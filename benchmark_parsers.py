@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Parser backend benchmark on the bundled sample_page.html
+
+Runs the listing and detail-page extractors on every installed backend in
+html_parser.py (selectolax, lxml, html.parser) and reports pages/second,
+items extracted and whether the output is identical to html.parser's.
+
+    python benchmark_parsers.py [repeats]
+    pip install lxml selectolax    # to compare the fast backends
+"""
+
+import sys
+import time
+
+import html_parser
+from enhanced_scraper import extract_external_from_detail, parse_listing
+from mega_scraper import parse_video_cards
+
+SAMPLE_PAGE = "sample_page.html"
+DEFAULT_REPEATS = 5
+DETAIL_URL = "https://www.cartoonpornvideos.com/video/sample"
+
+
+def strip_timestamps(items):
+    """parse_listing stamps every item with scraped_at; drop it for comparisons"""
+    return [{k: v for k, v in item.items() if k != "scraped_at"} for item in items]
+
+
+EXTRACTORS = [
+    ("mega parse_video_cards", parse_video_cards, len),
+    ("enhanced parse_listing", lambda html: strip_timestamps(parse_listing(html)), len),
+    ("extract_external_from_detail", lambda html: extract_external_from_detail(html, DETAIL_URL),
+     lambda url: 1 if url else 0),
+]
+
+
+def measure(extract, html, repeats):
+    """Return (pages per second, last output)"""
+    started = time.perf_counter()
+    for _ in range(repeats):
+        output = extract(html)
+    return repeats / (time.perf_counter() - started), output
+
+
+def main(argv):
+    repeats = int(argv[1]) if len(argv) > 1 else DEFAULT_REPEATS
+    with open(SAMPLE_PAGE, "r", encoding="utf-8") as f:
+        html = f.read()
+    available = html_parser.available_backends()
+
+    print("=== WHentai Parser Benchmark ===")
+    print(f"{SAMPLE_PAGE}: {len(html.encode('utf-8')) / 1024:.0f} KB, {repeats} repeats per backend")
+    missing = [name for name in html_parser.BACKENDS if name not in available]
+    if missing:
+        print(f"Not installed: {', '.join(missing)}")
+
+    all_identical = True
+    for name, extract, count in EXTRACTORS:
+        print(f"\n{name}")
+        print(f"  {'backend':<12} {'pages/s':>8} {'items':>6}  identical")
+        html_parser.set_backend("html.parser")
+        reference = extract(html)
+        for backend in reversed(available):
+            html_parser.set_backend(backend)
+            pages_per_second, output = measure(extract, html, repeats)
+            identical = output == reference
+            all_identical = all_identical and identical
+            print(f"  {backend:<12} {pages_per_second:>8.2f} {count(output):>6}  {'yes' if identical else 'NO'}")
+
+    html_parser.set_backend(html_parser.PARSER_BACKEND)
+    print(f"\nOutputs identical across backends: {'yes' if all_identical else 'NO'}")
+    return all_identical
+
+
+if __name__ == "__main__":
+    success = main(sys.argv)
+    sys.exit(0 if success else 1)
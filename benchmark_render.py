@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Browser render benchmark: full render vs fast render mode
+
+Renders the /heavy page of stub_server.py (the sample listing plus images,
+web fonts, a video and a third-party script, each asset delayed) with one
+pooled browser per mode:
+
+  - full: wait for network idle with every asset loading (the old behaviour)
+  - fast: images, media and fonts aborted (scripts still load), returned
+    once the video cards are in the DOM
+
+Reports seconds per page, asset requests that reached the server and checks
+that the extracted cards are the same.
+
+    python benchmark_render.py [renders] [asset_delay]
+    pip install -r requirements-playwright.txt && python -m playwright install chromium
+"""
+
+import sys
+import time
+
+from browser_pool import BrowserPool
+from extraction_spec import CARD_WAIT_SELECTOR, VIDEO_CARDS
+from stub_server import start_stub_server
+
+DEFAULT_RENDERS = 5
+DEFAULT_ASSET_DELAY = 0.2
+
+
+def render_pages(server, fast, renders):
+    """Render /heavy `renders` times; returns (seconds per page, assets served, cards)"""
+    url = f"{server.base_url}/heavy"
+    with BrowserPool(browsers=1, contexts_per_browser=1, fast=fast) as pool:
+        pool.fetch(url, wait_for=CARD_WAIT_SELECTOR)  # launch the browser outside the timing
+        assets_before = server.state.counts["assets"]
+        started = time.perf_counter()
+        for _ in range(renders):
+            html = pool.fetch(url, wait_for=CARD_WAIT_SELECTOR)
+        elapsed = time.perf_counter() - started
+        assets = server.state.counts["assets"] - assets_before
+    return elapsed / renders, assets / renders, VIDEO_CARDS.extract(html)
+
+
+def main(argv):
+    renders = int(argv[1]) if len(argv) > 1 else DEFAULT_RENDERS
+    asset_delay = float(argv[2]) if len(argv) > 2 else DEFAULT_ASSET_DELAY
+    try:
+        import playwright  # noqa: F401
+    except ImportError:
+        print("Playwright is not installed: pip install -r requirements-playwright.txt")
+        return False
+
+    print("=== WHentai Render Benchmark ===")
+    print(f"{renders} renders of /heavy per mode, {asset_delay:.2f}s per asset request\n")
+    server = start_stub_server(asset_delay=asset_delay)
+    try:
+        full_seconds, full_assets, full_cards = render_pages(server, False, renders)
+        fast_seconds, fast_assets, fast_cards = render_pages(server, True, renders)
+    finally:
+        server.shutdown()
+
+    print(f"{'mode':<6} {'s/page':>8} {'assets/page':>12} {'cards':>6}")
+    print(f"{'full':<6} {full_seconds:>8.2f} {full_assets:>12.0f} {len(full_cards):>6}")
+    print(f"{'fast':<6} {fast_seconds:>8.2f} {fast_assets:>12.0f} {len(fast_cards):>6}")
+    identical = fast_cards == full_cards
+    print(f"\nFast mode: {full_seconds / fast_seconds:.1f}x faster, same cards: {'yes' if identical else 'NO'}")
+    return identical
+
+
+if __name__ == "__main__":
+    success = main(sys.argv)
+    sys.exit(0 if success else 1)
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Revalidation benchmark: full refetch vs ETag/Last-Modified page cache
+
+Crawls the same listings on stub_server.py (which honours If-None-Match and
+If-Modified-Since) twice, as two consecutive scheduled runs would:
+
+  - no-cache: every page is downloaded and parsed with BeautifulSoup each run
+  - cache: the second run sends the stored validators, unchanged pages come
+    back as an empty 304 and reuse the videos parsed in the first run
+
+The first FRESH_PAGES pages of every listing change between runs, like the
+newest videos on the real site. Reports bytes received, CPU time and wall time
+per run.
+
+    python benchmark_revalidation.py [sources]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+import rate_limiter
+from crawl_engine import CrawlEngine
+from mega_scraper import parse_video_cards
+from page_cache import PageCache
+from stub_server import start_stub_server
+
+DEFAULT_SOURCES = 20
+PAGES = 5
+FRESH_PAGES = 1
+
+
+def crawl_twice(server, sources, cache):
+    """Run two crawls of the same listings and return one result row per run"""
+    urls = [f"{server.base_url}/category/c{i}" for i in range(sources)]
+    rows = []
+    for _ in range(2):
+        before = dict(server.state.counts)
+        started, cpu_started = time.time(), time.process_time()
+        engine = CrawlEngine(per_host=8, cache=cache)
+        results = engine.crawl(urls, parse_video_cards, PAGES + 1)
+        rows.append({
+            "seconds": time.time() - started,
+            "cpu": time.process_time() - cpu_started,
+            "bytes": server.state.counts["bytes"] - before["bytes"],
+            "not_modified": server.state.counts["not_modified"] - before["not_modified"],
+            "videos": sum(len(items) for items in results.values()),
+        })
+    return rows
+
+
+def main(argv):
+    sources = int(argv[1]) if len(argv) > 1 else DEFAULT_SOURCES
+
+    print("=== WHentai Revalidation Benchmark ===")
+    print(f"{sources} sources x {PAGES} pages, {FRESH_PAGES} changed page(s) per source between runs\n")
+    server = start_stub_server(pages=PAGES, fresh_pages=FRESH_PAGES)
+    rate_limiter.configure_host(server.base_url, 500.0, burst=50)
+    db_path = os.path.join(tempfile.mkdtemp(), "page_cache.db")
+    try:
+        plain = crawl_twice(server, sources, None)
+        with PageCache(db_path) as cache:
+            cached = crawl_twice(server, sources, cache)
+    finally:
+        server.shutdown()
+
+    print(f"\n{'run':<16} {'videos':>7} {'KB received':>12} {'304s':>6} {'CPU s':>7} {'wall s':>7}")
+    for name, rows in (("no-cache", plain), ("cache", cached)):
+        for i, row in enumerate(rows, 1):
+            print(f"{name + ' run ' + str(i):<16} {row['videos']:>7} {row['bytes'] / 1024:>12.0f} "
+                  f"{row['not_modified']:>6} {row['cpu']:>7.2f} {row['seconds']:>7.2f}")
+    second_plain, second_cached = plain[1], cached[1]
+    print(f"\nSecond run: {second_cached['bytes'] / max(second_plain['bytes'], 1):.0%} of the bytes, "
+          f"{second_cached['cpu'] / max(second_plain['cpu'], 1e-9):.0%} of the CPU time")
+
+
+if __name__ == "__main__":
+    main(sys.argv)
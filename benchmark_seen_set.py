@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Seen-set benchmark: Python set vs Bloom filter backed by on-disk keys
+
+Builds mega_scraper's `title|thumbnail|detail_url|external_url` duplicate
+keys for a synthetic catalog of N videos (see benchmark_memory.py) and
+reports, for a plain set and for seen_set.SeenSet:
+
+  - memory held after adding every key (tracemalloc; the keys are built
+    while adding, as in mega_scraper, so the set's copy of them counts)
+  - time to add the keys and to test as many keys that are not in the set,
+    plus every key that is
+  - disk lookups and false positives of the Bloom filter
+
+Both must give the same answer for every key.
+
+    python benchmark_seen_set.py              # 58,000 and 250,000 videos
+    python benchmark_seen_set.py 10000 50000  # custom sizes
+"""
+
+import gc
+import json
+import sys
+import time
+import tracemalloc
+
+from benchmark_memory import SAMPLE_FILE, synthetic_batches
+from seen_set import BLOOM_ERROR_RATE, SeenSet
+
+DEFAULT_SIZES = [58000, 250000]
+
+
+def key_parts(sample, total):
+    """(title, thumbnail, detail_url, external_url) of `total` synthetic videos"""
+    parts = []
+    for batch in synthetic_batches(sample, total):
+        for video in json.loads(batch):
+            parts.append((video['title'], video['thumbnail'], video.get('detail_url') or '',
+                          video.get('external_url') or ''))
+    return parts
+
+
+def fill(make, videos):
+    seen = make(len(videos))
+    for parts in videos:
+        seen.add("|".join(parts))
+    return seen
+
+
+def measure(make, videos, new_videos):
+    """Return (bytes held, add seconds, lookup seconds, answers, seen)"""
+    gc.collect()
+    tracemalloc.start()
+    seen = fill(make, videos)
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del seen
+    gc.collect()
+    started = time.perf_counter()
+    seen = fill(make, videos)
+    added = time.perf_counter() - started
+    started = time.perf_counter()
+    answers = [("|".join(parts) in seen) for parts in new_videos + videos]
+    return held, added, time.perf_counter() - started, answers, seen
+
+
+def main(argv):
+    sizes = [int(arg) for arg in argv[1:]] or DEFAULT_SIZES
+    with open(SAMPLE_FILE, 'r', encoding='utf-8') as f:
+        sample = json.load(f)
+
+    print("=== WHentai Seen-Set Benchmark ===")
+    print(f"Bloom filter false-positive rate {BLOOM_ERROR_RATE}\n")
+    print(f"{'videos':>9} {'kind':<6} {'MB':>7} {'B/key':>6} {'add s':>6} {'test s':>7} {'disk':>7} {'fp':>5}")
+    all_same = True
+    for total in sizes:
+        all_videos = key_parts(sample, 2 * total)
+        videos, new_videos = all_videos[:total], all_videos[total:]
+        del all_videos
+        set_held, set_add, set_test, set_answers, plain = measure(lambda capacity: set(), videos, new_videos)
+        del plain
+        bloom_held, bloom_add, bloom_test, bloom_answers, seen = measure(SeenSet, videos, new_videos)
+        same = bloom_answers == set_answers
+        all_same = all_same and same
+        print(f"{total:>9,} {'set':<6} {set_held / 1e6:>7.1f} {set_held / total:>6.0f} "
+              f"{set_add:>6.2f} {set_test:>7.2f}")
+        print(f"{'':>9} {'bloom':<6} {bloom_held / 1e6:>7.1f} {bloom_held / total:>6.0f} "
+              f"{bloom_add:>6.2f} {bloom_test:>7.2f} {seen.disk_checks:>7} {seen.false_positives:>5}  "
+              f"same answers: {'yes' if same else 'NO'}")
+        seen.close()
+    return all_same
+
+
+if __name__ == "__main__":
+    success = main(sys.argv)
+    sys.exit(0 if success else 1)
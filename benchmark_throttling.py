@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Throttling benchmark: fixed rate vs AIMD adaptive rate against a stub origin
+
+Starts stub_server.py with a fixed capacity (it answers 429 + Retry-After
+above it, plus optional random 503s) and crawls the same listing pages
+through crawl_engine with:
+
+  - fixed-fast: a fixed rate above the capacity (no adaptation)
+  - fixed-slow: a fixed rate well below the capacity
+  - aimd-fast / aimd-slow: the same starting rates with AIMD enabled
+
+and reports pages/s, throttled responses and the rate each run ended at.
+
+    python benchmark_throttling.py [capacity] [sources] [error_rate]
+"""
+
+import re
+import sys
+import time
+
+import rate_limiter
+from crawl_engine import CrawlEngine
+from stub_server import start_stub_server
+
+DEFAULT_CAPACITY = 10.0  # stub requests per second
+DEFAULT_SOURCES = 30
+PAGES = 5
+CARD_PATTERN = re.compile(r'data-public-id="([^"]+)"')
+
+
+def parse_ids(html):
+    """Cheap parse so the benchmark measures fetching, not BeautifulSoup"""
+    return CARD_PATTERN.findall(html)
+
+
+def run(name, capacity, sources, error_rate, start_rate, adaptive):
+    """Crawl all sources once and return a result row"""
+    server = start_stub_server(capacity=capacity, error_rate=error_rate, pages=PAGES)
+    # Fresh shared limiter so runs do not inherit each other's learned rate
+    rate_limiter.LIMITER = rate_limiter.RateLimiter(adaptive=adaptive)
+    rate_limiter.LIMITER.configure_host(server.base_url, start_rate, burst=2)
+    try:
+        engine = CrawlEngine(per_host=8)
+        urls = [f"{server.base_url}/category/c{i}" for i in range(sources)]
+        started = time.time()
+        results = engine.crawl(urls, parse_ids, PAGES + 1)
+        elapsed = time.time() - started
+    finally:
+        server.shutdown()
+    stats = rate_limiter.LIMITER.stats()[rate_limiter.host_of(server.base_url)]
+    pages = sum(len(items) for items in results.values()) // 120
+    return {
+        "name": name,
+        "pages": pages,
+        "expected": sources * PAGES,
+        "seconds": elapsed,
+        "throttled": server.state.counts["throttled"],
+        "errors": server.state.counts["errors"],
+        "final_rate": stats["rate"],
+    }
+
+
+def main(argv):
+    capacity = float(argv[1]) if len(argv) > 1 else DEFAULT_CAPACITY
+    sources = int(argv[2]) if len(argv) > 2 else DEFAULT_SOURCES
+    error_rate = float(argv[3]) if len(argv) > 3 else 0.0
+
+    print("=== WHentai Throttling Benchmark ===")
+    print(f"Stub capacity {capacity:g} req/s, {sources} sources x {PAGES} pages, 503 rate {error_rate:.0%}\n")
+    rows = [
+        run("fixed-fast", capacity, sources, error_rate, capacity * 2, adaptive=False),
+        run("fixed-slow", capacity, sources, error_rate, capacity / 4, adaptive=False),
+        run("aimd-fast", capacity, sources, error_rate, capacity * 2, adaptive=True),
+        run("aimd-slow", capacity, sources, error_rate, capacity / 4, adaptive=True),
+    ]
+    print(f"\n{'run':<12} {'pages':>11} {'seconds':>8} {'pages/s':>8} {'429s':>6} {'503s':>6} {'end rate':>9}")
+    for row in rows:
+        print(f"{row['name']:<12} {row['pages']:>5}/{row['expected']:<5} {row['seconds']:>8.1f} "
+              f"{row['pages'] / row['seconds']:>8.2f} {row['throttled']:>6} {row['errors']:>6} "
+              f"{row['final_rate']:>9.2f}")
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+Pool of long-lived headless browsers for JS-rendered pages
+
+fetch_with_playwright used to launch a new Chromium inside
+`with sync_playwright()` for every URL (seconds of startup per detail page),
+and scraper.WebScraper kept one browser but rendered one page at a time.
+BrowserPool keeps BROWSERS Chromium processes open for the whole run and
+renders up to CONTEXTS_PER_BROWSER pages in each concurrently, all driven by
+Playwright's async API on one background event loop.
+
+Every render uses a browser context (isolated cookies/cache) taken from the
+pool. Contexts are reused for PAGES_PER_CONTEXT pages and then recycled, so
+memory stays bounded; a crashed browser is relaunched on its next use.
+
+fetch(url) is a blocking call that is safe from any thread, so it drops in
+as the fetcher of crawl_engine.CrawlEngine (whose worker threads then keep
+the whole pool busy) or of a plain loop:
+
+    pool = browser_pool.shared_pool(headers=HEADERS)
+    html = pool.fetch(url)
+    # or: CrawlEngine(fetcher=pool.fetch)
+
+Fast render mode (the default, WHENTAI_FAST_RENDER=0 turns it off) aborts
+image, media and font requests, which never change the DOM, and returns as
+soon as the DOM is loaded and the elements the extractor needs are attached
+instead of waiting for network idle:
+
+    html = pool.fetch(url, wait_for=extraction_spec.CARD_WAIT_SELECTOR)
+
+Scripts and XHR/fetch requests always load, wherever they come from, as the
+page may render its cards with them. WHENTAI_BLOCK_THIRD_PARTY=1 also aborts
+the other requests to other sites (stylesheets, ad iframes, beacons); only
+turn it on for a site whose cards are known to render without them.
+
+Playwright is optional: pip install -r requirements-playwright.txt and
+python -m playwright install chromium. Pool size can be set with
+WHENTAI_BROWSERS and WHENTAI_BROWSER_CONTEXTS.
+"""
+
+import asyncio
+import atexit
+import os
+import threading
+from urllib.parse import urlparse
+
+# === CONFIG ===
+BROWSERS = int(os.environ.get("WHENTAI_BROWSERS", "2"))                       # Chromium processes
+CONTEXTS_PER_BROWSER = int(os.environ.get("WHENTAI_BROWSER_CONTEXTS", "4"))  # pages rendered at once per browser
+PAGES_PER_CONTEXT = 50        # recycle a context after this many pages
+NAVIGATION_TIMEOUT = 30000    # ms for page.goto
+IDLE_TIMEOUT = 15000          # ms to wait for the network to go idle
+FAST_RENDER = os.environ.get("WHENTAI_FAST_RENDER", "1") != "0"
+BLOCKED_RESOURCE_TYPES = frozenset(("image", "media", "font"))  # aborted in fast mode
+BLOCK_THIRD_PARTY = os.environ.get("WHENTAI_BLOCK_THIRD_PARTY", "0") == "1"
+THIRD_PARTY_ALLOWED_TYPES = frozenset(("script", "xhr", "fetch"))  # loaded from any site
+# Second-level labels under country codes that are registries, not sites (example.co.uk)
+REGISTRY_LABELS = frozenset(("ac", "co", "com", "edu", "gov", "net", "ne", "or", "org"))
+SELECTOR_TIMEOUT = 10000      # ms to wait for wait_for selectors in fast mode
+LAUNCH_ARGS = ["--disable-dev-shm-usage"]
+
+
+def _async_playwright():
+    try:
+        from playwright.async_api import async_playwright
+    except Exception as e:
+        raise RuntimeError("Playwright not installed. Install playwright and run `playwright install`") from e
+    return async_playwright
+
+
+def _timeout_error():
+    from playwright.async_api import TimeoutError
+    return TimeoutError
+
+
+def site_of(url):
+    """
+    Site a URL belongs to, for third-party checks: the registered domain
+    (example.com, example.co.uk), or the whole host for IPs.
+    """
+    host = (urlparse(url).hostname or "").lower()
+    if not host or host.replace(".", "").isdigit() or ":" in host:
+        return host
+    labels = host.split(".")
+    if len(labels) >= 3 and len(labels[-1]) == 2 and labels[-2] in REGISTRY_LABELS:
+        return ".".join(labels[-3:])
+    return ".".join(labels[-2:])
+
+
+class ContextSlot:
+    """One concurrent render: a browser and the context it is currently reusing"""
+    __slots__ = ("browser", "context", "pages")
+
+    def __init__(self, browser):
+        self.browser = browser  # index into BrowserPool._browsers
+        self.context = None
+        self.pages = 0
+
+
+class BrowserPool:
+    def __init__(self, browsers=BROWSERS, contexts_per_browser=CONTEXTS_PER_BROWSER,
+                 pages_per_context=PAGES_PER_CONTEXT, headers=None, headless=True, fast=FAST_RENDER,
+                 block_third_party=BLOCK_THIRD_PARTY):
+        """
+        Create a browser pool. Browsers are launched on first use.
+
+        Args:
+            browsers (int): Chromium processes to keep open
+            contexts_per_browser (int): Pages rendered concurrently per browser
+            pages_per_context (int): Pages rendered in a context before it is replaced
+            headers (dict): Request headers; User-Agent becomes the context's user agent
+            headless (bool): Run the browsers headless
+            fast (bool): Fast render mode: block images, media and fonts and
+                skip the wait for network idle
+            block_third_party (bool): In fast mode, also block requests to
+                other sites, except scripts and XHR/fetch
+        """
+        self.browsers = max(1, browsers)
+        self.contexts_per_browser = max(1, contexts_per_browser)
+        self.pages_per_context = max(1, pages_per_context)
+        self.headless = headless
+        self.fast = fast
+        self.block_third_party = block_third_party
+        headers = dict(headers or {})
+        self.user_agent = headers.pop("User-Agent", None)
+        self.extra_headers = headers
+        self.pages_rendered = 0
+        self.browsers_launched = 0
+        self.contexts_created = 0
+        self.errors = 0
+        self.requests_blocked = 0
+        self._loop = None
+        self._thread = None
+        self._playwright = None
+        self._browsers = [None] * self.browsers
+        self._launch_locks = None
+        self._idle = None
+        self._lock = threading.Lock()
+        self._closed = False
+
+    # --- event loop ---
+    def _ensure_loop(self):
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Browser pool is closed")
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name="browser-pool", daemon=True)
+                thread.start()
+                self._loop, self._thread = loop, thread
+                asyncio.run_coroutine_threadsafe(self._setup(), loop).result()
+        return self._loop
+
+    async def _setup(self):
+        self._launch_locks = [asyncio.Lock() for _ in range(self.browsers)]
+        self._idle = asyncio.Queue()
+        # Interleave slots so consecutive renders spread over the browsers
+        for _ in range(self.contexts_per_browser):
+            for index in range(self.browsers):
+                self._idle.put_nowait(ContextSlot(index))
+
+    # --- browsers and contexts (event loop thread only) ---
+    async def _browser(self, index):
+        async with self._launch_locks[index]:
+            browser = self._browsers[index]
+            if browser is not None and browser.is_connected():
+                return browser
+            if self._playwright is None:
+                self._playwright = await _async_playwright()().start()
+            browser = await self._playwright.chromium.launch(headless=self.headless, args=LAUNCH_ARGS)
+            self._browsers[index] = browser
+            self.browsers_launched += 1
+            return browser
+
+    async def _context(self, slot):
+        browser = await self._browser(slot.browser)
+        if slot.context is not None and slot.context.browser is not browser:
+            slot.context = None  # its browser crashed and was relaunched
+        if slot.context is None:
+            options = {}
+            if self.user_agent:
+                options["user_agent"] = self.user_agent
+            if self.extra_headers:
+                options["extra_http_headers"] = self.extra_headers
+            slot.context = await browser.new_context(**options)
+            slot.pages = 0
+            self.contexts_created += 1
+            await self.prepare_context(slot.context)
+        return slot.context
+
+    async def prepare_context(self, context):
+        """Hook run on every new context (request routing, cookies, ...)"""
+
+    async def _retire(self, slot):
+        context, slot.context = slot.context, None
+        if context is not None:
+            try:
+                await context.close()
+            except Exception:
+                pass
+
+    async def render(self, page, url, timeout, wait_for=None):
+        """Load `url` in a fresh page of a pooled context and return its HTML"""
+        if not self.fast:
+            await page.goto(url, timeout=timeout)
+            await page.wait_for_load_state("networkidle", timeout=IDLE_TIMEOUT)
+            return await page.content()
+
+        site = site_of(url)
+
+        async def block_heavy_requests(route):
+            request = route.request
+            main_document = request.is_navigation_request() and request.frame.parent_frame is None
+            third_party = (self.block_third_party and not main_document
+                           and request.resource_type not in THIRD_PARTY_ALLOWED_TYPES
+                           and site_of(request.url) != site)
+            if request.resource_type in BLOCKED_RESOURCE_TYPES or third_party:
+                self.requests_blocked += 1
+                await route.abort()
+            else:
+                await route.continue_()
+
+        await page.route("**/*", block_heavy_requests)
+        await page.goto(url, timeout=timeout, wait_until="domcontentloaded")
+        if wait_for:
+            try:
+                await page.wait_for_selector(wait_for, state="attached", timeout=SELECTOR_TIMEOUT)
+            except _timeout_error():
+                pass  # e.g. an empty listing page; return what was rendered
+        return await page.content()
+
+    async def fetch_async(self, url, timeout=NAVIGATION_TIMEOUT, wait_for=None):
+        """Render a page on the pool's event loop"""
+        slot = await self._idle.get()
+        try:
+            context = await self._context(slot)
+            page = await context.new_page()
+            try:
+                html = await self.render(page, url, timeout, wait_for)
+            finally:
+                await page.close()
+            self.pages_rendered += 1
+            slot.pages += 1
+            if slot.pages >= self.pages_per_context:
+                await self._retire(slot)
+            return html
+        except Exception:
+            self.errors += 1
+            # The context may be wedged; start the next render in a clean one
+            await self._retire(slot)
+            raise
+        finally:
+            self._idle.put_nowait(slot)
+
+    # --- blocking API (any thread) ---
+    def fetch(self, url, timeout=NAVIGATION_TIMEOUT, wait_for=None):
+        """
+        Render a page and return its HTML; blocks the calling thread only.
+
+        Args:
+            url (str): Page to render
+            timeout (int): Navigation timeout in milliseconds
+            wait_for (str): CSS selector the caller needs; in fast mode the
+                page is returned once it is attached (or SELECTOR_TIMEOUT passes)
+
+        Raises the Playwright error (e.g. a navigation timeout) when the page fails.
+        """
+        loop = self._ensure_loop()
+        return asyncio.run_coroutine_threadsafe(self.fetch_async(url, timeout, wait_for), loop).result()
+
+    async def _shutdown(self):
+        if self._idle is not None:
+            while not self._idle.empty():
+                await self._retire(self._idle.get_nowait())
+        for index, browser in enumerate(self._browsers):
+            if browser is not None:
+                try:
+                    await browser.close()
+                except Exception:
+                    pass
+                self._browsers[index] = None
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+    def close(self):
+        """Close every context and browser and stop the event loop"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._shutdown(), loop).result()
+        finally:
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            loop.close()
+        if self.pages_rendered or self.errors:
+            print(f"Browser pool rendered {self.pages_rendered} pages ({self.errors} errors) with "
+                  f"{self.browsers_launched} browser launches and {self.contexts_created} contexts, "
+                  f"{self.requests_blocked} requests blocked")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def shared_pool(headers=None):
+    """
+    The process-wide pool, created on first use and closed at exit.
+
+    `headers` only applies to the call that creates it.
+    """
+    global _shared
+    with _shared_lock:
+        if _shared is None or _shared._closed:
+            _shared = BrowserPool(headers=headers)
+            atexit.register(_shared.close)
+        return _shared
+
+
+def fetch(url, headers=None, timeout=NAVIGATION_TIMEOUT, wait_for=None):
+    """Render a page with the shared pool"""
+    return shared_pool(headers).fetch(url, timeout, wait_for)
@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""
+Record/replay cassettes for the shared HTTP session
+
+None of the scrapers could run without the live site. A cassette sits under
+http_client.request, the fetch path every scraper and the crawl engine share:
+
+  - record: requests go out as usual and every final response (status,
+    headers and decoded body) is stored with its request in a SQLite file
+  - replay: responses come from the cassette and nothing is sent; the same
+    request asked again gets the next recorded response, then the last one,
+    so a run replays deterministically. A request that was never recorded
+    fails like a connection error (speculative ones, such as pages
+    prefetched past the end of a listing, can differ between runs and are
+    dropped either way).
+
+Set WHENTAI_CASSETTE to the cassette file and WHENTAI_CASSETTE_MODE to record
+or replay; any scraper run can then be captured once and replayed offline:
+
+    WHENTAI_CASSETTE=mega.cassette WHENTAI_CASSETTE_MODE=record python mega_scraper.py
+    WHENTAI_CASSETTE=mega.cassette WHENTAI_CASSETTE_MODE=replay python mega_scraper.py
+    WHENTAI_CASSETTE=mega.cassette WHENTAI_CASSETTE_STATE=temp python mega_scraper.py
+
+A relative WHENTAI_CASSETTE is taken from the scripts' directory, and
+replaying a cassette that does not exist fails instead of creating it.
+
+The crawl state next to videos.json (page_cache.db, crawl_frontier.db,
+crawl_budget.db, ...) decides which requests a run sends, so a replay with
+different state can ask for pages that were never recorded. Set
+WHENTAI_CASSETTE_STATE to a directory (or "temp" for a fresh temporary one)
+and the scrapers start the run there: videos.json and the crawl state start
+from nothing, the recording contains every request of the run and every
+replay of it does the same work and finds the same videos. Copy a
+videos.json into that directory to start from stored videos. Without it a
+cassette run reads and writes the usual files. The move happens in the
+scripts' __main__ (prepare_run), never on import; code that uses a
+cassette directly calls use_cassette(..., isolate=True).
+
+While recording, pages are fetched without If-None-Match/If-Modified-Since,
+so the cassette holds full responses. A replay with validators from a page
+cache falls back to those unconditional responses. Replayed hosts are not
+rate limited beyond REPLAY_RATE, as they are not contacted. Browser renders
+do not go through the session; use WHENTAI_FETCH_MODE=http for runs that
+must replay completely.
+
+Replaying removes the network, not the parsing: a run that spends its time
+parsing (the default mega crawl) takes about as long replayed as live.
+benchmark_replay.py shows the difference on a stub server with slow responses.
+
+    python cassette.py show [file]     # list the recorded requests
+    python cassette.py clear [file]    # empty the cassette
+"""
+
+import atexit
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+import rate_limiter
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# === CONFIG ===
+CASSETTE_FILE = os.environ.get("WHENTAI_CASSETTE", "").strip()
+if CASSETTE_FILE:
+    CASSETTE_FILE = os.path.join(SCRIPT_DIR, CASSETTE_FILE)
+CASSETTE_MODE = os.environ.get("WHENTAI_CASSETTE_MODE", "replay").strip().lower()  # record | replay
+# Working directory of a cassette run: a path, "temp" for a fresh temporary one, or empty to stay put
+CASSETTE_STATE = os.environ.get("WHENTAI_CASSETTE_STATE", "").strip()
+MATCH_HEADERS = ("If-None-Match", "If-Modified-Since")  # request headers that change the response
+# Headers describing the body on the wire; the body is stored decoded
+DROP_HEADERS = ("content-encoding", "content-length", "transfer-encoding", "connection")
+FLUSH_EVERY = 50     # recorded responses buffered before writing to disk
+REPLAY_RATE = 1000.0  # requests per second allowed to replayed hosts
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS interactions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    request TEXT NOT NULL,
+    url TEXT NOT NULL,
+    status INTEGER NOT NULL,
+    reason TEXT,
+    headers TEXT NOT NULL,
+    body BLOB NOT NULL,
+    encoding TEXT,
+    recorded REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_interactions_request ON interactions (request);
+"""
+
+INSERT_SQL = """
+INSERT INTO interactions (request, url, status, reason, headers, body, encoding, recorded)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def request_key(method, url, headers=None):
+    """Key a request by method, URL and the headers that change its response"""
+    key = f"{method.upper()} {url}"
+    for name in MATCH_HEADERS:
+        value = _header(headers, name)
+        if value:
+            key += f"\n{name}: {value}"
+    return key
+
+
+def _header(headers, name):
+    for key, value in (headers or {}).items():
+        if key.lower() == name.lower():
+            return value
+    return None
+
+
+class Cassette:
+    def __init__(self, path, mode=CASSETTE_MODE):
+        """
+        Open (and create if needed) a cassette.
+
+        Args:
+            path (str): Path to the SQLite cassette file
+            mode (str): "record" or "replay"
+
+        Raises:
+            FileNotFoundError: Replaying a cassette that does not exist
+        """
+        if mode not in ("record", "replay"):
+            print(f"Unknown cassette mode '{mode}', replaying")
+            mode = "replay"
+        if mode == "replay" and not os.path.exists(path):
+            raise FileNotFoundError(f"No cassette at {path} to replay")
+        self.path = path
+        self.mode = mode
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        self.lock = threading.Lock()
+        self.pending = []
+        self.recorded = 0
+        self.replayed = 0
+        self.misses = 0
+        # request key -> row ids in recording order, and how many were replayed
+        self.rows = {}
+        self.played = {}
+        origins = set()
+        for row_id, key, url in self.conn.execute("SELECT id, request, url FROM interactions ORDER BY id"):
+            self.rows.setdefault(key, []).append(row_id)
+            origins.add("{0.scheme}://{0.netloc}".format(urlparse(url)))
+        if mode == "replay":
+            for origin in origins:
+                rate_limiter.configure_host(origin, REPLAY_RATE, burst=int(REPLAY_RATE))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __len__(self):
+        return sum(len(row_ids) for row_ids in self.rows.values())
+
+    # --- record ---
+    def record(self, method, url, headers, resp):
+        """Store the final response to a request"""
+        stored_headers = {name: value for name, value in resp.headers.items()
+                          if name.lower() not in DROP_HEADERS}
+        row = (request_key(method, url, headers), url, resp.status_code, resp.reason,
+               json.dumps(stored_headers), resp.content, resp.encoding, time.time())
+        with self.lock:
+            self.pending.append(row)
+            self.recorded += 1
+            if len(self.pending) >= FLUSH_EVERY:
+                self._flush()
+
+    def _flush(self):
+        if self.pending and self.conn:
+            with self.conn:
+                for row in self.pending:
+                    row_id = self.conn.execute(INSERT_SQL, row).lastrowid
+                    self.rows.setdefault(row[0], []).append(row_id)
+            self.pending = []
+
+    def flush(self):
+        """Write the buffered responses to disk"""
+        with self.lock:
+            self._flush()
+
+    # --- replay ---
+    def _next_row(self, key):
+        row_ids = self.rows.get(key)
+        if not row_ids:
+            return None
+        played = self.played.get(key, 0)
+        self.played[key] = played + 1
+        return row_ids[min(played, len(row_ids) - 1)]
+
+    def replay(self, method, url, headers=None):
+        """
+        The recorded response to a request.
+
+        Raises:
+            requests.ConnectionError: The request was never recorded
+        """
+        with self.lock:
+            row_id = self._next_row(request_key(method, url, headers))
+            if row_id is None:
+                # Validators from a different page cache: the full response still answers it
+                row_id = self._next_row(request_key(method, url))
+            if row_id is None:
+                self.misses += 1
+                raise requests.ConnectionError(f"{method.upper()} {url} is not in cassette {self.path}")
+            status, reason, stored_headers, body, encoding = self.conn.execute(
+                "SELECT status, reason, headers, body, encoding FROM interactions WHERE id = ?", (row_id,)
+            ).fetchone()
+            self.replayed += 1
+        resp = requests.Response()
+        resp.status_code = status
+        resp.reason = reason
+        resp.headers = CaseInsensitiveDict(json.loads(stored_headers))
+        resp._content = bytes(body)
+        resp.encoding = encoding
+        resp.url = url
+        resp.request = requests.Request(method.upper(), url, headers=headers).prepare()
+        return resp
+
+    def close(self):
+        """Flush and close the cassette"""
+        with self.lock:
+            if self.conn:
+                self._flush()
+                self.conn.close()
+                self.conn = None
+
+
+_active = None
+_active_lock = threading.Lock()
+
+
+def isolate_state(directory=None):
+    """
+    Move the process into its own working directory, so the videos and the
+    crawl state a scraper keeps next to videos.json start empty.
+
+    Args:
+        directory (str): Directory to use; None or "temp" for a fresh temporary one
+
+    Returns:
+        str: The directory
+    """
+    if not directory or directory == "temp":
+        directory = tempfile.mkdtemp(prefix="whentai-cassette-")
+    directory = os.path.abspath(directory)
+    os.makedirs(directory, exist_ok=True)
+    os.chdir(directory)
+    print(f"Cassette run: videos and crawl state are kept in {directory}")
+    return directory
+
+
+def prepare_run():
+    """
+    Open the WHENTAI_CASSETTE cassette, and start the run in
+    WHENTAI_CASSETTE_STATE when that is set; a no-op without a cassette.
+    Called by the scrapers' __main__ before they open any store, so a
+    missing cassette stops the run before it starts.
+
+    Raises:
+        FileNotFoundError: Replaying a cassette that does not exist
+    """
+    if not CASSETTE_FILE:
+        return
+    active()
+    if CASSETTE_STATE:
+        isolate_state(CASSETTE_STATE)
+
+
+def use_cassette(path, mode=CASSETTE_MODE, isolate=False):
+    """
+    Route http_client requests through a cassette (None ejects it).
+
+    Args:
+        path (str): Cassette file, or None
+        mode (str): "record" or "replay"
+        isolate (bool): First move into a fresh temporary directory (isolate_state)
+
+    Returns:
+        Cassette: The active cassette, or None
+    """
+    global _active
+    if path and isolate:
+        path = os.path.abspath(path)
+        isolate_state()
+    with _active_lock:
+        if _active is not None:
+            _active.close()
+        _active = Cassette(path, mode) if path else None
+        return _active
+
+
+def active():
+    """The cassette http_client requests go through, opened from WHENTAI_CASSETTE on first use"""
+    global _active
+    if _active is None and CASSETTE_FILE:
+        with _active_lock:
+            if _active is None:
+                _active = Cassette(CASSETTE_FILE, CASSETTE_MODE)
+                atexit.register(eject)
+                print(f"{'Recording to' if _active.mode == 'record' else 'Replaying'} cassette {CASSETTE_FILE}")
+    return _active
+
+
+def eject():
+    """Close the active cassette, writing what was recorded"""
+    global _active
+    with _active_lock:
+        if _active is not None:
+            cassette = _active
+            _active = None
+            cassette.close()
+            if cassette.mode == "record":
+                print(f"Recorded {cassette.recorded} responses to {cassette.path}")
+            else:
+                print(f"Replayed {cassette.replayed} responses from {cassette.path} ({cassette.misses} not recorded)")
+
+
+def main(argv):
+    """Show or clear a cassette"""
+    command = argv[1] if len(argv) > 1 else "show"
+    path = argv[2] if len(argv) > 2 else CASSETTE_FILE
+    if command not in ("show", "clear") or not path:
+        print("Usage: python cassette.py show|clear [file]   (or set WHENTAI_CASSETTE)")
+        return False
+    if not os.path.exists(path):
+        print(f"No cassette at {path}")
+        return False
+    with Cassette(path, "record") as cassette:
+        if command == "clear":
+            with cassette.conn:
+                cassette.conn.execute("DELETE FROM interactions")
+            print(f"Cleared {path}")
+            return True
+        rows = cassette.conn.execute(
+            "SELECT request, status, LENGTH(body) FROM interactions ORDER BY id"
+        ).fetchall()
+        print(f"{path}: {len(rows)} responses, {sum(size for _, _, size in rows) / 1e6:.1f} MB")
+        for key, status, size in rows:
+            print(f"  {status} {key.splitlines()[0]} ({size} bytes)")
+    return True
+
+
+if __name__ == "__main__":
+    success = main(sys.argv)
+    sys.exit(0 if success else 1)
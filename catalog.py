@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+SQLite-backed video catalog for WHentai
+
+Stores one row per video with indexes on detail_url, thumbnail id, title and
+scraped_at, so scrapers and repair scripts can upsert only the rows they touch
+instead of re-serializing the whole videos.json on every pass.
+
+The static frontend still reads videos.json. Use the import/export bridge to
+move data between the two:
+
+    python catalog.py import [videos.json]   # seed the catalog from JSON
+    python catalog.py export [videos.json]   # regenerate JSON for the frontend
+    python catalog.py stats
+
+Set WHENTAI_STORAGE=sqlite to make the scrapers and repair scripts write to the
+catalog instead of videos.json, or WHENTAI_STORAGE=jsonl to use the append-only
+log in video_log.py.
+"""
+
+import json
+import os
+import re
+import sqlite3
+import sys
+
+from out_token import public_id_from_detail_url
+from seen_set import seen_set
+
+# === CONFIG ===
+CATALOG_DB = "videos.db"
+JSON_FILE = "videos.json"
+# "json" keeps the original behaviour, "sqlite" routes writes through the catalog,
+# "jsonl" appends to the JSON Lines log (video_log.py)
+STORAGE_MODE = os.environ.get("WHENTAI_STORAGE", "json").strip().lower()
+
+THUMBNAIL_ID_PATTERN = re.compile(r'/thumbnail/([^/]+)/')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS videos (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    key TEXT NOT NULL UNIQUE,
+    detail_url TEXT,
+    thumbnail_id TEXT,
+    title_key TEXT,
+    scraped_at TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_videos_detail_url ON videos (detail_url);
+CREATE INDEX IF NOT EXISTS idx_videos_thumbnail_id ON videos (thumbnail_id);
+CREATE INDEX IF NOT EXISTS idx_videos_title ON videos (title_key);
+CREATE INDEX IF NOT EXISTS idx_videos_scraped_at ON videos (scraped_at);
+"""
+
+UPSERT_SQL = """
+INSERT INTO videos (key, detail_url, thumbnail_id, title_key, scraped_at, data)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT(key) DO UPDATE SET
+    detail_url = excluded.detail_url,
+    thumbnail_id = excluded.thumbnail_id,
+    title_key = excluded.title_key,
+    scraped_at = excluded.scraped_at,
+    data = excluded.data
+"""
+
+
+def use_catalog():
+    """Return True when scripts should read and write through the SQLite catalog"""
+    return STORAGE_MODE == "sqlite"
+
+
+def use_video_log():
+    """Return True when scripts should append to the JSON Lines video log"""
+    return STORAGE_MODE == "jsonl"
+
+
+def extract_thumbnail_id(thumbnail_url):
+    """Extract thumbnail ID from URL"""
+    if not thumbnail_url or not isinstance(thumbnail_url, str):
+        return ""
+    match = THUMBNAIL_ID_PATTERN.search(thumbnail_url)
+    if match:
+        return match.group(1).strip()
+    return ""
+
+
+def title_key(title):
+    """Normalize a title the same way the title deduplication does"""
+    return (title or "").strip().lower()
+
+
+def video_key(video):
+    """
+    Stable identity of a video: the detail URL when there is one, otherwise
+    the thumbnail id, otherwise the normalized title.
+    """
+    detail_url = (video.get('detail_url') or '').strip()
+    if detail_url and detail_url != '#':
+        return detail_url
+    thumb_id = extract_thumbnail_id(video.get('thumbnail', ''))
+    if thumb_id:
+        return f"thumb:{thumb_id}"
+    return f"title:{title_key(video.get('title', ''))}"
+
+
+def _row_for(video):
+    """Build the column tuple stored for a video"""
+    detail_url = video.get('detail_url') or ''
+    return (
+        video_key(video),
+        detail_url,
+        extract_thumbnail_id(video.get('thumbnail', '')),
+        title_key(video.get('title', '')),
+        video.get('scraped_at') or '',
+        json.dumps(video, ensure_ascii=False, separators=(',', ':')),
+    )
+
+
+class VideoCatalog:
+    def __init__(self, db_path=CATALOG_DB):
+        """
+        Open (and create if needed) the catalog database.
+
+        Args:
+            db_path (str): Path to the SQLite database file
+        """
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __len__(self):
+        return self.count()
+
+    def count(self):
+        """Number of videos in the catalog"""
+        return self.conn.execute("SELECT COUNT(*) FROM videos").fetchone()[0]
+
+    def upsert(self, video):
+        """Insert or update a single video"""
+        return self.upsert_many([video])
+
+    def upsert_many(self, videos):
+        """
+        Insert or update videos in one transaction.
+
+        Existing rows keep their position in the catalog, so exports stay in
+        the order videos were first seen.
+
+        Returns:
+            int: Number of videos written
+        """
+        rows = [_row_for(video) for video in videos]
+        if not rows:
+            return 0
+        with self.conn:
+            self.conn.executemany(UPSERT_SQL, rows)
+        return len(rows)
+
+    def delete_ids(self, row_ids):
+        """Delete videos by row id"""
+        row_ids = list(row_ids)
+        if not row_ids:
+            return 0
+        with self.conn:
+            self.conn.executemany("DELETE FROM videos WHERE id = ?", [(i,) for i in row_ids])
+        return len(row_ids)
+
+    def get(self, detail_url):
+        """Return the video stored for a detail URL, or None"""
+        row = self.conn.execute(
+            "SELECT data FROM videos WHERE detail_url = ? LIMIT 1", (detail_url,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _exists(self, column, value):
+        if not value:
+            return False
+        query = f"SELECT 1 FROM videos WHERE {column} = ? LIMIT 1"
+        return self.conn.execute(query, (value,)).fetchone() is not None
+
+    def has_key(self, key):
+        return self._exists("key", key)
+
+    def has_detail_url(self, detail_url):
+        return self._exists("detail_url", detail_url)
+
+    def has_thumbnail_id(self, thumb_id):
+        return self._exists("thumbnail_id", thumb_id)
+
+    def has_title(self, title):
+        return self._exists("title_key", title_key(title))
+
+    def contains(self, video):
+        """True if the video, or another video with the same title, is already stored"""
+        return self.has_key(video_key(video)) or self.has_title(video.get('title', ''))
+
+    def iter_rows(self):
+        """Yield (row_id, video) pairs in insertion order"""
+        cursor = self.conn.execute("SELECT id, data FROM videos ORDER BY id")
+        for row_id, data in cursor:
+            yield row_id, json.loads(data)
+
+    def iter_videos(self):
+        """Yield videos in insertion order"""
+        for _, video in self.iter_rows():
+            yield video
+
+    def videos_since(self, iso_timestamp):
+        """Return videos scraped at or after an ISO timestamp (uses the scraped_at index)"""
+        cursor = self.conn.execute(
+            "SELECT data FROM videos WHERE scraped_at >= ? ORDER BY id", (iso_timestamp,)
+        )
+        return [json.loads(data) for (data,) in cursor]
+
+    def import_json(self, file_path=JSON_FILE):
+        """
+        Load a videos.json file into the catalog.
+
+        Returns:
+            int: Number of videos imported
+        """
+        with open(file_path, 'r', encoding='utf-8') as f:
+            videos = json.load(f)
+        if isinstance(videos, dict):
+            videos = videos.get('videos', list(videos.values()))
+        return self.upsert_many(videos)
+
+    def export_json(self, file_path=JSON_FILE):
+        """
+        Write the catalog to a JSON array file for the static frontend.
+
+        The output has the same layout as json.dump(..., indent=2) and is
+        streamed row by row, then moved into place atomically.
+
+        Returns:
+            int: Number of videos exported
+        """
+        tmp_path = file_path + ".tmp"
+        count = 0
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write("[")
+            for video in self.iter_videos():
+                body = json.dumps(video, indent=2, ensure_ascii=False).replace("\n", "\n  ")
+                f.write(",\n  " if count else "\n  ")
+                f.write(body)
+                count += 1
+            f.write("\n]" if count else "]")
+        os.replace(tmp_path, file_path)
+        return count
+
+    def close(self):
+        """Close the database connection"""
+        if self.conn:
+            self.conn.close()
+            self.conn = None
+
+
+class KnownVideos:
+    def __init__(self, videos=None, catalog=None):
+        """
+        Detail URLs and thumbnail ids of the videos already stored, for
+        incremental crawls that stop paging once they reach known videos.
+
+        Args:
+            videos (iterable): Loaded videos (json/jsonl storage)
+            catalog (VideoCatalog): Open catalog, queried through its indexes instead
+        """
+        self.catalog = catalog
+        # /out/ detail URLs are long; with WHENTAI_SEEN_SET=bloom they are kept on disk
+        self.detail_urls = seen_set(len(videos) if hasattr(videos, "__len__") else 0)
+        self.thumbnail_ids = set()
+        for video in videos or ():
+            self.add(video)
+
+    @staticmethod
+    def thumbnail_id(video):
+        """Thumbnail id of a video; taken from the detail URL's token when the thumbnail has none"""
+        return (extract_thumbnail_id(video.get('thumbnail', ''))
+                or public_id_from_detail_url(video.get('detail_url') or ''))
+
+    def add(self, video):
+        detail_url = video.get('detail_url') or ''
+        if detail_url and detail_url != '#':
+            self.detail_urls.add(detail_url)
+        thumb_id = self.thumbnail_id(video)
+        if thumb_id:
+            self.thumbnail_ids.add(thumb_id)
+
+    def __contains__(self, video):
+        detail_url = video.get('detail_url') or ''
+        # The same video gets a different /out/ token on each listing, so the
+        # thumbnail id is what usually matches
+        thumb_id = self.thumbnail_id(video)
+        if detail_url in self.detail_urls or thumb_id in self.thumbnail_ids:
+            return True
+        if self.catalog is not None:
+            return self.catalog.has_detail_url(detail_url) or self.catalog.has_thumbnail_id(thumb_id)
+        return False
+
+
+def main(argv):
+    """Command line entry point for the import/export bridge"""
+    if len(argv) < 2 or argv[1] not in ("import", "export", "stats"):
+        print("Usage: python catalog.py import|export|stats [videos.json] [videos.db]")
+        return False
+
+    command = argv[1]
+    json_path = argv[2] if len(argv) > 2 else JSON_FILE
+    db_path = argv[3] if len(argv) > 3 else CATALOG_DB
+
+    with VideoCatalog(db_path) as catalog:
+        if command == "import":
+            count = catalog.import_json(json_path)
+            print(f"Imported {count} videos from {json_path} into {db_path}")
+            print(f"Catalog now holds {catalog.count()} videos")
+        elif command == "export":
+            count = catalog.export_json(json_path)
+            print(f"Exported {count} videos from {db_path} to {json_path}")
+        else:
+            print(f"Catalog {db_path}: {catalog.count()} videos")
+    return True
+
+
+if __name__ == "__main__":
+    success = main(sys.argv)
+    sys.exit(0 if success else 1)
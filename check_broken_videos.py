@@ -10,6 +10,8 @@ import os
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import time
 
+import http_client
+
 def load_videos(file_path):
     """Load videos from JSON file"""
     try:
@@ -44,7 +46,7 @@ def check_thumbnail_url(thumbnail_url, timeout=5):
     
     try:
         # Just check if we can connect, don't download the whole image
-        response = requests.head(thumbnail_url, timeout=timeout, allow_redirects=True)
+        response = http_client.head(thumbnail_url, timeout=timeout, allow_redirects=True)
         return response.status_code == 200, f"Status: {response.status_code}"
     except requests.exceptions.RequestException as e:
         return False, str(e)
@@ -69,7 +71,7 @@ def check_video_links(video, timeout=5):
     # Check external URL if present
     if 'external_url' in video and video['external_url'] and video['external_url'].strip() != '':
         try:
-            response = requests.head(video['external_url'], timeout=timeout, allow_redirects=True)
+            response = http_client.head(video['external_url'], timeout=timeout, allow_redirects=True)
             results['external_url_ok'] = response.status_code < 400 or response.status_code == 403  # 403 might be okay
             results['external_url_error'] = f"Status: {response.status_code}"
         except requests.exceptions.RequestException as e:
@@ -82,7 +84,7 @@ def check_video_links(video, timeout=5):
     # Check detail URL if present
     if 'detail_url' in video and video['detail_url'] and video['detail_url'].strip() != '' and video['detail_url'] != '#':
         try:
-            response = requests.head(video['detail_url'], timeout=timeout, allow_redirects=True)
+            response = http_client.head(video['detail_url'], timeout=timeout, allow_redirects=True)
             results['detail_url_ok'] = response.status_code < 400 or response.status_code == 403  # 403 might be okay
             results['detail_url_error'] = f"Status: {response.status_code}"
         except requests.exceptions.RequestException as e:
@@ -105,7 +107,8 @@ def analyze_videos(videos, sample_size=100):
     broken_external_urls = []
     broken_detail_urls = []
     
-    # Use threading to check URLs in parallel
+    # Use threading to check URLs in parallel, sharing one connection pool
+    http_client.configure(pool_size=10)
     with ThreadPoolExecutor(max_workers=10) as executor:
         # Submit all tasks
         future_to_video = {executor.submit(check_video_links, video): video for video in sample_videos}
@@ -1,5 +1,7 @@
 import json
 
+from json_stream import JSONStreamError, iter_videos, read_around
+
 def check_json():
     try:
         # Try to parse the JSON file
@@ -11,31 +13,31 @@ def check_json():
             print("...")
             print(beginning[-200:])
             
-        # Now try to parse the entire file
-        with open('videos.json', 'r', encoding='utf-8') as f:
-            # Try to load and parse the JSON
-            data = json.load(f)
-            print(f"\nSuccessfully parsed JSON with {len(data)} entries")
+        # Now stream through the entire file, keeping only the first and last entry
+        count = 0
+        first = last = None
+        for video in iter_videos('videos.json'):
+            if first is None:
+                first = video
+            last = video
+            count += 1
+        print(f"\nSuccessfully parsed JSON with {count} entries")
+        
+        # Check the structure of the first few entries
+        print("\nFirst entry:")
+        if first is not None:
+            print(json.dumps(first, indent=2))
             
-            # Check the structure of the first few entries
-            print("\nFirst entry:")
-            if data:
-                print(json.dumps(data[0], indent=2))
+        # Check the structure of the last few entries
+        print("\nLast entry:")
+        if last is not None:
+            print(json.dumps(last, indent=2))
                 
-            # Check the structure of the last few entries
-            print("\nLast entry:")
-            if data:
-                print(json.dumps(data[-1], indent=2))
-                
-    except json.JSONDecodeError as e:
+    except JSONStreamError as e:
         print(f"JSON parsing error at position {e.pos}: {e.msg}")
-        # Try to read around the error position
-        with open('videos.json', 'r', encoding='utf-8') as f:
-            content = f.read()
-            start = max(0, e.pos - 100)
-            end = min(len(content), e.pos + 100)
-            print(f"Content around error position {e.pos}:")
-            print(content[start:end])
+        # Read only the text around the error position
+        print(f"Content around error position {e.pos}:")
+        print(read_around('videos.json', e.pos, 100))
     except Exception as e:
         print(f"Error: {e}")
 
@@ -5,13 +5,15 @@ This scraper attempts to gather videos from multiple sources to maximize the vid
 """
 
 import json
-import time
-import random
 import requests
-from bs4 import BeautifulSoup
 from urllib.parse import urljoin, urlparse
 import os
 
+import http_client
+from catalog import use_video_log
+from extraction_spec import VIDEO_CARDS
+from video_log import VideoLog, append_new_videos
+
 # List of categories to scrape
 CATEGORIES = [
     'hentai', '3d', 'anime', 'cartoon', 'toon', 'manga', 'animation',
@@ -39,13 +41,14 @@ HEADERS = {
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
     'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
     'Accept-Language': 'en-US,en;q=0.5',
-    'Accept-Encoding': 'gzip, deflate',
     'Connection': 'keep-alive',
     'Upgrade-Insecure-Requests': '1',
 }
 
 def load_existing_videos():
-    """Load existing videos from videos.json"""
+    """Load existing videos from videos.json (or the JSON Lines log)"""
+    if use_video_log():
+        return {video.get('id'): video for video in VideoLog().load()}
     try:
         with open('videos.json', 'r', encoding='utf-8') as f:
             content = f.read().strip()
@@ -70,66 +73,36 @@ def save_videos(videos):
 
 def get_page(url, retries=3):
     """Fetch a page with retry logic"""
+    # 429/503 and Retry-After are handled by http_client; the rate limiter
+    # spaces out retries and slows the host down when errors pile up
     for attempt in range(retries):
         try:
-            response = requests.get(url, headers=HEADERS, timeout=10)
+            response = http_client.get(url, headers=HEADERS, timeout=10)
             response.raise_for_status()
             return response
         except requests.RequestException as e:
             print(f"Error fetching {url} (attempt {attempt + 1}/{retries}): {e}")
-            if attempt < retries - 1:
-                time.sleep(2 ** attempt)  # Exponential backoff
-            else:
-                return None
+    return None
 
-def extract_video_info(video_element, base_url):
-    """Extract video information from a video element"""
-    try:
-        # Extract title
-        title_element = video_element.find('h3') or video_element.find('h2') or video_element.find('a')
-        title = title_element.get_text(strip=True) if title_element else "Unknown Title"
-        
-        # Extract URL
-        link_element = video_element.find('a')
-        if link_element and link_element.get('href'):
-            url = urljoin(base_url, link_element['href'])
-        else:
-            url = "#"
-        
-        # Extract thumbnail
-        thumb_element = video_element.find('img')
-        thumbnail = thumb_element.get('src') or thumb_element.get('data-src') if thumb_element else ""
-        if thumbnail:
-            thumbnail = urljoin(base_url, thumbnail)
-        
-        # Extract duration if available
-        duration = ""
-        duration_element = video_element.find('span', class_='duration') or video_element.find('div', class_='duration')
-        if duration_element:
-            duration = duration_element.get_text(strip=True)
-        
-        # Extract views if available
-        views = ""
-        views_element = video_element.find('span', class_='views') or video_element.find('div', class_='views')
-        if views_element:
-            views = views_element.get_text(strip=True)
-        
-        # Create a unique ID based on URL or title
-        video_id = url.split('/')[-1] if url != "#" and url else title.replace(' ', '-').lower()
-        
-        return {
-            'id': video_id,
-            'title': title,
-            'url': url,
-            'thumbnail': thumbnail,
-            'duration': duration,
-            'views': views,
-            'detail_url': url,
-            'external_url': url
-        }
-    except Exception as e:
-        print(f"Error extracting video info: {e}")
-        return None
+def extract_video_info(card, base_url):
+    """Build a video record from a card extracted with extraction_spec.VIDEO_CARDS"""
+    title = card['title'] or "Unknown Title"
+    url = urljoin(base_url, card['detail_url']) if card['detail_url'] else "#"
+    thumbnail = urljoin(base_url, card['thumbnail']) if card['thumbnail'] else ""
+    
+    # Create a unique ID based on URL or title
+    video_id = url.split('/')[-1] if url != "#" and url else title.replace(' ', '-').lower()
+    
+    return {
+        'id': video_id,
+        'title': title,
+        'url': url,
+        'thumbnail': thumbnail,
+        'duration': card['duration'],
+        'views': card['views'],
+        'detail_url': url,
+        'external_url': url
+    }
 
 def scrape_category(category, existing_videos, max_pages=5):
     """Scrape a specific category"""
@@ -145,18 +118,8 @@ def scrape_category(category, existing_videos, max_pages=5):
             print(f"Failed to fetch page {page} for category {category}")
             continue
             
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # Find video elements (adjust selectors based on actual site structure)
-        video_elements = soup.find_all('div', class_='video-item') or \
-                         soup.find_all('div', class_='item') or \
-                         soup.find_all('div', class_='thumb') or \
-                         soup.find_all('li', class_='video') or \
-                         soup.find_all('article')
-        
-        if not video_elements:
-            # Try alternative selectors
-            video_elements = soup.find_all('a', href=lambda x: x and '/video/' in x)
+        # Card selectors (and the fallback to plain links) live in extraction_spec.VIDEO_CARD_SPEC
+        video_elements = VIDEO_CARDS.extract(response.text)
         
         if not video_elements:
             print(f"No video elements found on page {page}")
@@ -170,9 +133,6 @@ def scrape_category(category, existing_videos, max_pages=5):
                 # Only add if it's not already in existing videos or new videos
                 new_videos[video_info['id']] = video_info
                 print(f"Added new video: {video_info['title']}")
-        
-        # Add a delay to be respectful to the server
-        time.sleep(random.uniform(1, 3))
     
     return new_videos
 
@@ -190,17 +150,8 @@ def scrape_popular(existing_videos, max_pages=5):
             print(f"Failed to fetch popular page {page}")
             continue
             
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # Find video elements
-        video_elements = soup.find_all('div', class_='video-item') or \
-                         soup.find_all('div', class_='item') or \
-                         soup.find_all('div', class_='thumb') or \
-                         soup.find_all('li', class_='video') or \
-                         soup.find_all('article')
-        
-        if not video_elements:
-            video_elements = soup.find_all('a', href=lambda x: x and '/video/' in x)
+        # Card selectors (and the fallback to plain links) live in extraction_spec.VIDEO_CARD_SPEC
+        video_elements = VIDEO_CARDS.extract(response.text)
         
         if not video_elements:
             print(f"No video elements found on popular page {page}")
@@ -213,8 +164,6 @@ def scrape_popular(existing_videos, max_pages=5):
             if video_info and video_info['id'] and video_info['id'] not in existing_videos and video_info['id'] not in new_videos:
                 new_videos[video_info['id']] = video_info
                 print(f"Added new popular video: {video_info['title']}")
-        
-        time.sleep(random.uniform(1, 3))
     
     return new_videos
 
@@ -239,14 +188,16 @@ def main():
         category_videos = scrape_category(category, existing_videos, max_pages=2)
         all_new_videos.update(category_videos)
         print(f"Found {len(category_videos)} new videos in category {category}")
-        time.sleep(random.uniform(2, 5))  # Longer delay between categories
     
     # Combine existing and new videos
     combined_videos = existing_videos.copy()
     combined_videos.update(all_new_videos)
     
-    # Save all videos
-    save_videos(combined_videos)
+    # Save all videos - the JSON Lines log only needs the new videos appended
+    if use_video_log():
+        append_new_videos(all_new_videos.values())
+    else:
+        save_videos(combined_videos)
     
     print(f"\n=== Scraping Summary ===")
     print(f"Existing videos: {len(existing_videos)}")
@@ -4,49 +4,24 @@ Accurate video counter for WHentai
 This script counts the number of video objects in the videos.json file
 """
 
-import json
 import os
 
+from json_stream import JSONStreamError, iter_videos
+
 def count_videos_accurate(file_path):
-    """Count videos in JSON file accurately"""
-    content = ""
+    """Count videos in JSON file accurately, streaming one object at a time"""
+    count = 0
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read().strip()
-            
-        # Fix any issues with the JSON format
-        if content.endswith(','):
-            content = content[:-1] + ']'
-            
-        # Parse the JSON
-        data = json.loads(content)
-        
-        # Count the video objects
-        if isinstance(data, list):
-            return len(data)
-        elif isinstance(data, dict):
-            # If it's a dict, look for a videos key or count all items
-            if 'videos' in data:
-                return len(data['videos'])
-            else:
-                return len(data)
-        else:
-            return 0
-            
-    except json.JSONDecodeError as e:
+        for _ in iter_videos(file_path):
+            count += 1
+        return count
+    except JSONStreamError as e:
+        # Report how many complete objects were read before the file broke off
         print(f"JSON decode error: {e}")
-        # Try to count manually by looking for object separators
-        try:
-            # Count the number of '},' patterns and add 1 for the last object
-            object_count = content.count('},')
-            if content.strip().endswith('}'):
-                object_count += 1
-            return object_count
-        except:
-            return 0
+        return count
     except Exception as e:
         print(f"Error counting videos: {e}")
-        return 0
+        return count
 
 def main():
     """Main function"""
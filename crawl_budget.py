@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Yield-driven page budgets for the mega crawl's category sources
+
+Every source in mega_scraper.ADDITIONAL_SOURCES used to get the same
+MAX_PAGES_PER_CATEGORY pages, although most categories list the same videos
+as /category/hentai and /popular. The planner remembers, per source and page
+number, how many new videos a page yielded, as a moving average over runs:
+
+  - a video counts as new when it was not stored yet
+  - a new video listed n times in the same run (by several sources, or on
+    several pages) counts 1/n on each, so overlapping categories earn little
+
+Before a run, a fixed total of listing requests (CRAWL_BUDGET) is handed out
+greedily by marginal yield: the source whose next pages promise the most new
+videos per request gets them, until the budget is spent. Every source keeps
+MIN_PAGES pages so a quiet category is still measured; pages never fetched
+count with the yield of the deepest page seen before them, and sources never
+crawled with PRIOR_YIELD, so they get explored. No page is expected to yield
+less than EXPLORE_YIELD, so pages that found nothing are revisited with the
+budget the productive pages leave over instead of never again. Pages whose
+fetch failed are not recorded: an error says nothing about their yield.
+
+The plan caps the pages of each source. An incremental crawl (mega_scraper's
+INCREMENTAL_STOP_PAGES) still stops a source early once its pages list only
+known videos; the pages it leaves unused are not handed to other sources in
+the same run, and the recorded yields of those pages do not change.
+
+    python crawl_budget.py           # show the yields and the next plan
+    python crawl_budget.py clear     # forget them
+"""
+
+import heapq
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import Counter
+
+from catalog import KnownVideos, video_key
+
+# === CONFIG ===
+CRAWL_BUDGET_DB = "crawl_budget.db"
+# Listing requests per run across all sources; 0 gives every source the full page count
+CRAWL_BUDGET = int(os.environ.get("WHENTAI_CRAWL_BUDGET", "1600"))
+MIN_PAGES = 1          # pages every source gets, so its yield keeps being measured
+PRIOR_YIELD = 20.0     # new videos per page assumed for sources never crawled
+EXPLORE_YIELD = 0.5    # lowest expected yield of a page, so pages that found nothing are retried
+SMOOTHING = 0.5        # weight of the latest run in the moving average
+MAX_AGE = 30 * 24 * 3600  # yields not measured for a month are learned again
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS yields (
+    source TEXT NOT NULL,
+    page INTEGER NOT NULL,
+    yield REAL NOT NULL,
+    runs INTEGER NOT NULL DEFAULT 0,
+    updated REAL NOT NULL,
+    PRIMARY KEY (source, page)
+);
+"""
+
+UPSERT_SQL = """
+INSERT INTO yields (source, page, yield, runs, updated)
+VALUES (?, ?, ?, ?, ?)
+ON CONFLICT(source, page) DO UPDATE SET
+    yield = excluded.yield,
+    runs = excluded.runs,
+    updated = excluded.updated
+"""
+
+
+def overlap_key(video):
+    """Identity of a video across listings: /out/ detail URLs differ per listing, thumbnail ids do not"""
+    return KnownVideos.thumbnail_id(video) or video_key(video)
+
+
+def page_yields(results, page_sizes, known=None):
+    """
+    New videos found on each page of each source, sharing a video listed on
+    several pages between them.
+
+    Args:
+        results (dict): start_url -> videos in page order (CrawlEngine.crawl)
+        page_sizes (dict): start_url -> videos on each page, None for a
+            page that could not be fetched (CrawlEngine.page_sizes)
+        known (container): Videos already stored (e.g. catalog.KnownVideos)
+
+    Returns:
+        dict: start_url -> [new videos on page 1, page 2, ...], None for a
+        page that could not be fetched
+    """
+    listed = Counter()
+    for videos in results.values():
+        for video in videos:
+            if known is None or video not in known:
+                listed[overlap_key(video)] += 1
+    yields = {}
+    for url, videos in results.items():
+        position = 0
+        yields[url] = []
+        for size in page_sizes.get(url, []):
+            if size is None:
+                yields[url].append(None)
+                continue
+            new = 0.0
+            for video in videos[position:position + size]:
+                times = listed.get(overlap_key(video))
+                if times:
+                    new += 1.0 / times
+            yields[url].append(new)
+            position += size
+    return yields
+
+
+class CrawlBudget:
+    def __init__(self, db_path=CRAWL_BUDGET_DB, max_age=MAX_AGE):
+        """
+        Open (and create if needed) the recorded page yields.
+
+        Args:
+            db_path (str): Path to the SQLite database file
+            max_age (int): Seconds after which a yield that was not measured again is forgotten
+        """
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        with self.conn:
+            self.conn.execute("DELETE FROM yields WHERE updated < ?", (time.time() - max_age,))
+        self.lock = threading.Lock()
+        self.yields = {}  # source -> {page: (yield, runs)}
+        for source, page, value, runs in self.conn.execute("SELECT source, page, yield, runs FROM yields"):
+            self.yields.setdefault(source, {})[page] = (value, runs)
+        self.dirty = set()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def expected(self, source, max_pages):
+        """Expected new videos on pages 1..max_pages of a source, at least EXPLORE_YIELD each"""
+        pages = self.yields.get(source)
+        if not pages:
+            return [PRIOR_YIELD] * max_pages
+        expected = []
+        carried = PRIOR_YIELD
+        for page in range(1, max_pages + 1):
+            if page in pages:
+                carried = pages[page][0]
+            expected.append(max(carried, EXPLORE_YIELD))
+        return expected
+
+    def plan(self, sources, max_pages, budget=CRAWL_BUDGET):
+        """
+        Split `budget` listing requests between the sources by marginal yield.
+
+        Args:
+            sources (list): Start URLs
+            max_pages (int): Most pages for one source
+            budget (int): Total pages to hand out; 0 gives every source max_pages
+
+        Returns:
+            dict: start_url -> pages to crawl
+        """
+        if budget <= 0 or budget >= len(sources) * max_pages:
+            return {source: max_pages for source in sources}
+        with self.lock:
+            expected = {source: self.expected(source, max_pages) for source in sources}
+        pages = {source: min(MIN_PAGES, max_pages, budget // max(1, len(sources))) for source in sources}
+        left = budget - sum(pages.values())
+
+        def best_extension(order, source):
+            # The most new videos per request over the source's next pages,
+            # so a dip before richer pages is bridged; ties go to the shorter one
+            start = pages[source]
+            total = 0.0
+            best = None
+            for end in range(start + 1, max_pages + 1):
+                total += expected[source][end - 1]
+                rate = total / (end - start)
+                if best is None or rate > best[0]:
+                    best = (rate, end)
+            if best is not None and best[0] > 0:
+                # Equal rates go to the source with the fewest pages so far
+                heapq.heappush(heap, (-best[0], start, order, source, best[1]))
+
+        heap = []
+        for order, source in enumerate(sources):
+            best_extension(order, source)
+        while left > 0 and heap:
+            _, _, order, source, end = heapq.heappop(heap)
+            end = min(end, pages[source] + left)
+            left -= end - pages[source]
+            pages[source] = end
+            best_extension(order, source)
+        return pages
+
+    def record(self, yields):
+        """
+        Fold one run's page yields into the moving averages.
+
+        Args:
+            yields (dict): start_url -> [new videos on page 1, page 2, ...] (page_yields);
+                pages that could not be fetched (None) are skipped
+        """
+        with self.lock:
+            for source, values in yields.items():
+                pages = self.yields.setdefault(source, {})
+                for page, value in enumerate(values, 1):
+                    if value is None:
+                        continue
+                    old = pages.get(page)
+                    if old is None:
+                        pages[page] = (value, 1)
+                    else:
+                        pages[page] = (SMOOTHING * value + (1 - SMOOTHING) * old[0], old[1] + 1)
+                    self.dirty.add((source, page))
+
+    def flush(self):
+        """Write the changed yields to the database"""
+        with self.lock:
+            now = time.time()
+            rows = [(source, page) + self.yields[source][page] + (now,) for source, page in self.dirty]
+            self.dirty.clear()
+            if rows and self.conn:
+                with self.conn:
+                    self.conn.executemany(UPSERT_SQL, rows)
+
+    def close(self):
+        """Flush and close the database connection"""
+        if self.conn:
+            self.flush()
+            self.conn.close()
+            self.conn = None
+
+
+def main(argv):
+    """Show or clear the recorded yields, and the plan they give"""
+    with CrawlBudget() as budget:
+        if len(argv) > 1 and argv[1] == "clear":
+            with budget.conn:
+                budget.conn.execute("DELETE FROM yields")
+            print(f"Cleared {budget.db_path}")
+            return True
+        from mega_scraper import ADDITIONAL_SOURCES, MAX_PAGES_PER_CATEGORY
+        print(f"{budget.db_path}: yields of {len(budget.yields)} sources")
+        plan = budget.plan(ADDITIONAL_SOURCES, MAX_PAGES_PER_CATEGORY)
+        print(f"Next plan: {sum(plan.values())} requests (budget {CRAWL_BUDGET or 'unlimited'})")
+        for source in sorted(ADDITIONAL_SOURCES, key=lambda source: -plan[source]):
+            pages = budget.yields.get(source, {})
+            measured = ", ".join(f"{pages[page][0]:.1f}" for page in sorted(pages)[:5])
+            print(f"  {source}: {plan[source]} pages (new per page: {measured or 'not measured'})")
+    return True
+
+
+if __name__ == "__main__":
+    success = main(sys.argv)
+    sys.exit(0 if success else 1)
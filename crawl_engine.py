@@ -0,0 +1,507 @@
+#!/usr/bin/env python3
+"""
+Asyncio crawl engine for the WHentai scrapers
+
+Crawls many listing sources at once instead of one page at a time with a
+blocking sleep after every request. Concurrency is capped per host and in
+total, and the shared per-host token bucket in rate_limiter.py is awaited on
+the event loop, so adding more sources makes the crawl wider rather than
+hammering the site. The per-host cap follows the limiter's AIMD concurrency,
+so it shrinks while the host answers 429/503 and grows back afterwards.
+
+Requests run on worker threads through the shared pooled session in
+http_client.py (or any blocking fetch function, e.g. a Playwright fetch), and
+the scrapers' existing parse functions are reused unchanged. Parsing is CPU
+bound, so with parse_workers > 0 (the default on multi-core machines) it runs
+in a separate process pool instead of the fetch threads, where the GIL would
+serialize it; the records come back packed as tuples. A page holds one of a
+limited number of pipeline slots from its request until its records are back,
+so fetching pauses while the parse stage is behind instead of piling up HTML
+(WHENTAI_PARSE_WORKERS sets the number of parse processes, 0 turns them off).
+The parse processes are started with forkserver (spawn where that is not
+available), never forked from the crawling process: by then it runs the fetch
+threads and the shared HTTP session, whose locks a fork could copy held:
+
+    engine = CrawlEngine()
+    results = engine.crawl(urls, parse_video_cards, max_pages=30)
+    # {start_url: [video, ...], ...}
+
+Pages of a source are fetched PREFETCH_PAGES at a time: while page N is
+parsed, pages N+1.. are already in flight (within the per-host limits), and
+everything past the first empty page is dropped. Listings crawled with
+find_links learn their ?page=N (or /page/N/) URL scheme from the first
+page's pagination links and are walked the same way to max_pages, instead of
+only following the handful of page links the first page shows.
+"""
+
+import asyncio
+import contextlib
+import multiprocessing
+import os
+import re
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from urllib.parse import parse_qsl, urlparse
+
+import http_client
+import rate_limiter
+from page_cache import parser_key
+
+# === CONFIG ===
+MAX_CONCURRENCY = 16      # requests in flight across all hosts
+PER_HOST_CONCURRENCY = 4  # requests in flight per host
+TIMEOUT = 15
+
+
+def _default_parse_workers():
+    setting = os.environ.get("WHENTAI_PARSE_WORKERS", "auto").strip().lower()
+    if setting not in ("", "auto"):
+        return max(0, int(setting))
+    return min(8, (os.cpu_count() or 1) - 1)  # leave a core for the event loop and fetch threads
+
+
+PARSE_WORKERS = _default_parse_workers()  # parse processes; 0 parses on the fetch threads
+# Parse processes must not be forked from a process that already runs threads
+PARSE_START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+PARSE_BACKLOG = 2  # fetched pages that may wait per parse process before fetching pauses
+PREFETCH_PAGES = 4  # pages of one source in flight at once (the first empty page ends the source)
+
+PAGE_PARAMS = ("page", "p", "pg", "paged")  # query parameters that number listing pages
+PAGE_PATH = re.compile(r'/page/(\d+)/?$')
+
+
+def pack_records(items):
+    """
+    Pack a list of same-shaped dicts as (fields, [tuple, ...]) for the trip
+    back from a parse process; anything else is passed as (None, items).
+    """
+    if isinstance(items, list) and items and type(items[0]) is dict:
+        fields = tuple(items[0])
+        if all(type(item) is dict and tuple(item) == fields for item in items):
+            return fields, [tuple(item.values()) for item in items]
+    return None, items
+
+
+def unpack_records(packed):
+    fields, rows = packed
+    if fields is None:
+        return rows
+    return [dict(zip(fields, row)) for row in rows]
+
+
+def parse_packed(parse, html):
+    """Run in a parse process: parse a page and pack its records"""
+    return pack_records(parse(html))
+
+
+def parse_with_links(parse, find_links, html):
+    """Items and pagination links of a linked listing's first page"""
+    return [parse(html), find_links(html)]
+
+
+def numbered_page_url(start_url, page, param="page"):
+    """Build the ?page=N URL used by the category listings"""
+    if page <= 1:
+        return start_url
+    separator = "&" if "?" in start_url else "?"
+    return f"{start_url}{separator}{param}={page}"
+
+
+def path_page_url(start_url, page):
+    """Build a /page/N/ URL"""
+    if page <= 1:
+        return start_url
+    parsed = urlparse(start_url)
+    return parsed._replace(path=f"{parsed.path.rstrip('/')}/page/{page}/").geturl()
+
+
+def learn_page_url(start_url, links):
+    """
+    Work out how a listing numbers its pages from its pagination links: the
+    most common ?page=N style parameter or /page/N/ path among them.
+
+    Returns:
+        callable: page_url(n) for the pages of start_url, or None if the links
+            do not number pages
+    """
+    schemes = Counter()
+    for link in links:
+        parsed = urlparse(link)
+        for name, value in parse_qsl(parsed.query):
+            if name.lower() in PAGE_PARAMS and value.isdigit():
+                schemes[name] += 1
+                break
+        else:
+            if PAGE_PATH.search(parsed.path):
+                schemes[None] += 1
+    if not schemes:
+        return None
+    param = schemes.most_common(1)[0][0]
+    if param is None:
+        return partial(path_page_url, start_url)
+    return partial(numbered_page_url, start_url, param=param)
+
+
+class CrawlEngine:
+    def __init__(self, max_concurrency=MAX_CONCURRENCY, per_host=PER_HOST_CONCURRENCY,
+                 headers=None, timeout=TIMEOUT, fetcher=None, limiter=None, frontier=None,
+                 cache=None, request_options=None, hybrid=None, parse_workers=PARSE_WORKERS,
+                 prefetch=PREFETCH_PAGES):
+        """
+        Create a crawl engine.
+
+        Args:
+            max_concurrency (int): Requests in flight across all hosts
+            per_host (int): Most requests in flight per host; the limiter lowers
+                it while the host is throttling us
+            headers (dict): Extra request headers for the default fetcher
+            timeout (int): Request timeout in seconds for the default fetcher
+            fetcher (callable): Blocking fetch(url) -> html; defaults to the shared session
+            limiter (RateLimiter): Per-host rate limiter; defaults to the shared one
+            frontier (CrawlFrontier): Optional persistent frontier; visited pages
+                are reused from it and every fetched page is recorded in it
+            cache (PageCache): Optional revalidation cache; pages are fetched
+                with If-None-Match/If-Modified-Since and a 304 reuses the items
+                parsed last time (default fetcher only)
+            request_options (dict): Extra keyword arguments for the default
+                fetcher's requests (e.g. proxies)
+            hybrid (HybridFetcher): Optional browser fallback (hybrid_fetch.py);
+                pages whose parse finds nothing over HTTP are rendered, and
+                patterns that need it are rendered straight away
+            parse_workers (int): Processes for the parse stage; 0 parses on the
+                fetch threads. parse and find_links must then be module-level
+                functions (picklable)
+            prefetch (int): Pages of one source fetched at once; 1 walks them
+                one after another
+        """
+        self.max_concurrency = max_concurrency
+        self.per_host = per_host
+        self.headers = headers
+        self.timeout = timeout
+        self.request_options = request_options or {}
+        self.fetcher = fetcher or self._fetch_with_session
+        # Conditional requests need the shared session; custom fetchers (Playwright) skip the cache
+        self.cache = cache if fetcher is None else None
+        self.pages_not_modified = 0
+        self.limiter = limiter or rate_limiter.LIMITER
+        self.frontier = frontier
+        self.hybrid = hybrid
+        self.parse_workers = parse_workers
+        self.prefetch = max(1, prefetch)
+        self.pages_past_end = 0
+        self.pages_resumed = 0
+        self.pages_skipped = 0
+        self.page_sizes = {}  # start_url -> videos on each page walked, in page order (None: fetch error)
+        self.requests_made = 0
+        self.errors = 0
+        self._executor = None
+        self._parse_pool = None
+        self._pipeline_slots = None
+        self._host_slots = {}
+
+    def _fetch_with_session(self, url):
+        return http_client.fetch_text(url, headers=self.headers, timeout=self.timeout,
+                                      **self.request_options)
+
+    def _revalidate_with_session(self, validators, url):
+        return http_client.fetch_conditional(url, validators, headers=self.headers,
+                                             timeout=self.timeout, **self.request_options)
+
+    def _fetch_after_wait(self, fetcher, url):
+        # The token was already taken on the event loop
+        with rate_limiter.already_waited():
+            return fetcher(url)
+
+    # --- async primitives ---
+    def _slots(self, url):
+        """Per-host in-flight counter; its cap follows the limiter's AIMD concurrency"""
+        host = urlparse(url).netloc.lower()
+        slots = self._host_slots.get(host)
+        if slots is None:
+            self.limiter.set_max_concurrency(url, self.per_host)
+            slots = self._host_slots[host] = [0, asyncio.Condition()]
+        return slots
+
+    async def fetch(self, url, fetcher=None):
+        """Fetch a URL, returning its HTML (or what `fetcher` returns) or None on error"""
+        slots = self._slots(url)
+        condition = slots[1]
+        async with condition:
+            await condition.wait_for(lambda: slots[0] < self.limiter.concurrency(url))
+            slots[0] += 1
+        try:
+            await self.limiter.wait_async(url)
+            loop = asyncio.get_running_loop()
+            self.requests_made += 1
+            return await loop.run_in_executor(self._executor, self._fetch_after_wait,
+                                              fetcher or self.fetcher, url)
+        except Exception as e:
+            self.errors += 1
+            print(f"Error fetching {url}: {e}")
+            return None
+        finally:
+            async with condition:
+                slots[0] -= 1
+                condition.notify_all()
+
+    def _resumed_items(self, url):
+        """Items of a page visited by an earlier (interrupted) run, or None"""
+        if self.frontier is None:
+            return None
+        items = self.frontier.visited_items(url)
+        if items is not None:
+            self.pages_resumed += 1
+        return items
+
+    async def fetch_and_parse(self, url, parse, source=None):
+        """Fetch a page and run parse(html) on a worker thread; None on error"""
+        items = self._resumed_items(url)
+        if items is not None:
+            return items
+        items = await self._fetch_items(url, parse)
+        if items is None:
+            # Not recorded, so a resumed run tries this page again
+            return None
+        if self.frontier is not None:
+            self.frontier.mark_visited(url, items, source)
+        return items
+
+    async def fetch_page(self, url, parse):
+        """Fetch and parse one page outside of a crawl (cache and hybrid fetching apply); None on error"""
+        return await self._fetch_items(url, parse)
+
+    async def _fetch_items(self, url, parse, key=None, found=bool):
+        """
+        Fetch and parse one page, revalidating it when there is a cache; None on error.
+
+        With a hybrid fetcher, pages of patterns that need a browser are
+        rendered, and a page whose items are not found(items) over plain HTTP
+        is rendered again and the outcome recorded for its pattern.
+        """
+        hybrid = self.hybrid
+        if hybrid is not None and hybrid.use_browser(url):
+            return await self._fetch_and_parse_with(url, parse, hybrid.fetch_browser)
+        if self.cache is not None:
+            items = await self._fetch_and_parse_cached(url, parse, key)
+        else:
+            items = await self._fetch_and_parse_with(url, parse)
+        if hybrid is None or hybrid.mode != "hybrid" or items is None:
+            return items
+        if found(items):
+            hybrid.record(url, "http_ok")
+            return items
+        if hybrid.should_fall_back(url):
+            rendered = await self._fetch_and_parse_with(url, parse, hybrid.fetch_browser)
+            if rendered is not None and found(rendered):
+                hybrid.record(url, "rescued")
+                return rendered
+        hybrid.record(url, "misses")
+        return items
+
+    def _pipeline_slot(self):
+        """Held by a page from its request until it is parsed (parse process mode only)"""
+        return self._pipeline_slots or contextlib.nullcontext()
+
+    async def _fetch_and_parse_with(self, url, parse, fetcher=None):
+        async with self._pipeline_slot():
+            html = await self.fetch(url, fetcher)
+            return await self._parse(url, parse, html) if html else None
+
+    async def _parse(self, url, parse, html):
+        """Run parse(html) in the parse stage (process pool or worker thread); None on error"""
+        loop = asyncio.get_running_loop()
+        try:
+            if self._parse_pool is not None:
+                return unpack_records(await loop.run_in_executor(self._parse_pool, parse_packed, parse, html))
+            return await loop.run_in_executor(self._executor, parse, html)
+        except Exception as e:
+            print(f"Error parsing {url}: {e}")
+            return None
+
+    async def _fetch_and_parse_cached(self, url, parse, key=None):
+        """Revalidate a page against the cache; a 304 returns the stored items unparsed"""
+        key = key or parser_key(parse)
+        cached = self.cache.get(url, key)
+        validators = cached[0] if cached else None
+        async with self._pipeline_slot():
+            result = await self.fetch(url, partial(self._revalidate_with_session, validators))
+            if result is None:
+                return None
+            html, validators = result
+            if html is None:
+                self.pages_not_modified += 1
+                self.cache.touch(url, key)
+                return cached[1]
+            items = await self._parse(url, parse, html)
+        if items is not None:
+            self.cache.put(url, key, validators, items)
+        return items
+
+    async def crawl_numbered(self, start_url, parse, max_pages, known=None, stop_after=0):
+        """
+        Walk ?page=1..max_pages of one source, stopping at the first empty page.
+
+        With `known` (a container of videos already stored) and stop_after > 0,
+        also stop once stop_after pages in a row had nothing new. Such
+        incremental crawls usually end after a page or two, so they walk the
+        pages one at a time instead of prefetching.
+        """
+        prefetch = 1 if known is not None and stop_after > 0 else self.prefetch
+        return await self.walk_pages(start_url, parse, partial(numbered_page_url, start_url), 1, max_pages,
+                                     prefetch, known, stop_after)
+
+    async def walk_pages(self, start_url, parse, page_url, first, max_pages, prefetch, known=None, stop_after=0):
+        """
+        Fetch page_url(first)..page_url(max_pages) of a source, `prefetch` at
+        a time, and return their items in page order up to the first empty page.
+
+        Pages prefetched past the end are cancelled, or dropped if they were
+        already fetched. `known` and stop_after work as in crawl_numbered.
+        """
+        items = []
+        pages_without_new = 0
+        in_flight = {}
+        next_page = first
+        try:
+            for page in range(first, max_pages + 1):
+                while next_page <= max_pages and next_page < page + prefetch:
+                    in_flight[next_page] = asyncio.ensure_future(
+                        self.fetch_and_parse(page_url(next_page), parse, start_url))
+                    next_page += 1
+                page_items = await in_flight.pop(page)
+                self.page_sizes.setdefault(start_url, []).append(None if page_items is None else len(page_items))
+                if page_items is None:
+                    print(f"Could not fetch page {page} of {start_url}, stopping")
+                    break
+                if not page_items:
+                    print(f"No more videos found on page {page} of {start_url}, stopping")
+                    break
+                items.extend(page_items)
+                print(f"Found {len(page_items)} videos on page {page} of {start_url}")
+                if known is None or stop_after <= 0:
+                    continue
+                if any(item not in known for item in page_items):
+                    pages_without_new = 0
+                    continue
+                pages_without_new += 1
+                if pages_without_new >= stop_after:
+                    print(f"No new videos on the last {pages_without_new} pages of {start_url}, stopping")
+                    self.pages_skipped += max_pages - page
+                    break
+        finally:
+            for task in in_flight.values():
+                task.cancel()
+            self.pages_past_end += len(in_flight)
+            await asyncio.gather(*in_flight.values(), return_exceptions=True)
+        return items
+
+    async def crawl_linked(self, start_url, parse, find_links, max_pages):
+        """
+        Fetch the first page, then the rest of the listing.
+
+        find_links(html) returns the pagination links of the first page. When
+        they number the pages (?page=N, /page/N/) pages 2..max_pages are walked
+        with prefetching until one is empty; otherwise the links themselves
+        are fetched, concurrently.
+        """
+        items = self._resumed_items(start_url)
+        if items is not None:
+            links = self.frontier.pages(start_url)
+        else:
+            key = f"{parser_key(parse)}+{parser_key(find_links)}"
+            first_page = await self._fetch_items(start_url, partial(parse_with_links, parse, find_links), key,
+                                                 found=lambda page: bool(page[0]))
+            if first_page is None:
+                return []
+            items, links = first_page
+            links = links[:max_pages - 1]
+            if self.frontier is not None:
+                self.frontier.add_pending(links, start_url)
+                self.frontier.mark_visited(start_url, items, start_url)
+        self.page_sizes[start_url] = [len(items)]
+        print(f"Found {len(items)} videos and {len(links)} pagination links on {start_url}")
+        page_url = learn_page_url(start_url, links)
+        if page_url is not None and items:
+            print(f"Paging {start_url} as {page_url(2)}, {self.prefetch} pages at a time")
+            return items + await self.walk_pages(start_url, parse, page_url, 2, max_pages, self.prefetch)
+        pages = await asyncio.gather(
+            *(self.fetch_and_parse(url, parse, start_url) for url in links)
+        )
+        for page_items in pages:
+            self.page_sizes[start_url].append(None if page_items is None else len(page_items))
+            items.extend(page_items or [])
+        return items
+
+    # --- blocking entry points ---
+    def run(self, coro):
+        """Run a coroutine on a fresh event loop with the engine's worker threads"""
+        async def runner():
+            http_client.configure(pool_size=self.max_concurrency)
+            with contextlib.ExitStack() as stack:
+                self._executor = stack.enter_context(ThreadPoolExecutor(max_workers=self.max_concurrency))
+                if self.parse_workers > 0:
+                    self._parse_pool = stack.enter_context(ProcessPoolExecutor(
+                        max_workers=self.parse_workers, mp_context=multiprocessing.get_context(PARSE_START_METHOD)))
+                    self._pipeline_slots = asyncio.Semaphore(
+                        self.max_concurrency + self.parse_workers * PARSE_BACKLOG)
+                try:
+                    return await coro
+                finally:
+                    self._executor = self._parse_pool = self._pipeline_slots = None
+        return asyncio.run(runner())
+
+    def crawl(self, start_urls, parse, max_pages, find_links=None, known=None, stop_after=0):
+        """
+        Crawl several listing sources concurrently.
+
+        Args:
+            start_urls (list): First page of each source
+            parse (callable): parse(html) -> list of video dicts
+            max_pages (int or dict): Pages per source, or start_url -> pages
+                (e.g. from crawl_budget.py)
+            find_links (callable): Optional find_links(html) -> page URLs; when
+                omitted pages are numbered with ?page=N
+            known (container): Videos already stored (e.g. catalog.KnownVideos),
+                for incremental crawls of numbered listings
+            stop_after (int): Stop paging a source after this many pages in a
+                row with only known videos (0 walks every page)
+
+        Returns:
+            dict: start_url -> list of videos, in the order of start_urls
+        """
+        async def crawl_all():
+            async def crawl_one(url):
+                pages = max_pages.get(url, 0) if isinstance(max_pages, dict) else max_pages
+                if pages <= 0:
+                    return []
+                if find_links is None:
+                    return await self.crawl_numbered(url, parse, pages, known, stop_after)
+                return await self.crawl_linked(url, parse, find_links, pages)
+            results = await asyncio.gather(*(crawl_one(url) for url in start_urls))
+            return dict(zip(start_urls, results))
+
+        started = time.time()
+        results = self.run(crawl_all())
+        elapsed = time.time() - started
+        print(f"Crawled {len(start_urls)} sources with {self.requests_made} requests "
+              f"({self.errors} errors) in {elapsed:.1f}s")
+        if self.pages_not_modified:
+            print(f"{self.pages_not_modified} pages were not modified and reused their cached videos")
+        if self.pages_skipped:
+            print(f"Incremental mode skipped up to {self.pages_skipped} pages of known videos")
+        if self.pages_past_end:
+            print(f"{self.pages_past_end} prefetched pages past the end of their listing were dropped")
+        if self.pages_resumed:
+            print(f"Reused {self.pages_resumed} pages saved by an interrupted run")
+        if self.frontier is not None:
+            self.frontier.flush()
+        return results
+
+    def fetch_all(self, urls, fetcher=None):
+        """Fetch many URLs concurrently (with `fetcher` instead of the engine's); returns {url: html or None}"""
+        async def fetch_many():
+            pages = await asyncio.gather(*(self.fetch(url, fetcher) for url in urls))
+            return dict(zip(urls, pages))
+        return self.run(fetch_many())
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Persistent crawl frontier for resumable scraper runs
+
+The scrapers only write videos.json at the very end, so a run killed by the
+subprocess timeouts in automated_scraper.py / max_videos_scraper.py used to
+lose everything it had fetched. The frontier records, per crawl:
+
+  - pending page URLs that were discovered but not fetched yet
+  - visited pages together with the videos parsed from them
+
+in a small SQLite database, flushed every FLUSH_EVERY pages or FLUSH_INTERVAL
+seconds. A restarted crawl reuses the visited pages instead of fetching them
+again and continues with the pending ones. Once a scraper has saved its
+results it calls finish(), which clears that crawl's frontier.
+
+    python crawl_frontier.py           # show the state of every crawl
+    python crawl_frontier.py clear     # forget all crawls
+"""
+
+import json
+import sqlite3
+import sys
+import time
+
+# === CONFIG ===
+FRONTIER_DB = "crawl_frontier.db"
+FLUSH_EVERY = 20       # pages buffered before writing to disk
+FLUSH_INTERVAL = 10.0  # seconds between flushes
+MAX_AGE = 12 * 3600    # pages visited longer ago than this are fetched again
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    crawl TEXT NOT NULL,
+    url TEXT NOT NULL,
+    source TEXT,
+    status TEXT NOT NULL,
+    items TEXT,
+    updated REAL NOT NULL,
+    PRIMARY KEY (crawl, url)
+);
+CREATE INDEX IF NOT EXISTS idx_pages_status ON pages (crawl, status);
+"""
+
+# Upsert keeps the row (and its discovery order) when a pending page is visited
+VISITED_SQL = """
+INSERT INTO pages (crawl, url, source, status, items, updated)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT(crawl, url) DO UPDATE SET
+    status = excluded.status,
+    items = excluded.items,
+    updated = excluded.updated
+"""
+
+PENDING = "pending"
+DONE = "done"
+
+
+class CrawlFrontier:
+    def __init__(self, crawl, db_path=FRONTIER_DB, max_age=MAX_AGE):
+        """
+        Open the frontier of one crawl.
+
+        Args:
+            crawl (str): Name of the crawl (e.g. "mega"), so scrapers do not share state
+            db_path (str): Path to the SQLite database file
+            max_age (int): Seconds after which visited pages are considered stale
+        """
+        self.crawl = crawl
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        with self.conn:
+            self.conn.execute(
+                "DELETE FROM pages WHERE crawl = ? AND updated < ?", (crawl, time.time() - max_age)
+            )
+        self._buffer = []
+        self._last_flush = time.monotonic()
+        self._done = {
+            url: source
+            for url, source in self.conn.execute(
+                "SELECT url, source FROM pages WHERE crawl = ? AND status = ?", (crawl, DONE)
+            )
+        }
+        self.resumed = len(self._done)
+        if self.resumed:
+            print(f"Resuming crawl '{crawl}': {self.resumed} pages already visited")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def is_visited(self, url):
+        return url in self._done
+
+    def visited_items(self, url):
+        """Return the videos stored for a visited page, or None if it was not visited"""
+        if url not in self._done:
+            return None
+        self.flush()
+        row = self.conn.execute(
+            "SELECT items FROM pages WHERE crawl = ? AND url = ?", (self.crawl, url)
+        ).fetchone()
+        return json.loads(row[0]) if row and row[0] else []
+
+    def add_pending(self, urls, source=None):
+        """Record discovered page URLs that still need fetching"""
+        now = time.time()
+        rows = [(self.crawl, url, source, PENDING, None, now) for url in urls if url not in self._done]
+        if rows:
+            with self.conn:
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO pages (crawl, url, source, status, items, updated) "
+                    "VALUES (?, ?, ?, ?, ?, ?)", rows
+                )
+
+    def pages(self, source, status=None):
+        """Page URLs recorded for a source (pending and visited, or only `status`), in discovery order"""
+        self.flush()
+        query = "SELECT url FROM pages WHERE crawl = ? AND source = ? AND url != ?"
+        args = [self.crawl, source, source]
+        if status is not None:
+            query += " AND status = ?"
+            args.append(status)
+        return [url for (url,) in self.conn.execute(query + " ORDER BY rowid", args)]
+
+    def mark_visited(self, url, items, source=None):
+        """Record a fetched page and the videos parsed from it (written on the next flush)"""
+        self._done[url] = source
+        self._buffer.append((self.crawl, url, source, DONE, json.dumps(items, ensure_ascii=False), time.time()))
+        if len(self._buffer) >= FLUSH_EVERY or time.monotonic() - self._last_flush >= FLUSH_INTERVAL:
+            self.flush()
+
+    def flush(self):
+        """Write buffered pages to disk"""
+        if self._buffer:
+            with self.conn:
+                self.conn.executemany(VISITED_SQL, self._buffer)
+            self._buffer = []
+        self._last_flush = time.monotonic()
+
+    def finish(self):
+        """Forget this crawl once its results are saved, so the next run starts fresh"""
+        self._buffer = []
+        self._done = {}
+        with self.conn:
+            self.conn.execute("DELETE FROM pages WHERE crawl = ?", (self.crawl,))
+
+    def close(self):
+        """Flush and close the database"""
+        if self.conn:
+            self.flush()
+            self.conn.close()
+            self.conn = None
+
+
+def main(argv):
+    """Show or clear the saved crawl state"""
+    conn = sqlite3.connect(FRONTIER_DB)
+    conn.executescript(SCHEMA)
+    if len(argv) > 1 and argv[1] == "clear":
+        with conn:
+            conn.execute("DELETE FROM pages")
+        print(f"Cleared {FRONTIER_DB}")
+        return True
+    rows = conn.execute(
+        "SELECT crawl, status, COUNT(*) FROM pages GROUP BY crawl, status ORDER BY crawl, status"
+    ).fetchall()
+    if not rows:
+        print("No crawls in progress")
+    for crawl, status, count in rows:
+        print(f"{crawl}: {count} {status} pages")
+    conn.close()
+    return True
+
+
+if __name__ == "__main__":
+    success = main(sys.argv)
+    sys.exit(0 if success else 1)
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Run one mega crawl of ADDITIONAL_SOURCES on several machines
+
+The listing pages go through the shared work queue in work_queue.py
+(WHENTAI_QUEUE_DB, on storage every machine can reach). Each machine runs a
+worker with its own crawl engine, so each IP keeps the usual per-host rate
+limits while the crawl as a whole goes as wide as there are machines:
+
+    python distributed_crawl.py seed [name]     # once: queue page 1 of every source
+    python distributed_crawl.py work [name]     # on every machine, as many as you like
+    python distributed_crawl.py status [name]
+    python distributed_crawl.py merge [name]    # once, after the workers finish
+
+Workers lease a page, fetch and parse it, and store its videos in the queue
+together with the next page of the same source (up to
+MAX_PAGES_PER_CATEGORY, until a page comes back empty). A worker that dies
+stops heartbeating and its pages are leased again once the lease runs out.
+merge dedupes every stored video against the existing ones and saves them
+with mega_scraper's storage (videos.json, the JSON Lines log or the SQLite
+catalog), exactly once per crawl.
+
+Distributed crawls are full crawls; the incremental stop on known videos
+only applies to mega_scraper.py run on a single machine.
+"""
+
+import asyncio
+import sys
+import time
+
+import cassette
+from catalog import use_catalog
+from crawl_engine import CrawlEngine, numbered_page_url
+from mega_scraper import (ADDITIONAL_SOURCES, HEADERS, MAX_PAGES_PER_CATEGORY, PER_HOST_CONCURRENCY,
+                          load_existing_videos, parse_video_cards, store_new_videos)
+from page_cache import PageCache
+from work_queue import Task, WorkQueue
+
+# === CONFIG ===
+CRAWL_NAME = "mega"
+IDLE_WAIT = 5.0  # seconds a worker waits for pages other workers may still queue
+
+
+async def work(engine, queue, max_pages, lanes):
+    """Lease, fetch and parse pages with `lanes` concurrent loops until the queue is drained"""
+    loop = asyncio.get_running_loop()
+
+    async def lane():
+        while True:
+            tasks = await loop.run_in_executor(None, queue.lease)
+            if not tasks:
+                if await loop.run_in_executor(None, queue.finished):
+                    return
+                await asyncio.sleep(IDLE_WAIT)
+                continue
+            task = tasks[0]
+            items = await engine.fetch_page(task.url, parse_video_cards)
+            if items is None:
+                await loop.run_in_executor(None, queue.release, task)
+                continue
+            next_tasks = []
+            if items and task.page < max_pages:
+                page = task.page + 1
+                next_tasks.append(Task(numbered_page_url(task.source, page), task.source, task.position, page))
+            await loop.run_in_executor(None, queue.complete, task, items, next_tasks)
+            print(f"Found {len(items)} videos on page {task.page} of {task.source}")
+
+    await asyncio.gather(*(lane() for _ in range(lanes)))
+
+
+def run_worker(name):
+    with WorkQueue(name) as queue:
+        max_pages = queue.max_pages()
+        if max_pages is None:
+            print(f"Crawl '{name}' is not seeded, run: python distributed_crawl.py seed {name}")
+            return False
+        print(f"Worker {queue.worker} joining crawl '{name}'")
+        queue.start_heartbeat()
+        page_cache = PageCache()
+        engine = CrawlEngine(per_host=PER_HOST_CONCURRENCY, headers=HEADERS, cache=page_cache)
+        started = time.time()
+        try:
+            engine.run(work(engine, queue, max_pages, engine.max_concurrency))
+        finally:
+            page_cache.close()
+        print(f"Worker {queue.worker} finished {queue.pages_done} pages with {engine.requests_made} "
+              f"requests ({engine.errors} errors) in {time.time() - started:.1f}s")
+    return True
+
+
+def show_status(queue):
+    counts = queue.counts()
+    print(f"Crawl '{queue.crawl}' ({queue.status()}): "
+          + ", ".join(f"{count} {status}" for status, count in counts.items()))
+    for worker, age, pages in queue.workers():
+        print(f"  {worker}: {pages} pages, last heartbeat {age:.0f}s ago")
+    return counts
+
+
+def merge(queue):
+    """Store the videos of every finished page once"""
+    if queue.status() is None:
+        print(f"Crawl '{queue.crawl}' is not seeded")
+        return False
+    if not queue.finished():
+        show_status(queue)
+        print("Workers are still crawling, merge once no page is pending or leased")
+        return False
+    if not queue.claim_merge():
+        print(f"Crawl '{queue.crawl}' was already merged")
+        return False
+    try:
+        all_new_videos = []
+        pages = 0
+        for _, _, videos in queue.results():
+            all_new_videos.extend(videos)
+            pages += 1
+        print(f"Merging {len(all_new_videos)} videos from {pages} pages")
+        existing_videos = [] if use_catalog() else load_existing_videos()
+        added, total = store_new_videos(all_new_videos, existing_videos)
+    except Exception:
+        queue.reopen()
+        raise
+    print(f"Added {added} new videos")
+    print(f"Total videos: {total}")
+    queue.clear()
+    return True
+
+
+def main(argv):
+    if len(argv) < 2 or argv[1] not in ("seed", "work", "status", "merge"):
+        print("Usage: python distributed_crawl.py seed|work|status|merge [name]")
+        return False
+    command = argv[1]
+    name = argv[2] if len(argv) > 2 else CRAWL_NAME
+    if command == "work":
+        return run_worker(name)
+    with WorkQueue(name) as queue:
+        if command == "seed":
+            queued = queue.seed(ADDITIONAL_SOURCES, MAX_PAGES_PER_CATEGORY)
+            if not queued:
+                print(f"Crawl '{name}' is already seeded")
+                return False
+            print(f"Queued {queued} sources, up to {MAX_PAGES_PER_CATEGORY} pages each")
+            return True
+        if command == "status":
+            if queue.status() is None:
+                print(f"Crawl '{name}' is not seeded")
+                return False
+            show_status(queue)
+            return True
+        return merge(queue)
+
+
+if __name__ == "__main__":
+    cassette.prepare_run()
+    success = main(sys.argv)
+    sys.exit(0 if success else 1)
@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+Declarative extraction spec for video cards, shared by every scraper
+
+Each scraper used to carry its own card-parsing loop (mega's
+get_video_data_from_page, enhanced/cartoon parse_listing, additional's
+parse_category_page, comprehensive's extract_video_info and video_link's
+extract_video_links_from_category), with its own selectors and defensive
+getattr/isinstance(Tag) checks. They now share VIDEO_CARD_SPEC:
+
+  - cards: selectors for the card containers, tried in order; the first one
+    that matches anything wins (current site layout first, older ones after)
+  - fallback: used when no card selector matches; every match is a card
+  - fields: per field, (selector, source[, pattern]) alternatives tried in
+    order until one gives a non-empty value. source is an attribute name or
+    "text"; pattern keeps the first group of a regex match; the selector
+    SELF means the card element itself
+  - lists: fields collecting every match (e.g. categories), de-duplicated
+
+The spec is compiled once into an Extractor that runs on the html_parser
+backend (selectolax when installed, otherwise BeautifulSoup), so a selector
+fix or a faster parser applies to every scraper at once. On BeautifulSoup the
+selectors are matched on the raw tags in one walk per card instead of through
+soupsieve, and the selectors a tag matches are worked out once per distinct
+tag signature, as cards repeat the same markup:
+
+    cards = VIDEO_CARDS.extract(html)   # [{"title": ..., "detail_url": ...}, ...]
+    links = pagination_links(html)      # page links of a listing, for the crawl engine
+
+listing_parser.py turns the cards into the scrapers' listing records.
+
+benchmark_extraction.py compares it with the old per-element code.
+"""
+
+import re
+from urllib.parse import urljoin
+
+from bs4 import Tag
+
+import html_parser
+
+# === CONFIG ===
+BASE = "https://www.cartoonpornvideos.com"
+SELF = ""  # selector for the card element itself
+
+DURATION_TEXT = re.compile(r'(\d+:\d+|\d+\s*(?:min|minutes?))')  # "15:30" or "22 min"
+VIEWS_TEXT = re.compile(r'([\d.,]+[KM]?)')                      # "1.2M views" or "980K"
+
+MAX_SIGNATURES = 10000  # distinct tag signatures remembered by an Extractor
+
+TITLE_LINK = "a.item-title.item-link.rate-link.font-medium"
+
+VIDEO_CARD_SPEC = {
+    "cards": (
+        "div.card.sub.group",
+        ".video-item, .item, .thumb, .video, .video-block, .video-thumb, .thumb-block, .item-col, article",
+    ),
+    "fallback": "a[href]",
+    "fields": {
+        "title": (
+            (TITLE_LINK, "text"),
+            ("img[alt]", "alt"),
+            ("a[title]", "title"),
+            (SELF, "title"),
+            ("h3, h2, h4", "text"),
+            ("a", "text"),
+            (SELF, "text"),
+        ),
+        "detail_url": (
+            (TITLE_LINK, "href"),
+            ("a[href]", "href"),
+            (SELF, "href"),
+        ),
+        "thumbnail": (
+            ("img.item-image", "src"),
+            ("img[src]", "src"),
+            ("img[data-src]", "data-src"),
+        ),
+        "duration": (
+            ("[class*=duration], [class*=time]", "text", DURATION_TEXT),
+        ),
+        "views": (
+            ("[class*=view], [class*=watched]", "text", VIEWS_TEXT),
+        ),
+        "upload_date": (
+            ("[class*=date], [class*=timeago], [class*=uploaded]", "text"),
+        ),
+    },
+    "lists": {
+        "categories": ("a.item-source.block.text-xsm", "text"),
+    },
+}
+
+# What a rendered page must contain before it is worth extracting (browser_pool fast mode)
+CARD_WAIT_SELECTOR = ", ".join(VIDEO_CARD_SPEC["cards"])
+DETAIL_WAIT_SELECTOR = 'meta[http-equiv="refresh"], a[target="_blank"], a[rel~="nofollow"]'
+
+# Compound selectors the bs4 fast path understands: tag.class[attr][attr*=value], comma-separated
+SIMPLE_SELECTOR = re.compile(r'^([a-z][a-z0-9]*)?((?:\.[\w-]+)*)((?:\[[\w-]+(?:\*?=[\w-]+)?\])*)$')
+ATTRIBUTE_TEST = re.compile(r'\[([\w-]+)(?:(\*?=)([\w-]+))?\]')
+
+
+def compile_selector(selector):
+    """
+    Compile a simple CSS selector into (tag name, classes, attribute tests)
+    groups for BeautifulSoup tags, or return None if it needs the full CSS
+    engine.
+    """
+    groups = []
+    for group in selector.split(","):
+        match = SIMPLE_SELECTOR.match(group.strip())
+        if not match or not group.strip():
+            return None
+        name, classes, attributes = match.groups()
+        groups.append((name, frozenset(classes.split(".")[1:]), tuple(ATTRIBUTE_TEST.findall(attributes))))
+    return tuple(groups)
+
+
+def _matches(tag, classes, attributes):
+    """True if a tag has the classes and passes the attribute tests of a compiled group"""
+    if classes and not classes.issubset(tag.attrs.get("class") or ()):
+        return False
+    for attribute, operator, value in attributes:
+        actual = tag.attrs.get(attribute)
+        if actual is None:
+            return False
+        if isinstance(actual, list):
+            actual = " ".join(actual)
+        if (operator == "=" and actual != value) or (operator == "*=" and value not in actual):
+            return False
+    return True
+
+
+def _select_tags(root, groups):
+    """Tags under a BeautifulSoup tag matching compiled groups, in document order"""
+    tags = []
+    for tag in root.descendants:
+        if type(tag) is not Tag:
+            continue
+        for name, classes, attributes in groups:
+            if (not name or tag.name == name) and _matches(tag, classes, attributes):
+                tags.append(tag)
+                break
+    return tags
+
+
+def _node_value(node, source):
+    if source == "text":
+        return node.text(separator=" ", strip=True)
+    return (node.attributes.get(source) or "").strip()
+
+
+def _tag_value(tag, source):
+    if source == "text":
+        return tag.get_text(" ", strip=True)
+    value = tag.attrs.get(source) or ""
+    if isinstance(value, list):
+        value = " ".join(value)
+    return value.strip()
+
+
+class Extractor:
+    def __init__(self, spec):
+        """
+        Compile an extraction spec.
+
+        Args:
+            spec (dict): Spec in the VIDEO_CARD_SPEC format
+        """
+        self.card_selectors = tuple(spec["cards"])
+        self.fallback = spec.get("fallback")
+        self.fields = tuple(
+            (name, tuple((alt[0], alt[1], alt[2] if len(alt) > 2 else None) for alt in alternatives))
+            for name, alternatives in spec["fields"].items()
+        )
+        self.lists = tuple(spec.get("lists", {}).items())
+        self.first_selectors = tuple(dict.fromkeys(
+            selector for _, alternatives in self.fields for selector, _, _ in alternatives if selector != SELF
+        ))
+        self.list_selectors = tuple(dict.fromkeys(selector for _, (selector, _) in self.lists))
+        # BeautifulSoup backends skip soupsieve: cards and fields are matched on the raw tags
+        compiled = {selector: compile_selector(selector)
+                    for selector in self.card_selectors + (self.fallback or "",) if selector}
+        self.card_groups = compiled if all(compiled.values()) else None
+        rules = [(selector, compile_selector(selector), False) for selector in self.first_selectors]
+        rules += [(selector, compile_selector(selector), True) for selector in self.list_selectors]
+        self.rules = rules if all(groups for _, groups, _ in rules) else None
+        # Cards repeat the same markup, so which selectors a tag matches is
+        # worked out once per tag signature (name, class and tested attributes)
+        tests = {("class", "=")}
+        for _, groups, _ in rules if self.rules else ():
+            tests.update((attribute, operator) for _, _, attributes in groups for attribute, operator, _ in attributes)
+        self.value_attributes = tuple(sorted({attribute for attribute, operator in tests if operator}))
+        self.present_attributes = tuple(sorted({attribute for attribute, operator in tests if not operator}))
+        self.matched = {}
+
+    def cards(self, doc):
+        """Card nodes of a parsed document"""
+        if self.card_groups is not None and isinstance(doc, html_parser.SoupNode):
+            for selector in self.card_selectors:
+                cards = _select_tags(doc.tag, self.card_groups[selector])
+                if cards:
+                    return [html_parser.SoupNode(tag) for tag in cards]
+            if not self.fallback:
+                return []
+            return [html_parser.SoupNode(tag) for tag in _select_tags(doc.tag, self.card_groups[self.fallback])]
+        for selector in self.card_selectors:
+            cards = doc.css(selector)
+            if cards:
+                return cards
+        return doc.css(self.fallback) if self.fallback else []
+
+    def _signature(self, tag):
+        """What the compiled selectors can tell apart about a tag: its name, tested values and attributes"""
+        attrs = tag.attrs
+        values = []
+        for attribute in self.value_attributes:
+            value = attrs.get(attribute)
+            values.append(" ".join(value) if isinstance(value, list) else value)
+        return tag.name, tuple(values), tuple(map(attrs.__contains__, self.present_attributes))
+
+    def _matching(self, tag, signature):
+        """The (selector, is_list) rules a tag matches, remembered for tags with the same signature"""
+        matched = tuple(
+            (selector, is_list) for selector, groups, is_list in self.rules
+            if any((not name or tag.name == name) and _matches(tag, classes, attributes)
+                   for name, classes, attributes in groups)
+        )
+        if len(self.matched) >= MAX_SIGNATURES:
+            self.matched.clear()
+        self.matched[signature] = matched
+        return matched
+
+    def _walk(self, card):
+        """First match of every field selector and all matches of list selectors, in one pass over the card's tags"""
+        first = {}
+        lists = {selector: [] for selector in self.list_selectors}
+        for tag in card.descendants:
+            if type(tag) is not Tag:
+                continue
+            signature = self._signature(tag)
+            matched = self.matched.get(signature)
+            if matched is None:
+                matched = self._matching(tag, signature)
+            for selector, is_list in matched:
+                if is_list:
+                    lists[selector].append(tag)
+                elif selector not in first:
+                    first[selector] = tag
+        return first, lists
+
+    def _query(self, card):
+        """Same as _walk through the backend's CSS engine (selectolax)"""
+        first = {selector: card.css_first(selector) for selector in self.first_selectors}
+        lists = {selector: card.css(selector) for selector in self.list_selectors}
+        return first, lists
+
+    def record(self, card):
+        """Extract one card into a dict with every field of the spec"""
+        if self.rules is not None and isinstance(card, html_parser.SoupNode):
+            first, lists = self._walk(card.tag)
+            first[SELF] = card.tag
+            node_value = _tag_value
+        else:
+            first, lists = self._query(card)
+            first[SELF] = card
+            node_value = _node_value
+
+        record = {}
+        for name, alternatives in self.fields:
+            value = ""
+            for selector, source, pattern in alternatives:
+                node = first.get(selector)
+                if node is None:
+                    continue
+                value = node_value(node, source)
+                if value and pattern is not None:
+                    match = pattern.search(value)
+                    value = match.group(1) if match else ""
+                if value:
+                    break
+            record[name] = value
+        for name, (selector, source) in self.lists:
+            values = []
+            for node in lists[selector]:
+                value = node_value(node, source)
+                if value and value not in values:
+                    values.append(value)
+            record[name] = values
+        return record
+
+    def extract(self, html):
+        """Parse a page and return one record per card"""
+        return [self.record(card) for card in self.cards(html_parser.parse(html))]
+
+
+VIDEO_CARDS = Extractor(VIDEO_CARD_SPEC)
+
+
+def make_absolute(href, base=BASE):
+    if not href:
+        return ""
+    return urljoin(base, href)
+
+
+def pagination_links(html, base=BASE, limit=None):
+    """
+    Pagination links of a listing page, in one pass over its anchors: links
+    whose text is a page number above 1 first, then links with "page" in the URL.
+    """
+    numbered = []
+    paged = []
+    for anchor in html_parser.parse(html).css("a[href]"):
+        href = anchor.attributes.get("href")
+        if not href:
+            continue
+        url = make_absolute(href, base)
+        text = anchor.text(strip=True)
+        if text.isdigit() and int(text) > 1:
+            numbered.append(url)
+        elif "page" in url.lower():
+            paged.append(url)
+    links = list(dict.fromkeys(numbered + paged))
+    return links[:limit] if limit else links
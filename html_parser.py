@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Pluggable HTML parser backend for the WHentai scrapers
+
+Every scraper used to build BeautifulSoup(html, "html.parser"), the slowest
+pure-Python tree builder. This module picks the fastest installed backend:
+
+  - selectolax: C (Lexbor) parser with CSS selectors, no BeautifulSoup at all
+  - lxml: BeautifulSoup on top of the lxml tree builder
+  - html.parser: BeautifulSoup on the standard library parser (always there)
+
+lxml and selectolax are optional, like brotli in http_client.py. Force a
+backend with WHENTAI_PARSER=selectolax|lxml|html.parser (default "auto").
+
+Two entry points:
+
+    soup = make_soup(html)      # BeautifulSoup for code that walks the tree
+    doc = parse(html)           # selectolax-style node: doc.css(selector),
+                                # doc.css_first(selector), node.attributes,
+                                # node.text(strip=True)
+
+parse() returns selectolax nodes when selectolax is the backend and thin
+SoupNode wrappers otherwise, so one extraction function runs unchanged on
+every backend. benchmark_parsers.py compares speed and output per backend.
+"""
+
+import importlib.util
+import os
+
+from bs4 import BeautifulSoup
+
+# === CONFIG ===
+BACKENDS = ("selectolax", "lxml", "html.parser")  # fastest first
+PARSER_BACKEND = os.environ.get("WHENTAI_PARSER", "auto").strip().lower()
+
+
+def _installed(module):
+    try:
+        return importlib.util.find_spec(module) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+def available_backends():
+    """Backends that can run in this install, fastest first"""
+    installed = {
+        "selectolax": _installed("selectolax"),
+        "lxml": _installed("lxml"),
+        "html.parser": True,
+    }
+    return [name for name in BACKENDS if installed[name]]
+
+
+def resolve_backend(name="auto"):
+    """Return the backend to use for `name`, falling back to the fastest installed one"""
+    available = available_backends()
+    if name in available:
+        return name
+    if name not in ("", "auto"):
+        print(f"Parser backend '{name}' is not installed, using {available[0]}")
+    return available[0]
+
+
+_backend = resolve_backend(PARSER_BACKEND)
+
+
+def get_backend():
+    return _backend
+
+
+def set_backend(name):
+    """Switch the backend used by make_soup() and parse() (e.g. for benchmarks)"""
+    global _backend
+    _backend = resolve_backend(name)
+    return _backend
+
+
+def soup_features(backend=None):
+    """BeautifulSoup tree builder for a backend; lxml also serves selectolax's BeautifulSoup callers"""
+    backend = backend or _backend
+    if backend in ("lxml", "selectolax") and _installed("lxml"):
+        return "lxml"
+    return "html.parser"
+
+
+def make_soup(html, backend=None):
+    """Build a BeautifulSoup tree with the fastest installed tree builder"""
+    return BeautifulSoup(html, soup_features(backend))
+
+
+class SoupNode:
+    """selectolax-style view of a BeautifulSoup tag"""
+    __slots__ = ("tag",)
+
+    def __init__(self, tag):
+        self.tag = tag
+
+    @property
+    def tag_name(self):
+        return self.tag.name
+
+    @property
+    def attributes(self):
+        # Multi-valued attributes (class, rel) as the raw space-separated string, as selectolax returns them
+        return {
+            name: " ".join(value) if isinstance(value, list) else value
+            for name, value in self.tag.attrs.items()
+        }
+
+    def css(self, selector):
+        return [SoupNode(tag) for tag in self.tag.select(selector)]
+
+    def css_first(self, selector, default=None):
+        tag = self.tag.select_one(selector)
+        return SoupNode(tag) if tag is not None else default
+
+    def text(self, deep=True, separator="", strip=False):
+        if not deep:
+            return "".join(
+                s.strip() if strip else s for s in self.tag.find_all(string=True, recursive=False)
+            )
+        return self.tag.get_text(separator, strip=strip)
+
+
+def _selectolax_parser():
+    # Lexbor is the maintained engine; selectolax 1.0 removed the old Modest one
+    try:
+        from selectolax.lexbor import LexborHTMLParser
+        return LexborHTMLParser
+    except ImportError:
+        from selectolax.parser import HTMLParser
+        return HTMLParser
+
+
+def parse(html, backend=None):
+    """Parse a document into a selectolax-style root node"""
+    backend = backend or _backend
+    if backend == "selectolax":
+        if isinstance(html, bytes):
+            html = html.decode("utf-8", "replace")
+        return _selectolax_parser()(html)
+    return SoupNode(make_soup(html, backend))
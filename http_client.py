@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Shared HTTP session for the WHentai scrapers
+
+Every scraper used to call requests.get/requests.head directly, which opens
+a new TCP + TLS connection for each page. This module keeps one pooled,
+keep-alive requests.Session per process that all scrapers and checker
+threads share. urllib3's connection pool is thread-safe, so the same session
+can be used from ThreadPoolExecutor workers; size the pool to the number of
+workers with configure() so no connection is thrown away.
+
+Responses are requested with gzip/deflate, plus brotli when the brotli
+package is installed (requests decodes it transparently). Every request
+first waits on the shared per-host rate limiter in rate_limiter.py and
+reports its status back, so throttling (429/503, Retry-After) slows the
+host down and is retried instead of surfacing as a failed page.
+
+fetch_conditional() sends stored ETag/Last-Modified validators so unchanged
+pages come back as an empty 304 (see page_cache.py).
+
+With WHENTAI_CASSETTE set, responses are recorded to or replayed from a
+cassette file (cassette.py), so scraper runs can be reproduced offline.
+
+set_deadline() bounds a whole run (pipeline.py): once it has passed, every
+request fails with requests.Timeout before anything is sent, so the
+scrapers stop paging and return what they already have. Requests sent
+before it get at most the time left as their timeout. That timeout bounds
+each connect and each read, so a response still trickling in, or a
+rate-limit wait that started before the deadline, can overrun it by a few
+seconds.
+"""
+
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import cassette
+import rate_limiter
+
+# === CONFIG ===
+DEFAULT_POOL_SIZE = 10   # connections kept per host
+DEFAULT_POOL_HOSTS = 20  # hosts kept in the pool (thumbnail CDN, partner sites, ...)
+DEFAULT_TIMEOUT = 15
+MAX_RETRIES = 3          # retries of a 429/503 response
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+
+
+def _accept_encoding():
+    """Return the Accept-Encoding header value supported by this install"""
+    try:
+        import brotli  # noqa: F401
+        return "gzip, deflate, br"
+    except ImportError:
+        try:
+            import brotlicffi  # noqa: F401
+            return "gzip, deflate, br"
+        except ImportError:
+            return "gzip, deflate"
+
+
+ACCEPT_ENCODING = _accept_encoding()
+
+_session = None
+_pool_size = DEFAULT_POOL_SIZE
+_lock = threading.Lock()
+_deadline = None
+
+
+def _build_session(pool_size):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=DEFAULT_POOL_HOSTS, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update({
+        "User-Agent": USER_AGENT,
+        "Accept-Encoding": ACCEPT_ENCODING,
+        "Connection": "keep-alive",
+    })
+    return session
+
+
+def configure(pool_size=DEFAULT_POOL_SIZE):
+    """
+    Size the connection pool, typically to the number of worker threads.
+
+    Only grows the pool; call it before starting the workers.
+    """
+    global _session, _pool_size
+    with _lock:
+        if pool_size <= _pool_size and _session is not None:
+            return _session
+        _pool_size = max(pool_size, _pool_size)
+        old = _session
+        _session = _build_session(_pool_size)
+    if old is not None:
+        old.close()
+    return _session
+
+
+def set_deadline(when):
+    """Fail every request made after `when` (a time.time() value; None removes the deadline)"""
+    global _deadline
+    _deadline = when
+
+
+def check_deadline(url):
+    """
+    Raises:
+        requests.Timeout: The run's deadline has passed
+    """
+    if _deadline is not None and time.time() >= _deadline:
+        raise requests.Timeout(f"Run deadline passed, not requesting {url}")
+
+
+def time_left(timeout):
+    """
+    `timeout` cut to the time left before the deadline, so a request in
+    flight does not outlast the run.
+
+    Args:
+        timeout (float or tuple): requests timeout, (connect, read) or None
+    """
+    if _deadline is None:
+        return timeout
+    left = max(0.1, _deadline - time.time())
+    if isinstance(timeout, tuple):
+        return tuple(left if part is None else min(part, left) for part in timeout)
+    return left if timeout is None else min(timeout, left)
+
+
+def get_session():
+    """Return the shared session, creating it on first use"""
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                _session = _build_session(_pool_size)
+    return _session
+
+
+def request(method, url, headers=None, timeout=DEFAULT_TIMEOUT, retries=MAX_RETRIES, **kwargs):
+    """
+    Send a request through the shared session.
+
+    Waits on the host's rate limit first and reports the outcome back to it,
+    so the limiter can back off on 429/503 and honour Retry-After. Throttled
+    requests are retried up to `retries` times (the limiter spaces them out);
+    other responses are returned as-is.
+
+    With an active cassette the final response is recorded, or replayed
+    without sending anything. After the deadline (set_deadline) it raises
+    requests.Timeout instead, and before it the timeout is cut to the time left.
+    """
+    check_deadline(url)
+    tape = cassette.active()
+    if tape is not None and tape.mode == "replay":
+        rate_limiter.wait(url)
+        return tape.replay(method, url, headers)
+    for attempt in range(retries + 1):
+        rate_limiter.wait(url)
+        # The rate limit may have kept the request waiting until after the deadline
+        check_deadline(url)
+        try:
+            resp = get_session().request(method, url, headers=headers, timeout=time_left(timeout), **kwargs)
+        except requests.RequestException:
+            rate_limiter.record(url, None)
+            raise
+        rate_limiter.record(url, resp.status_code, resp.headers.get("Retry-After"))
+        if resp.status_code not in rate_limiter.THROTTLE_STATUSES or attempt == retries:
+            if tape is not None:
+                tape.record(method, url, headers, resp)
+            return resp
+        print(f"Throttled on {url} (status {resp.status_code}), retry {attempt + 1}/{retries}")
+        resp.close()
+
+
+def get(url, headers=None, timeout=DEFAULT_TIMEOUT, **kwargs):
+    """requests.get through the shared session, after the host's rate limit"""
+    return request("GET", url, headers=headers, timeout=timeout, **kwargs)
+
+
+def head(url, headers=None, timeout=DEFAULT_TIMEOUT, **kwargs):
+    """requests.head through the shared session, after the host's rate limit"""
+    return request("HEAD", url, headers=headers, timeout=timeout, **kwargs)
+
+
+def fetch_text(url, headers=None, timeout=DEFAULT_TIMEOUT, **kwargs):
+    """GET a page and return its text, raising for HTTP errors"""
+    resp = get(url, headers=headers, timeout=timeout, **kwargs)
+    resp.raise_for_status()
+    return resp.text
+
+
+def fetch_conditional(url, validators=None, headers=None, timeout=DEFAULT_TIMEOUT, **kwargs):
+    """
+    GET a page unless it is unchanged since `validators` were stored.
+
+    Args:
+        validators (dict): "etag"/"last_modified" of an earlier response, if any
+
+    Returns:
+        tuple: (text, validators) - text is None when the server answered
+        304 Not Modified; validators are those of this response
+    """
+    headers = dict(headers or {})
+    tape = cassette.active()
+    # A recording keeps full responses, so it replays whatever the page cache holds
+    if validators and not (tape is not None and tape.mode == "record"):
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+    resp = get(url, headers=headers, timeout=timeout, **kwargs)
+    if resp.status_code == 304:
+        return None, validators
+    resp.raise_for_status()
+    return resp.text, {
+        "etag": resp.headers.get("ETag"),
+        "last_modified": resp.headers.get("Last-Modified"),
+    }
+
+
+def close():
+    """Close all pooled connections"""
+    global _session
+    with _lock:
+        if _session is not None:
+            _session.close()
+            _session = None
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Hybrid HTTP/browser fetching with a learned mode per host and path pattern
+
+USE_PLAYWRIGHT used to be a constant in each scraper: either every page paid
+for a browser render or none did. In hybrid mode a page is fetched over plain
+HTTP first; only when the extraction finds nothing is it rendered in a
+headless browser (browser_pool.py). The outcome is remembered per host and
+path pattern (/category/*, /out, ...) in a small SQLite table:
+
+  - http_ok: HTTP alone produced results
+  - rescued: HTTP found nothing but the browser did
+  - misses: neither found anything (e.g. the empty page after the last one)
+
+A pattern switches to the browser once it has been rescued more often than
+HTTP worked, and is re-probed over HTTP every PROBE_EVERY pages. A pattern
+where HTTP has worked TRUST_AFTER times and never needed rescuing gets no
+browser fallback at all, so the empty page at the end of a listing does not
+cost a render. Static pages therefore stay on the cheap path on their own.
+
+WHENTAI_FETCH_MODE picks http (never render), browser (always render) or
+hybrid (the default). Without Playwright installed hybrid behaves like http.
+
+    python hybrid_fetch.py           # show the learned modes
+    python hybrid_fetch.py clear     # forget them
+"""
+
+import importlib.util
+import os
+import sqlite3
+import sys
+import threading
+import time
+from urllib.parse import urlparse
+
+import html_parser
+import http_client
+
+# === CONFIG ===
+FETCH_MODE = os.environ.get("WHENTAI_FETCH_MODE", "hybrid").strip().lower()  # http | browser | hybrid
+FETCH_MODES_DB = "fetch_modes.db"
+MAX_AGE = 7 * 24 * 3600  # patterns not seen for a week are learned again
+TRUST_AFTER = 5          # HTTP successes (and no rescues) after which empty pages are not rendered
+PROBE_EVERY = 20         # browser-mode pages between HTTP probes
+TIMEOUT = 15
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS modes (
+    host TEXT NOT NULL,
+    pattern TEXT NOT NULL,
+    http_ok INTEGER NOT NULL DEFAULT 0,
+    rescued INTEGER NOT NULL DEFAULT 0,
+    misses INTEGER NOT NULL DEFAULT 0,
+    updated REAL NOT NULL,
+    PRIMARY KEY (host, pattern)
+);
+"""
+
+UPSERT_SQL = """
+INSERT INTO modes (host, pattern, http_ok, rescued, misses, updated)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT(host, pattern) DO UPDATE SET
+    http_ok = excluded.http_ok,
+    rescued = excluded.rescued,
+    misses = excluded.misses,
+    updated = excluded.updated
+"""
+
+OUTCOMES = ("http_ok", "rescued", "misses")
+
+
+def path_pattern(url):
+    """
+    Group URLs that share a page template: the first path segment, plus /*
+    when the path goes deeper (/category/hentai?page=2 -> /category/*).
+    """
+    segments = [segment for segment in urlparse(url).path.split("/") if segment]
+    if not segments:
+        return "/"
+    return f"/{segments[0]}/*" if len(segments) > 1 else f"/{segments[0]}"
+
+
+def mode_key(url):
+    return urlparse(url).netloc.lower(), path_pattern(url)
+
+
+def browser_available():
+    try:
+        return importlib.util.find_spec("playwright") is not None
+    except (ImportError, ValueError):
+        return False
+
+
+class FetchModes:
+    def __init__(self, db_path=FETCH_MODES_DB, max_age=MAX_AGE):
+        """
+        Open (and create if needed) the learned fetch modes.
+
+        Args:
+            db_path (str): Path to the SQLite database file
+            max_age (int): Seconds after which a pattern that was not seen is forgotten
+        """
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        with self.conn:
+            self.conn.execute("DELETE FROM modes WHERE updated < ?", (time.time() - max_age,))
+        self.lock = threading.Lock()
+        self.stats = {}
+        for host, pattern, http_ok, rescued, misses in self.conn.execute(
+            "SELECT host, pattern, http_ok, rescued, misses FROM modes"
+        ):
+            self.stats[(host, pattern)] = {"http_ok": http_ok, "rescued": rescued, "misses": misses}
+        self.dirty = set()
+        self.browser_pages = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def get(self, url):
+        """Counters of the URL's host and path pattern"""
+        with self.lock:
+            return dict(self.stats.get(mode_key(url)) or dict.fromkeys(OUTCOMES, 0))
+
+    def record(self, url, outcome):
+        """Count an outcome (http_ok, rescued or misses) for the URL's pattern"""
+        key = mode_key(url)
+        with self.lock:
+            stats = self.stats.setdefault(key, dict.fromkeys(OUTCOMES, 0))
+            stats[outcome] += 1
+            self.dirty.add(key)
+
+    def use_browser(self, url):
+        """True when the pattern needs the browser; every PROBE_EVERY-th page is tried over HTTP"""
+        key = mode_key(url)
+        with self.lock:
+            stats = self.stats.get(key)
+            if not stats or stats["rescued"] <= stats["http_ok"]:
+                return False
+            pages = self.browser_pages[key] = self.browser_pages.get(key, 0) + 1
+            return pages % PROBE_EVERY != 0
+
+    def trusted(self, url):
+        """True when HTTP has always been enough for the pattern"""
+        stats = self.get(url)
+        return stats["http_ok"] >= TRUST_AFTER and stats["rescued"] == 0
+
+    def flush(self):
+        """Write the changed patterns to the database"""
+        with self.lock:
+            rows = [(host, pattern, self.stats[(host, pattern)]["http_ok"],
+                     self.stats[(host, pattern)]["rescued"], self.stats[(host, pattern)]["misses"],
+                     time.time()) for host, pattern in self.dirty]
+            self.dirty.clear()
+            if rows and self.conn:
+                with self.conn:
+                    self.conn.executemany(UPSERT_SQL, rows)
+
+    def close(self):
+        """Flush and close the database connection"""
+        if self.conn:
+            self.flush()
+            self.conn.close()
+            self.conn = None
+
+
+class HybridFetcher:
+    def __init__(self, browser_fetch, mode=FETCH_MODE, modes=None, wait_for=None, headers=None,
+                 timeout=TIMEOUT, request_options=None):
+        """
+        Create a hybrid fetcher.
+
+        Args:
+            browser_fetch (callable): Blocking browser_fetch(url, wait_for) -> html
+                (e.g. a scraper's fetch_with_playwright)
+            mode (str): "http", "browser" or "hybrid"
+            modes (FetchModes): Learned modes; opened from FETCH_MODES_DB when omitted
+            wait_for (str): Selector renders wait for when the caller gives none
+                (the crawl engine's listing pages)
+            headers (dict): Request headers for plain HTTP fetches
+            timeout (int): HTTP timeout in seconds
+            request_options (dict): Extra keyword arguments for HTTP requests (e.g. proxies)
+        """
+        if mode not in ("http", "browser", "hybrid"):
+            print(f"Unknown fetch mode '{mode}', using hybrid")
+            mode = "hybrid"
+        if mode != "http" and not browser_available():
+            if mode == "browser":
+                print("Playwright is not installed, fetching over plain HTTP only")
+            mode = "http"
+        self.mode = mode
+        self.browser_fetch = browser_fetch
+        self.wait_for = wait_for
+        self.modes = modes if modes is not None else (FetchModes() if mode == "hybrid" else None)
+        self.headers = headers
+        self.timeout = timeout
+        self.request_options = request_options or {}
+        self.pages_rendered = 0
+        self.pages_rescued = 0
+
+    def use_browser(self, url):
+        """Fetch this URL with the browser straight away?"""
+        if self.mode != "hybrid":
+            return self.mode == "browser"
+        return self.modes.use_browser(url)
+
+    def should_fall_back(self, url):
+        """Render this URL after plain HTTP produced nothing?"""
+        return self.mode == "hybrid" and not self.modes.trusted(url)
+
+    def fetch_browser(self, url, wait_for=None):
+        http_client.check_deadline(url)
+        self.pages_rendered += 1
+        return self.browser_fetch(url, wait_for or self.wait_for)
+
+    def fetch_http(self, url):
+        return http_client.fetch_text(url, headers=self.headers, timeout=self.timeout,
+                                      **self.request_options)
+
+    def record(self, url, outcome):
+        if self.modes is not None:
+            if outcome == "rescued":
+                self.pages_rescued += 1
+            self.modes.record(url, outcome)
+
+    def fetch(self, url, expect=None):
+        """
+        Blocking fetch(url) -> html for code that parses afterwards: the HTTP
+        response counts as a hit when it contains the `expect` selector.
+        """
+        if self.use_browser(url):
+            return self.fetch_browser(url, expect)
+        html = self.fetch_http(url)
+        if expect is None or self.mode != "hybrid":
+            return html
+        if html_parser.parse(html).css_first(expect) is not None:
+            self.record(url, "http_ok")
+            return html
+        if not self.should_fall_back(url):
+            self.record(url, "misses")
+            return html
+        rendered = self.fetch_browser(url, expect)
+        if rendered and html_parser.parse(rendered).css_first(expect) is not None:
+            self.record(url, "rescued")
+            return rendered
+        self.record(url, "misses")
+        return html
+
+    def close(self):
+        if self.pages_rendered:
+            print(f"Hybrid fetch rendered {self.pages_rendered} pages in the browser "
+                  f"({self.pages_rescued} found videos plain HTTP missed)")
+        if self.modes is not None:
+            self.modes.close()
+
+
+def main(argv):
+    """Show or clear the learned fetch modes"""
+    with FetchModes() as modes:
+        if len(argv) > 1 and argv[1] == "clear":
+            with modes.conn:
+                modes.conn.execute("DELETE FROM modes")
+            print(f"Cleared {modes.db_path}")
+            return True
+        print(f"{modes.db_path}: {len(modes.stats)} patterns")
+        for (host, pattern), stats in sorted(modes.stats.items()):
+            mode = "browser" if stats["rescued"] > stats["http_ok"] else "http"
+            print(f"  {host}{pattern}: {mode} (http ok {stats['http_ok']}, "
+                  f"rescued {stats['rescued']}, misses {stats['misses']})")
+    return True
+
+
+if __name__ == "__main__":
+    success = main(sys.argv)
+    sys.exit(0 if success else 1)
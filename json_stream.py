@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Constant-memory streaming reader for videos.json
+
+Yields video objects one at a time from a top-level JSON array, reading the
+file in fixed-size chunks and decoding each object with the C-accelerated
+json scanner. Memory use is bounded by the chunk size plus the largest single
+record, so counting and validating keep working on multi-million record files.
+
+    python json_stream.py [videos.json]   # count and validate a file
+"""
+
+import json
+import re
+import sys
+
+# === CONFIG ===
+CHUNK_SIZE = 64 * 1024          # characters read per refill
+MAX_RECORD_CHARS = 1024 * 1024  # a single video larger than this is treated as corrupt
+REQUIRED_FIELDS = ('title', 'thumbnail', 'detail_url')
+
+NON_WHITESPACE = re.compile(r'\S')
+
+
+class JSONStreamError(ValueError):
+    def __init__(self, msg, pos):
+        """
+        Error raised when the stream is not a valid JSON array of objects.
+
+        Args:
+            msg (str): Description of the problem
+            pos (int): Character offset in the file where it was detected
+        """
+        super().__init__(f"{msg} at position {pos}")
+        self.msg = msg
+        self.pos = pos
+
+
+class _ChunkReader:
+    """Sliding character buffer over a text file"""
+
+    def __init__(self, f, chunk_size):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0       # position inside buf
+        self.offset = 0    # file position of buf[0]
+        self.eof = False
+
+    @property
+    def position(self):
+        return self.offset + self.pos
+
+    def refill(self):
+        """Drop the consumed part of the buffer and read the next chunk"""
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.offset += self.pos
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Return the next non-whitespace character without consuming it ('' at EOF)"""
+        while True:
+            match = NON_WHITESPACE.search(self.buf, self.pos)
+            if match:
+                self.pos = match.start()
+                return self.buf[self.pos]
+            self.pos = len(self.buf)
+            if not self.refill():
+                return ""
+
+    def decode(self, decoder):
+        """Decode the JSON value starting at the current position"""
+        while True:
+            try:
+                value, end = decoder.raw_decode(self.buf, self.pos)
+                self.pos = end
+                return value
+            except json.JSONDecodeError as e:
+                # Either the record continues in the next chunk or the file is corrupt
+                if self.eof or len(self.buf) - self.pos > MAX_RECORD_CHARS or not self.refill():
+                    raise JSONStreamError(e.msg, self.offset + e.pos) from e
+
+
+def iter_videos(file_path, chunk_size=CHUNK_SIZE):
+    """
+    Yield the objects of a top-level JSON array one at a time.
+
+    A trailing comma before the closing bracket, or at the very end of a file
+    left behind by an interrupted writer, is tolerated. Files whose top level is an object are not
+    streamable; their "videos" list (or values) is loaded in one go instead.
+
+    Raises:
+        JSONStreamError: if the file is not a valid JSON array
+    """
+    decoder = json.JSONDecoder()
+    with open(file_path, 'r', encoding='utf-8-sig') as f:
+        reader = _ChunkReader(f, chunk_size)
+        first = reader.peek()
+        if first == '{':
+            f.seek(0)
+            data = json.load(f)
+            yield from data.get('videos', list(data.values()))
+            return
+        if first != '[':
+            raise JSONStreamError("Expected '[' at start of file", reader.position)
+        reader.pos += 1
+
+        expect_value = True
+        while True:
+            char = reader.peek()
+            if char == "":
+                raise JSONStreamError("Unexpected end of file, missing ']'", reader.position)
+            if char == ']':
+                return
+            if char == ',':
+                if expect_value:
+                    raise JSONStreamError("Unexpected ','", reader.position)
+                reader.pos += 1
+                expect_value = True
+                # Tolerate a trailing comma: "[..., {...},]" or "[..., {...},"
+                if reader.peek() in (']', ''):
+                    return
+                continue
+            if not expect_value:
+                raise JSONStreamError("Expected ',' or ']'", reader.position)
+            yield reader.decode(decoder)
+            expect_value = False
+
+
+def count_videos(file_path):
+    """Count the objects in a JSON array file without loading it"""
+    count = 0
+    for _ in iter_videos(file_path):
+        count += 1
+    return count
+
+
+def validate_videos(file_path, required_fields=REQUIRED_FIELDS, max_errors=20):
+    """
+    Stream through a videos file and check its structure.
+
+    Returns:
+        tuple: (number of records read, list of error strings). Syntax errors
+        stop the scan; missing-field errors are capped at max_errors.
+    """
+    count = 0
+    errors = []
+    try:
+        for video in iter_videos(file_path):
+            if not isinstance(video, dict):
+                problem = f"Record {count} is {type(video).__name__}, not an object"
+            else:
+                missing = [field for field in required_fields if field not in video]
+                problem = f"Record {count} is missing fields: {missing}" if missing else ""
+            if problem and len(errors) < max_errors:
+                errors.append(problem)
+            count += 1
+    except JSONStreamError as e:
+        errors.append(f"JSON error after {count} records: {e}")
+    return count, errors
+
+
+def read_around(file_path, position, radius=100):
+    """Return the text around a character position, reading only up to it"""
+    start = max(0, position - radius)
+    with open(file_path, 'r', encoding='utf-8-sig') as f:
+        skipped = 0
+        while skipped < start:
+            chunk = f.read(min(CHUNK_SIZE, start - skipped))
+            if not chunk:
+                return ""
+            skipped += len(chunk)
+        return f.read(position + radius - start)
+
+
+def main(argv):
+    """Count and validate a videos file"""
+    file_path = argv[1] if len(argv) > 1 else "videos.json"
+    count, errors = validate_videos(file_path)
+    print(f"Read {count:,} videos from {file_path}")
+    for error in errors:
+        print(f"  {error}")
+    if not errors:
+        print("File structure is valid")
+    return not errors
+
+
+if __name__ == "__main__":
+    success = main(sys.argv)
+    sys.exit(0 if success else 1)
@@ -4,13 +4,18 @@ Mega Scraper for WHentai - Adds tens of thousands of videos by using multiple so
 """
 
 import json
-import time
-import random
-import requests
-from datetime import datetime
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from bs4 import BeautifulSoup
-import re
+import os
+
+import cassette
+from catalog import KnownVideos, VideoCatalog, use_catalog, use_video_log
+from crawl_budget import CrawlBudget, page_yields
+from crawl_engine import CrawlEngine
+from crawl_frontier import CrawlFrontier
+from extraction_spec import VIDEO_CARDS
+from page_cache import PageCache
+from seen_set import seen_set
+from video_log import VideoLog, append_new_videos
+from video_record import json_default, load_compact_videos
 
 # List of additional sources to scrape from - expanded list for maximum video collection
 ADDITIONAL_SOURCES = [
@@ -172,133 +177,52 @@ ADDITIONAL_SOURCES = [
 # Increase maximum number of pages to scrape per category for more videos
 MAX_PAGES_PER_CATEGORY = 30
 
+# Incremental mode: stop paging a category after this many pages in a row that
+# only list videos we already have (0 walks all MAX_PAGES_PER_CATEGORY pages).
+# Set WHENTAI_FULL_CRAWL=1 for a one-off full crawl.
+INCREMENTAL_STOP_PAGES = 2
+FULL_CRAWL = os.environ.get("WHENTAI_FULL_CRAWL", "") not in ("", "0")
+
+# Requests in flight at once; the request rate itself is set per host in rate_limiter.py
+PER_HOST_CONCURRENCY = 4
+
 # Headers to mimic a real browser
 HEADERS = {
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
     'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
     'Accept-Language': 'en-US,en;q=0.5',
-    'Accept-Encoding': 'gzip, deflate',
-    'Connection': 'keep-alive',
     'Upgrade-Insecure-Requests': '1',
 }
 
-def get_video_data_from_page(url):
-    """Extract video data from a page"""
+def parse_video_cards(html):
+    """Extract video data from the HTML of a listing page"""
     try:
-        response = requests.get(url, headers=HEADERS, timeout=15)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        videos = []
-        
-        # Find all video items
-        video_items = []
-        try:
-            video_items = soup.find_all('div', class_='card sub group')
-        except Exception:
-            pass
-        
-        for item in video_items:
-            # Extract title
-            title = "Untitled"
-            try:
-                find_method = getattr(item, 'find', None)
-                if find_method:
-                    title_elem = find_method('a', {'class': 'item-title item-link rate-link font-medium'})
-                    if title_elem:
-                        get_text_method = getattr(title_elem, 'get_text', None)
-                        if get_text_method:
-                            title = get_text_method(strip=True)
-            except Exception:
-                pass
-            
-            # Extract thumbnail
-            thumbnail = ""
-            try:
-                find_method = getattr(item, 'find', None)
-                if find_method:
-                    thumb_elem = find_method('img', {'class': 'item-image'})
-                    if thumb_elem:
-                        get_method = getattr(thumb_elem, 'get', None)
-                        if get_method:
-                            src = get_method('src')
-                            if src:
-                                thumbnail = src
-            except Exception:
-                pass
-            
-            # Extract detail URL
-            detail_url = ""
-            try:
-                find_method = getattr(item, 'find', None)
-                if find_method:
-                    link_elem = find_method('a', {'class': 'item-title item-link rate-link font-medium'})
-                    if link_elem:
-                        get_method = getattr(link_elem, 'get', None)
-                        if get_method:
-                            href = get_method('href')
-                            if href:
-                                detail_url = href
-            except Exception:
-                pass
-            
-            # Extract categories (if available)
-            categories = []
-            try:
-                find_all_method = getattr(item, 'find_all', None)
-                if find_all_method:
-                    cat_elems = find_all_method('a', {'class': 'item-source block text-xsm'})
-                    for cat in cat_elems:
-                        get_text_method = getattr(cat, 'get_text', None)
-                        if get_text_method:
-                            cat_text = get_text_method(strip=True)
-                            if cat_text and cat_text not in categories:
-                                categories.append(cat_text)
-            except Exception:
-                pass
-            
-            # Only add videos with essential data
-            if title and thumbnail and detail_url:
-                videos.append({
-                    "title": title,
-                    "thumbnail": thumbnail,
-                    "detail_url": detail_url,
-                    "external_url": "",  # Will be populated later if needed
-                    "categories": categories
-                })
-                    
-        return videos
-        
+        cards = VIDEO_CARDS.extract(html)
     except Exception as e:
-        print(f"Error fetching page {url}: {e}")
+        print(f"Error parsing page: {e}")
         return []
-
-def scrape_category(url, max_pages=MAX_PAGES_PER_CATEGORY):
-    """Scrape all pages of a category"""
-    all_videos = []
     
-    for page in range(1, max_pages + 1):
-        page_url = f"{url}?page={page}" if page > 1 else url
-        print(f"Scraping page {page} of {url}")
-        
-        videos = get_video_data_from_page(page_url)
-        if not videos:
-            print(f"No more videos found on page {page}, stopping")
-            break
-            
-        all_videos.extend(videos)
-        print(f"Found {len(videos)} videos on page {page}")
-        
-        # Be respectful to the server - increase delay to handle rate limiting
-        time.sleep(random.uniform(3, 6))
+    videos = []
+    for card in cards:
+        # Only add videos with essential data
+        if card["title"] and card["thumbnail"] and card["detail_url"]:
+            videos.append({
+                "title": card["title"],
+                "thumbnail": card["thumbnail"],
+                "detail_url": card["detail_url"],
+                "external_url": "",  # Will be populated later if needed
+                "categories": card["categories"]
+            })
     
-    return all_videos
+    return videos
 
 def load_existing_videos(filepath="videos.json"):
-    """Load existing videos from JSON file"""
+    """Load existing videos from JSON file (or the JSON Lines log)"""
+    if use_video_log():
+        return VideoLog().load()
     try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        # Compact Video records instead of one full dict per video
+        return load_compact_videos(filepath)
     except FileNotFoundError:
         return []
     except Exception as e:
@@ -306,17 +230,29 @@ def load_existing_videos(filepath="videos.json"):
         return []
 
 def save_videos(videos, filepath="videos.json"):
-    """Save videos to JSON file"""
+    """Save videos to JSON file; returns False if they could not be written"""
     try:
         with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(videos, f, indent=2, ensure_ascii=False)
+            json.dump(videos, f, indent=2, ensure_ascii=False, default=json_default)
         print(f"Saved {len(videos)} videos to {filepath}")
+        return True
     except Exception as e:
         print(f"Error saving videos: {e}")
+        return False
+
+def save_new_videos_to_catalog(new_videos):
+    """Upsert only the videos the SQLite catalog has not seen yet"""
+    unique_new_videos = remove_title_duplicates(remove_duplicates(new_videos))
+    with VideoCatalog() as catalog:
+        truly_new_videos = [video for video in unique_new_videos if not catalog.contains(video)]
+        catalog.upsert_many(truly_new_videos)
+        total = catalog.count()
+    print(f"Upserted {len(truly_new_videos)} new videos into the catalog")
+    return truly_new_videos, total
 
 def remove_duplicates(videos):
     """Remove duplicate videos based on title, thumbnail, detail_url, and external_url"""
-    seen = set()
+    seen = seen_set(len(videos))
     unique_videos = []
     
     for video in videos:
@@ -343,45 +279,26 @@ def remove_title_duplicates(videos):
     
     return unique_videos
 
-def main():
-    """Main function to run the mega scraper"""
-    print("Starting WHentai Mega Scraper")
-    print(f"Will scrape from {len(ADDITIONAL_SOURCES)} categories")
-    print(f"Will scrape up to {MAX_PAGES_PER_CATEGORY} pages per category")
-    
-    # Load existing videos
-    existing_videos = load_existing_videos()
-    print(f"Loaded {len(existing_videos)} existing videos")
+def store_new_videos(all_new_videos, existing_videos):
+    """
+    Deduplicate scraped videos against each other and the stored ones and
+    save the new ones with the configured storage. Returns (added, total).
+
+    Raises:
+        OSError: The videos could not be saved
+    """
+    if use_catalog():
+        truly_new_videos, total = save_new_videos_to_catalog(all_new_videos)
+        return len(truly_new_videos), total
     
     # Create a set of existing video keys for duplicate checking
-    existing_keys = set()
+    existing_keys = seen_set(len(existing_videos) + len(all_new_videos))
     for video in existing_videos:
         detail_url = video.get('detail_url', '') or ''
         external_url = video.get('external_url', '') or ''
         key = f"{video['title']}|{video['thumbnail']}|{detail_url}|{external_url}"
         existing_keys.add(key)
     
-    # Scrape from all sources
-    all_new_videos = []
-    
-    # Use ThreadPoolExecutor for concurrent scraping - reduce workers to avoid rate limiting
-    with ThreadPoolExecutor(max_workers=2) as executor:
-        # Submit all scraping tasks
-        future_to_url = {
-            executor.submit(scrape_category, url): url 
-            for url in ADDITIONAL_SOURCES
-        }
-        
-        # Collect results as they complete
-        for future in as_completed(future_to_url):
-            url = future_to_url[future]
-            try:
-                videos = future.result()
-                print(f"Completed scraping {url}: {len(videos)} videos")
-                all_new_videos.extend(videos)
-            except Exception as e:
-                print(f"Error scraping {url}: {e}")
-    
     # Remove duplicates from new videos
     unique_new_videos = remove_duplicates(all_new_videos)
     print(f"Found {len(unique_new_videos)} unique new videos (first deduplication)")
@@ -410,12 +327,77 @@ def main():
     final_videos = remove_title_duplicates(final_videos)
     print(f"Final video count: {len(final_videos)} (was {len(all_videos)} before deduplication)")
     
-    # Save to file
-    save_videos(final_videos)
+    # A re-scraped video gets a new /out/ token, so only the title deduplication
+    # against the existing videos catches it; keep the new videos that survived it
+    survivors = {id(video) for video in final_videos}
+    truly_new_videos = [video for video in truly_new_videos if id(video) in survivors]
+    
+    # Save to file - the JSON Lines log only needs the new videos appended
+    if use_video_log():
+        append_new_videos(truly_new_videos)
+    elif not save_videos(final_videos):
+        raise OSError("videos.json was not written")
+    return len(truly_new_videos), len(final_videos)
+
+def main():
+    """Main function to run the mega scraper"""
+    print("Starting WHentai Mega Scraper")
+    print(f"Will scrape from {len(ADDITIONAL_SOURCES)} categories")
+    print(f"Will scrape up to {MAX_PAGES_PER_CATEGORY} pages per category")
+    
+    # Hand the request budget to the categories that found new videos in earlier runs;
+    # a full crawl walks every page of every category
+    budget = CrawlBudget()
+    if FULL_CRAWL:
+        plan = MAX_PAGES_PER_CATEGORY
+    else:
+        plan = budget.plan(ADDITIONAL_SOURCES, MAX_PAGES_PER_CATEGORY)
+        print(f"Planned {sum(plan.values())} listing pages across {sum(1 for pages in plan.values() if pages)} categories")
+    
+    # Load existing videos (the SQLite catalog is queried per video instead)
+    catalog_mode = use_catalog()
+    existing_videos = [] if catalog_mode else load_existing_videos()
+    print(f"Loaded {len(existing_videos)} existing videos")
+    
+    # Scrape from all sources
+    all_new_videos = []
+    
+    # Crawl all sources concurrently; the engine enforces the per-host limits
+    # instead of sleeping after every page. Pages fetched by an interrupted run
+    # are reused from the frontier, unchanged pages (304) from the page cache.
+    frontier = CrawlFrontier("mega")
+    page_cache = PageCache()
+    engine = CrawlEngine(per_host=PER_HOST_CONCURRENCY, headers=HEADERS, frontier=frontier,
+                         cache=page_cache)
+    stop_after = 0 if FULL_CRAWL else INCREMENTAL_STOP_PAGES
+    catalog = VideoCatalog() if catalog_mode else None
+    known = KnownVideos(existing_videos, catalog)
+    results = engine.crawl(ADDITIONAL_SOURCES, parse_video_cards, plan,
+                           known=known if stop_after else None, stop_after=stop_after)
+    page_cache.close()
+    yields = page_yields(results, engine.page_sizes, known)
+    if catalog is not None:
+        catalog.close()
+    for url, videos in results.items():
+        print(f"Completed scraping {url}: {len(videos)} videos")
+        all_new_videos.extend(videos)
+    
+    budget.record(yields)
+    budget.close()
+    try:
+        added, total = store_new_videos(all_new_videos, existing_videos)
+    except OSError as e:
+        # Keep the fetched pages so the next run stores them without crawling again
+        print(f"Error storing videos: {e}; keeping the crawl frontier for the next run")
+        frontier.close()
+        return
+    frontier.finish()
+    frontier.close()
     
     print("Mega scraping completed!")
-    print(f"Added {len(truly_new_videos)} new videos")
-    print(f"Total videos: {len(final_videos)}")
+    print(f"Added {added} new videos")
+    print(f"Total videos: {total}")
 
 if __name__ == "__main__":
+    cassette.prepare_run()
     main()
\ No newline at end of file
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Offline decoder for cartoonpornvideos.com /out/?l= redirect tokens
+
+Every detail_url on the listing pages is a redirect link such as
+
+    https://www.cartoonpornvideos.com/out/?l=3AASdM4Z...%3D&c=e8e9095f&v=3&
+
+The `l` parameter is URL-safe base64 of a MessagePack array. The array
+holds the video's public id (the thumbnail id) and the partner URL that the
+redirect page sends the browser to, along with tracking fields. Decoding it
+gives the external URL without downloading and parsing the detail page.
+
+    python out_token.py <detail_url>   # print the decoded fields
+"""
+
+import base64
+import binascii
+import struct
+import sys
+from urllib.parse import parse_qs, urlparse
+
+PUBLIC_ID_INDEX = 2
+TARGET_URL_INDEX = 4
+
+
+class TokenError(ValueError):
+    pass
+
+
+class _Reader:
+    """Minimal MessagePack decoder, covering the types used in /out/ tokens"""
+
+    def __init__(self, data):
+        self.data = data
+        self.pos = 0
+
+    def take(self, size):
+        end = self.pos + size
+        if end > len(self.data):
+            raise TokenError("Token is truncated")
+        chunk = self.data[self.pos:end]
+        self.pos = end
+        return chunk
+
+    def unpack(self, fmt):
+        return struct.unpack(fmt, self.take(struct.calcsize(fmt)))[0]
+
+    def read(self):
+        code = self.unpack(">B")
+        if code <= 0x7f:
+            return code
+        if code >= 0xe0:
+            return code - 0x100
+        if 0xa0 <= code <= 0xbf:
+            return self.text(code & 0x1f)
+        if 0x90 <= code <= 0x9f:
+            return [self.read() for _ in range(code & 0x0f)]
+        if 0x80 <= code <= 0x8f:
+            return self.mapping(code & 0x0f)
+
+        simple = {0xc0: None, 0xc2: False, 0xc3: True}
+        if code in simple:
+            return simple[code]
+        numbers = {
+            0xca: ">f", 0xcb: ">d",
+            0xcc: ">B", 0xcd: ">H", 0xce: ">I", 0xcf: ">Q",
+            0xd0: ">b", 0xd1: ">h", 0xd2: ">i", 0xd3: ">q",
+        }
+        if code in numbers:
+            return self.unpack(numbers[code])
+        if code in (0xd9, 0xda, 0xdb):
+            return self.text(self.unpack({0xd9: ">B", 0xda: ">H", 0xdb: ">I"}[code]))
+        if code in (0xc4, 0xc5, 0xc6):
+            return self.take(self.unpack({0xc4: ">B", 0xc5: ">H", 0xc6: ">I"}[code]))
+        if code in (0xdc, 0xdd):
+            return [self.read() for _ in range(self.unpack(">H" if code == 0xdc else ">I"))]
+        if code in (0xde, 0xdf):
+            return self.mapping(self.unpack(">H" if code == 0xde else ">I"))
+        raise TokenError(f"Unsupported MessagePack type 0x{code:02x}")
+
+    def text(self, size):
+        return self.take(size).decode('utf-8', errors='replace')
+
+    def mapping(self, size):
+        return {self.read(): self.read() for _ in range(size)}
+
+
+def extract_token(detail_url):
+    """Return the raw `l` parameter of an /out/ URL (or the argument itself if it is a bare token)"""
+    if not detail_url:
+        return ""
+    if "?" not in detail_url and "/" not in detail_url:
+        return detail_url
+    values = parse_qs(urlparse(detail_url).query).get('l')
+    return values[0] if values else ""
+
+
+def decode_out_token(detail_url):
+    """
+    Decode an /out/?l= token into its MessagePack fields.
+
+    Args:
+        detail_url (str): Full /out/ URL or the bare `l` value
+
+    Returns:
+        list: The decoded array
+
+    Raises:
+        TokenError: if the token is missing or not in the expected format
+    """
+    token = extract_token(detail_url)
+    if not token:
+        raise TokenError("No l= token in URL")
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+    except (binascii.Error, ValueError) as e:
+        raise TokenError(f"Token is not base64: {e}") from e
+    fields = _Reader(raw).read()
+    if not isinstance(fields, list):
+        raise TokenError("Token does not hold an array")
+    return fields
+
+
+def _is_url(value):
+    return isinstance(value, str) and value.startswith(("http://", "https://"))
+
+
+def external_url_from_detail_url(detail_url):
+    """
+    Resolve the partner URL from a detail_url without any network access.
+
+    Returns:
+        str: The decoded external URL, or "" if the token cannot be decoded
+        (callers should fall back to fetching the detail page)
+    """
+    try:
+        fields = decode_out_token(detail_url)
+    except TokenError:
+        return ""
+    if len(fields) > TARGET_URL_INDEX and _is_url(fields[TARGET_URL_INDEX]):
+        return fields[TARGET_URL_INDEX]
+    # Layout changed: fall back to the first URL-looking field
+    for value in fields:
+        if _is_url(value):
+            return value
+    return ""
+
+
+def public_id_from_detail_url(detail_url):
+    """Return the video's public id (same as its thumbnail id), or "" if unavailable"""
+    try:
+        fields = decode_out_token(detail_url)
+    except TokenError:
+        return ""
+    if len(fields) > PUBLIC_ID_INDEX and isinstance(fields[PUBLIC_ID_INDEX], str):
+        return fields[PUBLIC_ID_INDEX]
+    return ""
+
+
+def main(argv):
+    if len(argv) < 2:
+        print("Usage: python out_token.py <detail_url>")
+        return False
+    try:
+        fields = decode_out_token(argv[1])
+    except TokenError as e:
+        print(f"Could not decode token: {e}")
+        return False
+    for index, value in enumerate(fields):
+        print(f"{index:>2}: {value!r}")
+    print(f"\nExternal URL: {external_url_from_detail_url(argv[1])}")
+    return True
+
+
+if __name__ == "__main__":
+    success = main(sys.argv)
+    sys.exit(0 if success else 1)
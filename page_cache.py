@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Conditional revalidation cache for listing pages
+
+Listing pages (/popular, /category/<name>?page=N) used to be downloaded and
+parsed with BeautifulSoup in full on every run. The cache keeps, per URL and
+parse function, the ETag/Last-Modified validators of the last response and
+the videos parsed from it. The crawl engine sends them back as
+If-None-Match/If-Modified-Since; a 304 Not Modified reuses the stored videos
+without transferring or parsing the page again.
+
+    python page_cache.py           # show what is cached
+    python page_cache.py clear     # drop the cache
+
+benchmark_revalidation.py measures the savings against stub_server.py.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from functools import lru_cache
+
+# === CONFIG ===
+PAGE_CACHE_DB = "page_cache.db"
+MAX_AGE = 7 * 24 * 3600  # entries not revalidated for a week are dropped
+# Shared parsing code whose changes must also invalidate the cached items
+PARSER_MODULES = ("extraction_spec.py", "html_parser.py")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    url TEXT NOT NULL,
+    parser TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    items TEXT NOT NULL,
+    checked REAL NOT NULL,
+    PRIMARY KEY (url, parser)
+);
+"""
+
+UPSERT_SQL = """
+INSERT INTO pages (url, parser, etag, last_modified, items, checked)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT(url, parser) DO UPDATE SET
+    etag = excluded.etag,
+    last_modified = excluded.last_modified,
+    items = excluded.items,
+    checked = excluded.checked
+"""
+
+
+@lru_cache(maxsize=None)
+def _source_digest(path):
+    """Short hash of a source file and the shared parsing modules"""
+    digest = hashlib.sha1()
+    directory = os.path.dirname(os.path.abspath(__file__))
+    for file_path in (path,) + tuple(os.path.join(directory, name) for name in PARSER_MODULES):
+        try:
+            with open(file_path, 'rb') as f:
+                digest.update(f.read())
+        except OSError:
+            digest.update(file_path.encode())
+    return digest.hexdigest()[:12]
+
+
+def parser_key(parse):
+    """
+    Name a parse function by file and function name, so the same page parsed by
+    two scrapers is cached separately and running a scraper as a script or
+    importing it gives the same key. A hash of the source file and the shared
+    parsing modules is appended, so items parsed by an older parser are not
+    reused after its code changes.
+    """
+    code = getattr(parse, "__code__", None)
+    if code:
+        path = code.co_filename
+    else:
+        path = getattr(sys.modules.get(getattr(parse, "__module__", None)), "__file__", None) or ""
+    source = os.path.basename(path) or getattr(parse, "__module__", "")
+    return f"{source}:{getattr(parse, '__qualname__', repr(parse))}@{_source_digest(path)}"
+
+
+class PageCache:
+    def __init__(self, db_path=PAGE_CACHE_DB, max_age=MAX_AGE):
+        """
+        Open (and create if needed) the page cache.
+
+        Args:
+            db_path (str): Path to the SQLite database file
+            max_age (int): Seconds after which unrevalidated entries are dropped
+        """
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        with self.conn:
+            self.conn.execute("DELETE FROM pages WHERE checked < ?", (time.time() - max_age,))
+        self.lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def get(self, url, parser):
+        """
+        Return (validators, items) stored for a page, or None.
+
+        validators is a dict with "etag" and/or "last_modified".
+        """
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT etag, last_modified, items FROM pages WHERE url = ? AND parser = ?",
+                (url, parser),
+            ).fetchone()
+        if row is None:
+            return None
+        etag, last_modified, items = row
+        return {"etag": etag, "last_modified": last_modified}, json.loads(items)
+
+    def put(self, url, parser, validators, items):
+        """Store a page's validators and parsed items; pages without validators are skipped"""
+        if not validators or not (validators.get("etag") or validators.get("last_modified")):
+            return False
+        with self.lock, self.conn:
+            self.conn.execute(UPSERT_SQL, (
+                url, parser, validators.get("etag"), validators.get("last_modified"),
+                json.dumps(items, ensure_ascii=False), time.time(),
+            ))
+        return True
+
+    def touch(self, url, parser):
+        """Mark a page as revalidated (after a 304)"""
+        with self.lock, self.conn:
+            self.conn.execute(
+                "UPDATE pages SET checked = ? WHERE url = ? AND parser = ?", (time.time(), url, parser)
+            )
+
+    def count(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+
+    def close(self):
+        """Close the database connection"""
+        if self.conn:
+            self.conn.close()
+            self.conn = None
+
+
+def main(argv):
+    """Show or clear the page cache"""
+    with PageCache() as cache:
+        if len(argv) > 1 and argv[1] == "clear":
+            with cache.conn:
+                cache.conn.execute("DELETE FROM pages")
+            print(f"Cleared {cache.db_path}")
+            return True
+        print(f"{cache.db_path}: {cache.count()} cached pages")
+        for parser, count in cache.conn.execute(
+            "SELECT parser, COUNT(*) FROM pages GROUP BY parser ORDER BY parser"
+        ):
+            print(f"  {parser}: {count}")
+    return True
+
+
+if __name__ == "__main__":
+    success = main(sys.argv)
+    sys.exit(0 if success else 1)
@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""
+In-process scraping pipeline for WHentai
+
+The orchestrators used to chain scripts with subprocess.run: every stage paid
+for a fresh interpreter, loaded videos.json again and wrote it back, and
+thousands_scraper.py rewrote enhanced_scraper.py's source to raise its limits.
+The pipeline runs the stages as function calls against one in-memory store:
+
+  - scrape: each scraper's scrape() returns the videos it did not know,
+    with limits (max_pages, limit) passed as arguments
+  - dedup: new videos are checked against the store by catalog.video_key and
+    title, the same identity the SQLite catalog uses
+  - tag: categories from add_category_tags.extract_categories_from_title
+  - summarize: counts per stage and pass, returned as a dict
+
+The store is loaded once and saved after every SAVE_EVERY passes, with the
+configured storage (videos.json, the JSON Lines log or the SQLite catalog),
+so a multi-pass run that is killed keeps the passes it finished. Crawl
+frontiers of an interrupted run are resumed by the first pass of each stage
+and cleared once that pass is saved.
+
+A deadline for the whole run replaces the orchestrators' old subprocess
+timeouts: once it has passed, http_client fails every further request, the
+running stage returns what it found, no other stage or pass starts and the
+store is saved.
+
+    python pipeline.py [stage ...]     # default: enhanced additional
+"""
+
+import importlib
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+import cassette
+import http_client
+from add_category_tags import extract_categories_from_title
+from catalog import JSON_FILE, VideoCatalog, title_key, use_catalog, use_video_log, video_key
+from crawl_frontier import CrawlFrontier
+from video_log import VideoLog, append_new_videos
+
+# === CONFIG ===
+# stage name -> (display name, module with scrape(is_known, max_pages=, limit=, ...))
+STAGES = {
+    "enhanced": ("Enhanced Scraper", "enhanced_scraper"),
+    "additional": ("Additional Category Scraper", "additional_scraper"),
+    "cartoon": ("Basic Cartoon Scraper", "cartoon_scraper"),
+}
+RESUMABLE_STAGES = ("enhanced", "additional")  # stages whose scrape() takes a crawl frontier
+DEFAULT_STAGES = ["enhanced", "additional"]
+SAVE_EVERY = 1  # passes between saves of the store
+
+
+class VideoStore:
+    def __init__(self):
+        """
+        Load the stored videos once: videos.json or the JSON Lines log into
+        memory, or open the SQLite catalog and keep only the new videos.
+        """
+        self.catalog = VideoCatalog() if use_catalog() else None
+        self.videos = []
+        if self.catalog is None:
+            self.videos = self._load()
+        else:
+            self.catalog_count = self.catalog.count()
+        self.keys = {video_key(video) for video in self.videos}
+        self.titles = {title_key(video.get('title', '')) for video in self.videos}
+        self.new_videos = []  # added since the last save
+        self.retagged = []
+        self.added = 0
+        self.initial_count = len(self)
+        print(f"Loaded {self.initial_count} existing videos")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    @staticmethod
+    def _load():
+        if use_video_log():
+            return VideoLog().load()
+        if not os.path.exists(JSON_FILE):
+            return []
+        try:
+            with open(JSON_FILE, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"Could not load existing videos: {e}")
+            return []
+
+    def __len__(self):
+        if self.catalog is not None:
+            return self.catalog_count + self.added
+        return len(self.videos)
+
+    def contains(self, video):
+        """True if the video, or another video with the same title, is stored or was added this run"""
+        if video_key(video) in self.keys or title_key(video.get('title', '')) in self.titles:
+            return True
+        return self.catalog is not None and self.catalog.contains(video)
+
+    def add(self, videos):
+        """
+        Dedup stage: keep the videos that are not in the store yet.
+
+        Returns:
+            list: The videos added
+        """
+        added = []
+        for video in videos:
+            if self.contains(video):
+                continue
+            self.keys.add(video_key(video))
+            self.titles.add(title_key(video.get('title', '')))
+            added.append(video)
+        self.new_videos.extend(added)
+        self.added += len(added)
+        if self.catalog is None:
+            self.videos.extend(added)
+        return added
+
+    def tag(self):
+        """
+        Tag stage: set the categories of the new videos, and of loaded videos
+        whose tags are out of date (the catalog is only retagged by
+        add_category_tags.py).
+        """
+        for video in self.new_videos:
+            video['categories'] = extract_categories_from_title(video.get('title', ''))
+        new = {id(video) for video in self.new_videos}
+        for video in self.videos:
+            if id(video) in new:
+                continue
+            categories = extract_categories_from_title(video.get('title', ''))
+            if video.get('categories') != categories:
+                video['categories'] = categories
+                self.retagged.append(video)
+        if self.retagged:
+            print(f"Updated the category tags of {len(self.retagged)} existing videos")
+
+    def save(self, export=False):
+        """
+        Write the changes since the last save.
+
+        Args:
+            export (bool): Also regenerate videos.json from the catalog or log
+        """
+        changed = self.new_videos + self.retagged
+        if self.catalog is not None:
+            if changed:
+                self.catalog.upsert_many(changed)
+            print(f"Saved {len(self.new_videos)} new videos to {self.catalog.db_path}")
+            if export:
+                count = self.catalog.export_json(JSON_FILE)
+                print(f"Exported {count} videos from the catalog to {JSON_FILE}")
+        elif use_video_log():
+            if changed:
+                append_new_videos(changed)
+            if export:
+                count = VideoLog().export_json(JSON_FILE)
+                print(f"Exported {count} videos from the log to {JSON_FILE}")
+        elif changed:
+            with open(JSON_FILE, 'w', encoding='utf-8') as f:
+                json.dump(self.videos, f, indent=2, ensure_ascii=False)
+            print(f"Saved {len(self.videos)} videos to {JSON_FILE}")
+        self.new_videos = []
+        self.retagged = []
+
+    def recent_videos(self, hours=24):
+        """Videos scraped in the last N hours, the unsaved new ones included"""
+        cutoff = datetime.now() - timedelta(hours=hours)
+        if self.catalog is not None:
+            videos = self.catalog.videos_since(cutoff.isoformat()) + self.new_videos
+        else:
+            videos = self.videos
+        return [video for video in videos if _scraped_after(video, cutoff)]
+
+    def close(self):
+        if self.catalog is not None:
+            self.catalog.close()
+            self.catalog = None
+
+
+def _scraped_after(video, cutoff):
+    scraped_at = video.get('scraped_at')
+    if not scraped_at:
+        return False
+    try:
+        scraped_time = datetime.fromisoformat(scraped_at.replace('Z', '+00:00'))
+    except ValueError:
+        # If we can't parse the date, skip this video
+        return False
+    if scraped_time.tzinfo is not None:
+        scraped_time = scraped_time.astimezone().replace(tzinfo=None)
+    return scraped_time > cutoff
+
+
+def run_stage(store, stage, frontier=None, max_pages=None, limit=None):
+    """
+    Scrape stage: run one scraper in process and add its new videos to the store.
+
+    Args:
+        store (VideoStore): Store the scraper checks and fills
+        stage (str): Name in STAGES
+        frontier (CrawlFrontier): Resume state for the resumable stages
+        max_pages (int): Pages per source (None for the scraper's default)
+        limit (int): Most new videos this stage returns (None for the scraper's default)
+
+    Returns:
+        int: Videos added, or None if the scraper failed
+    """
+    name, module_name = STAGES[stage]
+    print(f"\n=== Running {name} ===")
+    options = {}
+    if max_pages is not None:
+        options["max_pages"] = max_pages
+    if limit is not None:
+        options["limit"] = limit
+    if stage in RESUMABLE_STAGES:
+        options["frontier"] = frontier
+    try:
+        scraper = importlib.import_module(module_name)
+        videos = scraper.scrape(store.contains, **options)
+    except Exception as e:
+        print(f"✗ {name} failed: {e}")
+        return None
+    added = store.add(videos)
+    print(f"✓ {name} added {len(added)} new videos")
+    return len(added)
+
+
+def run_pipeline(stages=None, passes=1, wait=0, max_pages=None, limit=None, fallbacks=None,
+                 export=False, deadline=None, save_every=SAVE_EVERY):
+    """
+    Load the store, run the scrape stages for a number of passes, and tag and
+    save the new videos every `save_every` passes and at the end.
+
+    Args:
+        stages (list): Stage names, in order (default DEFAULT_STAGES)
+        passes (int): Times the stages are run
+        wait (float): Seconds to wait between passes, to be gentle on the site
+        max_pages (int): Pages per source for every stage (None for each scraper's default)
+        limit (int): Most new videos per stage and pass (None for each scraper's default)
+        fallbacks (list): Stages tried in order, until one succeeds, in a pass
+            where every stage failed
+        export (bool): Regenerate videos.json when the storage is the catalog or log
+        deadline (float): Seconds the whole run may take (None for no limit)
+        save_every (int): Passes between saves of the store
+
+    Returns:
+        dict: Summary of the run
+    """
+    stages = stages or DEFAULT_STAGES
+    fallbacks = fallbacks or []
+    frontiers = {stage: CrawlFrontier(stage) for stage in stages + fallbacks if stage in RESUMABLE_STAGES}
+    succeeded = {}  # display name -> True once the stage succeeded in any pass
+    per_pass = []
+    ends_at = time.time() + deadline if deadline else None
+    http_client.set_deadline(ends_at)
+
+    def out_of_time():
+        if ends_at is not None and time.time() >= ends_at:
+            print(f"Deadline of {deadline:.0f}s reached, not starting more scrapers")
+            return True
+        return False
+
+    unfinished = list(frontiers.values())
+
+    def save(store, export=False):
+        print("\n=== Updating Video Categories ===")
+        store.tag()
+        store.save(export=export)
+        # The interrupted crawls were resumed by the first pass, which is saved now
+        while unfinished:
+            unfinished.pop().finish()
+
+    try:
+        with VideoStore() as store:
+            recent_before = len(store.recent_videos())
+            for pass_number in range(1, passes + 1):
+                if pass_number > 1 and wait:
+                    print(f"\nWaiting {wait:.0f} seconds before next pass...")
+                    time.sleep(wait if ends_at is None else max(0, min(wait, ends_at - time.time())))
+                if out_of_time():
+                    break
+                if passes > 1:
+                    print(f"\n=== Pass #{pass_number}/{passes} ===")
+                added_this_pass = 0
+                pass_succeeded = False
+                for stage in stages + fallbacks:
+                    if stage in fallbacks and pass_succeeded or out_of_time():
+                        break
+                    # Only the first pass resumes an interrupted crawl; later passes fetch afresh
+                    frontier = frontiers.get(stage) if pass_number == 1 else None
+                    added = run_stage(store, stage, frontier, max_pages, limit)
+                    name = STAGES[stage][0]
+                    succeeded[name] = succeeded.get(name, False) or added is not None
+                    if added is not None:
+                        pass_succeeded = True
+                        added_this_pass += added
+                per_pass.append(added_this_pass)
+                print(f"Pass #{pass_number} added {added_this_pass} videos, {len(store)} in total")
+                if pass_succeeded and pass_number < passes and save_every and pass_number % save_every == 0:
+                    save(store)
+
+            successful = [name for name, ok in succeeded.items() if ok]
+            if successful:
+                save(store, export)
+            recent_after = len(store.recent_videos())
+            summary = {
+                "initial_count": store.initial_count,
+                "final_count": len(store),
+                "added_videos": store.added,
+                "successful_scrapers": successful,
+                "failed_scrapers": [name for name, ok in succeeded.items() if not ok],
+                "added_per_pass": per_pass,
+                "recent_before": recent_before,
+                "recent_after": recent_after,
+            }
+    finally:
+        http_client.set_deadline(None)
+        for frontier in frontiers.values():
+            frontier.close()
+    return summary
+
+
+def main(argv):
+    stages = argv[1:] or DEFAULT_STAGES
+    unknown = [stage for stage in stages if stage not in STAGES]
+    if unknown:
+        print(f"Unknown stages: {', '.join(unknown)} (choose from {', '.join(STAGES)})")
+        return False
+    print(f"=== WHentai Pipeline - {datetime.now().isoformat()} ===")
+    summary = run_pipeline(stages)
+    print("\n=== Scraping Summary ===")
+    print(f"Initial video count: {summary['initial_count']}")
+    print(f"Final video count: {summary['final_count']}")
+    print(f"Videos added: {summary['added_videos']}")
+    return bool(summary["successful_scrapers"])
+
+
+if __name__ == "__main__":
+    cassette.prepare_run()
+    success = main(sys.argv)
+    sys.exit(0 if success else 1)
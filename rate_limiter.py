@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+"""
+Per-host token-bucket rate limiter shared by all WHentai scrapers
+
+Replaces the fixed random sleeps after every request. Each host has a bucket
+that refills at `rate` requests per second and holds up to `burst` tokens.
+A caller reserves the next free slot and waits only until that slot, so
+requests to other hosts are never held up and a busy host runs at exactly
+its configured rate instead of well below it.
+
+The rate and the number of requests in flight adapt to the origin AIMD-style
+(additive increase, multiplicative decrease): every successful response nudges
+them up, while a 429 (or a 503 with Retry-After), or an error rate above
+ERROR_RATE_LIMIT, halves them. A Retry-After header pauses the host for the
+time it asks for.
+
+http_client.get/head wait on the limiter and report every response back;
+the asyncio crawl engine awaits it on the event loop instead of blocking a
+worker thread.
+
+    import rate_limiter
+    rate_limiter.configure_host("https://example.com", rate=2.0, burst=4)
+    print(rate_limiter.LIMITER.stats())
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+# === CONFIG ===
+DEFAULT_RATE = 5.0   # requests per second for hosts without an entry below
+DEFAULT_BURST = 10
+# The listing site all scrapers crawl; every scraper shares this budget
+HOST_RATES = {
+    "www.cartoonpornvideos.com": (1.0, 2),
+}
+
+# AIMD tuning
+ADAPTIVE = True
+MIN_RATE = 0.1            # never go slower than one request per 10 seconds
+MAX_RATE_FACTOR = 4.0     # a host may speed up to 4x its configured rate
+RATE_STEP = 0.25          # additive increase per second of clean traffic, as a share of the last tolerated rate
+DECREASE_FACTOR = 0.5     # multiplicative decrease on throttling
+DECREASE_COOLDOWN = 1.0   # seconds; a burst of 429s for requests already in flight counts once
+DEFAULT_CONCURRENCY = 8   # starting cap on requests in flight per host
+MAX_RETRY_AFTER = 300     # ignore Retry-After values above 5 minutes
+ERROR_WINDOW = 50         # responses kept per host for the error rate
+ERROR_RATE_LIMIT = 0.2    # back off when more than 20% of recent requests fail
+
+THROTTLE_STATUSES = (429, 503)
+
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        """
+        Create a token bucket.
+
+        Args:
+            rate (float): Tokens added per second
+            burst (int): Bucket capacity (requests allowed back to back)
+        """
+        self.rate = float(rate)
+        self.burst = max(1, int(burst))
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self):
+        """
+        Take a token, returning how many seconds the caller must wait for it.
+
+        Tokens may go negative: each reservation queues behind the previous
+        ones, so concurrent callers are spaced exactly 1/rate apart.
+        """
+        with self.lock:
+            self._refill(time.monotonic())
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+    def set_rate(self, rate, burst=None):
+        """Change the refill rate (and optionally the burst) in place"""
+        with self.lock:
+            self._refill(time.monotonic())
+            # Keep the queue of outstanding reservations the same length in time
+            if self.tokens < 0:
+                self.tokens = self.tokens / self.rate * rate
+            self.rate = float(rate)
+            if burst is not None:
+                self.burst = max(1, int(burst))
+
+    def pause(self, seconds):
+        """Hand out no tokens for the next `seconds` (e.g. after Retry-After)"""
+        with self.lock:
+            self._refill(time.monotonic())
+            self.tokens = min(self.tokens, 0.0) - seconds * self.rate
+
+    def acquire(self):
+        """Block until a token is available"""
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    async def acquire_async(self):
+        """Wait for a token without blocking the event loop"""
+        delay = self.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return delay
+
+
+class HostState:
+    def __init__(self, rate, burst):
+        """
+        Rate, concurrency and error tracking for one host.
+
+        Args:
+            rate (float): Configured (starting) requests per second
+            burst (int): Token bucket capacity
+        """
+        self.bucket = TokenBucket(rate, burst)
+        self.step_rate = float(rate)
+        self.max_rate = float(rate) * MAX_RATE_FACTOR
+        self.concurrency = float(DEFAULT_CONCURRENCY)
+        self.max_concurrency = DEFAULT_CONCURRENCY
+        self.requests = 0
+        self.throttled = 0
+        self.errors = 0
+        self.recent = deque(maxlen=ERROR_WINDOW)
+        self.last_decrease = 0.0
+        self.lock = threading.Lock()
+
+    @property
+    def rate(self):
+        return self.bucket.rate
+
+    def error_rate(self):
+        """Share of failed responses among the last ERROR_WINDOW"""
+        if not self.recent:
+            return 0.0
+        return 1 - sum(self.recent) / len(self.recent)
+
+    def increase(self):
+        """Additive increase after a clean response"""
+        with self.lock:
+            rate = self.bucket.rate
+            if rate < self.max_rate:
+                # One response arrives every 1/rate seconds, so this adds
+                # RATE_STEP * step_rate req/s per second
+                self.bucket.set_rate(min(self.max_rate, rate + RATE_STEP * self.step_rate / rate))
+            if self.concurrency < self.max_concurrency:
+                self.concurrency = min(self.max_concurrency, self.concurrency + 1 / self.concurrency)
+
+    def decrease(self):
+        """Multiplicative decrease after throttling or too many errors; False during the cooldown"""
+        with self.lock:
+            now = time.monotonic()
+            if now - self.last_decrease < DECREASE_COOLDOWN:
+                return False
+            self.last_decrease = now
+            self.bucket.set_rate(max(MIN_RATE, self.bucket.rate * DECREASE_FACTOR))
+            # Grow back in steps sized to the rate that is known to be tolerated
+            self.step_rate = self.bucket.rate
+            self.concurrency = max(1.0, self.concurrency * DECREASE_FACTOR)
+            # Start the error window over so one bad patch is not punished twice
+            self.recent.clear()
+            return True
+
+    def snapshot(self):
+        return {
+            "rate": round(self.bucket.rate, 3),
+            "concurrency": int(self.concurrency),
+            "requests": self.requests,
+            "throttled": self.throttled,
+            "errors": self.errors,
+            "error_rate": round(self.error_rate(), 3),
+        }
+
+
+def host_of(url):
+    """Return the lower-cased host of a URL (or the argument if it is already a host)"""
+    if "://" not in url:
+        return url.lower()
+    return urlparse(url).netloc.lower()
+
+
+def parse_retry_after(value):
+    """Return the seconds asked for by a Retry-After header (seconds or HTTP date), or None"""
+    if not value:
+        return None
+    value = str(value).strip()
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError, IndexError, OverflowError):
+            return None
+    return min(max(seconds, 0.0), MAX_RETRY_AFTER)
+
+
+class RateLimiter:
+    def __init__(self, default_rate=DEFAULT_RATE, default_burst=DEFAULT_BURST, host_rates=None,
+                 adaptive=ADAPTIVE):
+        """
+        Create a limiter holding one bucket per host.
+
+        Args:
+            default_rate (float): Requests per second for unconfigured hosts
+            default_burst (int): Burst for unconfigured hosts
+            host_rates (dict): host -> (rate, burst) overrides
+            adaptive (bool): Adjust rate and concurrency from responses (AIMD)
+        """
+        self.default_rate = default_rate
+        self.default_burst = default_burst
+        self.host_rates = dict(host_rates or {})
+        self.adaptive = adaptive
+        self.hosts = {}
+        self.lock = threading.Lock()
+
+    def host_state(self, url):
+        """Return the state for a URL's host, creating it on first use"""
+        host = host_of(url)
+        state = self.hosts.get(host)
+        if state is None:
+            with self.lock:
+                state = self.hosts.get(host)
+                if state is None:
+                    rate, burst = self.host_rates.get(host, (self.default_rate, self.default_burst))
+                    state = self.hosts[host] = HostState(rate, burst)
+        return state
+
+    def bucket(self, url):
+        """Return the token bucket for a URL's host"""
+        return self.host_state(url).bucket
+
+    def configure_host(self, url, rate, burst=None):
+        """Set the (starting) rate and burst for a host"""
+        host = host_of(url)
+        burst = burst if burst is not None else self.host_rates.get(host, (0, self.default_burst))[1]
+        with self.lock:
+            self.host_rates[host] = (rate, burst)
+            state = self.hosts.get(host)
+        if state is not None:
+            state.bucket.set_rate(rate, burst)
+            state.step_rate = float(rate)
+            state.max_rate = float(rate) * MAX_RATE_FACTOR
+
+    def set_max_concurrency(self, url, limit):
+        """Cap the requests in flight for a host (the AIMD ceiling)"""
+        state = self.host_state(url)
+        with state.lock:
+            state.max_concurrency = max(1, int(limit))
+            state.concurrency = min(state.concurrency, state.max_concurrency)
+
+    def concurrency(self, url):
+        """Current number of requests allowed in flight for a host"""
+        return max(1, int(self.host_state(url).concurrency))
+
+    def wait(self, url):
+        """Block until a request to this URL's host is allowed"""
+        if getattr(_local, "waited", False):
+            # The caller already took this request's token on the event loop
+            _local.waited = False
+            return 0.0
+        return self.bucket(url).acquire()
+
+    async def wait_async(self, url):
+        """Await until a request to this URL's host is allowed"""
+        return await self.bucket(url).acquire_async()
+
+    def record(self, url, status, retry_after=None):
+        """
+        Feed a response back into the host's rate.
+
+        Args:
+            url (str): Requested URL
+            status (int): HTTP status, or None for a connection error/timeout
+            retry_after (str): Value of the Retry-After header, if any
+        """
+        state = self.host_state(url)
+        # A 503 without Retry-After is as likely an outage as throttling, so it
+        # only counts towards the error rate
+        throttled = status == 429 or (status in THROTTLE_STATUSES and bool(retry_after))
+        failed = not throttled and (status is None or status >= 500)
+        with state.lock:
+            state.requests += 1
+            state.throttled += throttled
+            state.errors += failed
+            # Throttling is handled directly below; the window tracks other errors
+            if not throttled:
+                state.recent.append(0 if failed else 1)
+            too_many_errors = (failed and len(state.recent) >= ERROR_WINDOW // 5
+                               and state.error_rate() > ERROR_RATE_LIMIT)
+
+        if throttled or too_many_errors:
+            if self.adaptive and state.decrease():
+                print(f"Backing off {host_of(url)}: {state.rate:.2f} req/s, "
+                      f"{int(state.concurrency)} in flight (status {status})")
+            delay = parse_retry_after(retry_after)
+            if delay:
+                state.bucket.pause(delay)
+        elif self.adaptive and not failed:
+            state.increase()
+
+    def stats(self):
+        """Per-host snapshot: rate, concurrency, request/throttle/error counts"""
+        return {host: state.snapshot() for host, state in sorted(self.hosts.items())}
+
+
+LIMITER = RateLimiter(host_rates=HOST_RATES)
+_local = threading.local()
+
+
+def configure_host(url, rate, burst=None):
+    """Set the shared rate for a host"""
+    LIMITER.configure_host(url, rate, burst)
+
+
+def wait(url):
+    """Block until the shared limiter allows a request to this URL's host"""
+    return LIMITER.wait(url)
+
+
+async def wait_async(url):
+    """Await the shared limiter for this URL's host"""
+    return await LIMITER.wait_async(url)
+
+
+def record(url, status, retry_after=None):
+    """Report a response (or None for a failed request) to the shared limiter"""
+    LIMITER.record(url, status, retry_after)
+
+
+@contextmanager
+def already_waited():
+    """
+    Mark the next request made by this thread as already paid for.
+
+    Used by the crawl engine, which awaits the limiter on the event loop and
+    then runs the blocking fetch on a worker thread. Retries inside the fetch
+    wait on the limiter as usual.
+    """
+    _local.waited = True
+    try:
+        yield
+    finally:
+        _local.waited = False
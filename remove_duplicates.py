@@ -7,6 +7,9 @@ import json
 import os
 from collections import defaultdict
 
+from catalog import VideoCatalog, use_catalog, use_video_log
+from video_log import VideoLog
+
 def load_videos(file_path):
     """Load videos from JSON file"""
     try:
@@ -92,10 +95,47 @@ def remove_duplicates(videos):
     
     return unique_videos
 
+def remove_duplicates_from_catalog():
+    """Delete duplicate rows from the SQLite catalog, keeping the first occurrence"""
+    with VideoCatalog() as catalog:
+        row_ids = []
+        videos = []
+        for row_id, video in catalog.iter_rows():
+            row_ids.append(row_id)
+            videos.append(video)
+        
+        duplicates = identify_duplicates(videos)
+        removed = catalog.delete_ids(row_ids[dup[0]] for dup in duplicates)
+        
+        print(f"\n=== Summary ===")
+        print(f"Original video count: {len(videos):,}")
+        print(f"Videos after deduplication: {catalog.count():,}")
+        print(f"Duplicates removed: {removed:,}")
+
+def remove_duplicates_from_log():
+    """Append deletion markers for duplicates to the JSON Lines log, then compact it"""
+    log = VideoLog()
+    videos = log.load()
+    duplicates = identify_duplicates(videos)
+    removed = log.delete(videos[dup[0]] for dup in duplicates)
+    log.compact()
+    
+    print(f"\n=== Summary ===")
+    print(f"Original video count: {len(videos):,}")
+    print(f"Videos after deduplication: {len(videos) - removed:,}")
+    print(f"Duplicates removed: {removed:,}")
+
 def main():
     """Main function to remove duplicates from the video database"""
     print("=== WHentai Duplicate Video Remover ===\n")
     
+    if use_catalog():
+        remove_duplicates_from_catalog()
+        return
+    if use_video_log():
+        remove_duplicates_from_log()
+        return
+    
     # File paths
     videos_file = "D:\\Website Project\\WHentai\\WHentai\\videos.json"
     backup_file = "D:\\Website Project\\WHentai\\WHentai\\videos_backup_before_dedup.json"
@@ -5,6 +5,8 @@ import random
 from urllib.parse import urljoin, urlparse
 import logging
 
+from browser_pool import BrowserPool
+
 # Optional Playwright support (uncomment USE_PLAYWRIGHT to enable)
 USE_PLAYWRIGHT = False
 
@@ -27,9 +29,8 @@ class WebScraper:
         self.session.headers.update({"User-Agent": USER_AGENT})
         self.delay_range = delay_range
         
-        # Playwright components (only loaded if needed)
-        self.playwright = None
-        self.browser = None
+        # Browser pool for Playwright fetches (browsers are launched on first use)
+        self.browser_pool = BrowserPool(headers={"User-Agent": USER_AGENT})
         
     def get_page_with_requests(self, url, timeout=10):
         """
@@ -64,27 +65,8 @@ class WebScraper:
             BeautifulSoup object or None if failed
         """
         try:
-            # Lazy import to avoid dependency issues if not needed
-            from playwright.sync_api import sync_playwright
-            
             logger.info(f"Fetching {url} with Playwright")
-            
-            # Initialize Playwright if not already done
-            if not self.playwright:
-                self.playwright = sync_playwright().start()
-                self.browser = self.playwright.chromium.launch(headless=True)
-            
-            page = self.browser.new_page()
-            page.set_default_timeout(timeout)
-            page.goto(url)
-            
-            # Wait for page to load
-            page.wait_for_load_state("networkidle")
-            
-            # Get page content
-            content = page.content()
-            page.close()
-            
+            content = self.browser_pool.fetch(url, timeout)
             return BeautifulSoup(content, 'html.parser')
         except Exception as e:
             logger.error(f"Error fetching {url} with Playwright: {e}")
@@ -166,10 +148,7 @@ class WebScraper:
     
     def close(self):
         """Clean up resources."""
-        if self.browser:
-            self.browser.close()
-        if self.playwright:
-            self.playwright.stop()
+        self.browser_pool.close()
 
 # Example usage
 if __name__ == "__main__":
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Compact seen-sets for deduplicating videos at catalog scale
+
+mega_scraper's duplicate checks keep every `title|thumbnail|detail_url|
+external_url` key in a Python set, and catalog.KnownVideos every detail URL.
+The /out/ detail URLs are hundreds of bytes of base64 each, so at 58k videos
+those sets alone hold tens of MB, growing with the catalog.
+
+SeenSet keeps a Bloom filter in memory (about 1.8 bytes per key at a 0.1%
+false-positive rate) and the keys themselves in a temporary SQLite file.
+A key the filter has never seen is answered from memory; only a positive is
+checked on disk, so the answers are exact and only false positives
+(BLOOM_ERROR_RATE of the new keys) cost a disk lookup.
+
+Set WHENTAI_SEEN_SET=bloom to use it for the deduplication in mega_scraper.py
+and for KnownVideos; the default keeps plain sets:
+
+    seen = seen_set(expected_keys)
+    if key not in seen:
+        seen.add(key)
+"""
+
+import hashlib
+import math
+import os
+import sqlite3
+import tempfile
+import weakref
+
+# === CONFIG ===
+SEEN_SET = os.environ.get("WHENTAI_SEEN_SET", "set").strip().lower()  # set | bloom
+BLOOM_ERROR_RATE = float(os.environ.get("WHENTAI_BLOOM_ERROR_RATE", "0.001"))
+MIN_CAPACITY = 10000   # smallest filter; a filter past its capacity gets more false positives
+FLUSH_EVERY = 1000     # added keys buffered in memory before writing to disk
+
+
+class BloomFilter:
+    def __init__(self, capacity, error_rate=BLOOM_ERROR_RATE):
+        """
+        Create an empty Bloom filter.
+
+        Args:
+            capacity (int): Keys it is sized for
+            error_rate (float): False-positive rate at capacity
+        """
+        capacity = max(1, capacity)
+        self.bits = max(64, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.bits / capacity * math.log(2)))
+        self.array = bytearray((self.bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        # Double hashing: two 64-bit halves of one digest give every position
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        bits = self.bits
+        return [(h1 + i * h2) % bits for i in range(self.hashes)]
+
+    def add(self, key):
+        """Add a key; returns False if it may have been present already"""
+        array = self.array
+        new = False
+        for position in self._positions(key):
+            mask = 1 << (position & 7)
+            if not array[position >> 3] & mask:
+                array[position >> 3] |= mask
+                new = True
+        self.count += new
+        return new
+
+    def __contains__(self, key):
+        array = self.array
+        return all(array[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def size_bytes(self):
+        return len(self.array)
+
+
+def _drop_keys(conn, db_path):
+    conn.close()
+    try:
+        os.remove(db_path)
+    except OSError:
+        pass
+
+
+class SeenSet:
+    def __init__(self, capacity, error_rate=BLOOM_ERROR_RATE):
+        """
+        A set of strings in a fixed memory budget: a Bloom filter in memory,
+        backed by the exact keys in a temporary SQLite file.
+
+        Args:
+            capacity (int): Keys expected (at least MIN_CAPACITY is allocated)
+            error_rate (float): Bloom filter false-positive rate at capacity
+        """
+        self.bloom = BloomFilter(max(capacity, MIN_CAPACITY), error_rate)
+        handle, self.db_path = tempfile.mkstemp(prefix="whentai-seen-", suffix=".db")
+        os.close(handle)
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=OFF")
+        self.conn.execute("PRAGMA synchronous=OFF")
+        self.conn.execute("CREATE TABLE keys (key TEXT PRIMARY KEY) WITHOUT ROWID")
+        self.buffer = set()
+        self.size = 0
+        self.disk_checks = 0
+        self.false_positives = 0
+        # Removes the file once the set is closed, garbage collected or at exit
+        self._finalizer = weakref.finalize(self, _drop_keys, self.conn, self.db_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def flush(self):
+        """Write buffered keys to disk"""
+        if self.buffer:
+            with self.conn:
+                self.conn.executemany("INSERT OR IGNORE INTO keys (key) VALUES (?)",
+                                      ((key,) for key in self.buffer))
+            self.buffer = set()
+
+    def _on_disk(self, key):
+        self.disk_checks += 1
+        if key in self.buffer:
+            return True
+        found = self.conn.execute("SELECT 1 FROM keys WHERE key = ?", (key,)).fetchone() is not None
+        if not found:
+            self.false_positives += 1
+        return found
+
+    def __contains__(self, key):
+        return key in self.bloom and self._on_disk(key)
+
+    def add(self, key):
+        if not self.bloom.add(key) and self._on_disk(key):
+            return
+        self.buffer.add(key)
+        self.size += 1
+        if len(self.buffer) >= FLUSH_EVERY:
+            self.flush()
+
+    def __len__(self):
+        return self.size
+
+    def close(self):
+        """Drop the on-disk keys"""
+        self._finalizer()
+        self.conn = None
+
+
+def seen_set(capacity):
+    """A plain set, or a SeenSet for `capacity` keys with WHENTAI_SEEN_SET=bloom"""
+    if SEEN_SET == "bloom":
+        return SeenSet(capacity)
+    return set()
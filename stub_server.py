@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Local stub of the listing site for testing the fetch layer without network
+
+Serves sample_page.html as every listing page (?page=1..PAGES, then an empty
+listing), and can misbehave like a real origin under load:
+
+  - capacity: requests per second it accepts; above that it answers
+    429 with a Retry-After header
+  - error_rate: share of requests answered with a random 503
+
+Listing pages carry ETag/Last-Modified validators and are answered with an
+empty 304 when the request's If-None-Match/If-Modified-Since still match.
+The first `fresh_pages` pages of every listing change on each request, like
+the newest videos on the real site.
+
+/heavy serves the listing with the weight of a real page for browser
+rendering tests: images, web fonts, a video and a third-party analytics
+script (from localhost instead of 127.0.0.1), all under /asset/ and each
+answered after `asset_delay` seconds.
+
+    python stub_server.py [port] [capacity] [error_rate]
+    curl http://127.0.0.1:8765/category/hentai?page=2
+    curl http://127.0.0.1:8765/stats
+
+Used by the benchmark_*.py scripts; start_stub_server() runs it in a thread.
+"""
+
+import hashlib
+import json
+import random
+import sys
+import threading
+import time
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# === CONFIG ===
+SAMPLE_PAGE = "sample_page.html"
+DEFAULT_PORT = 8765
+PAGES = 5             # listing pages with videos per path
+RETRY_AFTER = 1       # seconds sent with 429 responses
+RESPONSE_DELAY = 0.0  # simulated server time per request
+EMPTY_PAGE = b"<html><body><div class='videos'></div></body></html>"
+HEAVY_IMAGES = 40     # extra images on /heavy
+HEAVY_FONTS = 4
+ASSET_DELAY = 0.0     # simulated time to serve each /asset/ request
+ASSET_TYPES = {".jpg": "image/jpeg", ".woff2": "font/woff2", ".mp4": "video/mp4",
+               ".js": "application/javascript"}
+
+
+class StubState:
+    def __init__(self, capacity=None, error_rate=0.0, pages=PAGES, retry_after=RETRY_AFTER,
+                 response_delay=RESPONSE_DELAY, validators=True, fresh_pages=0, asset_delay=ASSET_DELAY,
+                 page=None):
+        """
+        Behaviour and counters of the stub server.
+
+        Args:
+            capacity (float): Requests per second accepted before answering 429 (None = unlimited)
+            error_rate (float): Probability of a random 503
+            pages (int): Listing pages served per path before an empty page
+            retry_after (int): Retry-After seconds sent with 429
+            response_delay (float): Seconds to wait before answering
+            validators (bool): Send ETag/Last-Modified and answer 304 when they match
+            fresh_pages (int): Leading pages of each listing that change on every request
+            asset_delay (float): Seconds to wait before answering an /asset/ request
+            page (bytes): Listing page to serve instead of sample_page.html
+        """
+        if page is None:
+            with open(SAMPLE_PAGE, 'rb') as f:
+                page = f.read()
+        self.page = page
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.pages = pages
+        self.retry_after = retry_after
+        self.response_delay = response_delay
+        self.validators = validators
+        self.fresh_pages = fresh_pages
+        self.asset_delay = asset_delay
+        self.etag = '"%s"' % hashlib.sha1(self.page).hexdigest()[:16]
+        self.last_modified = int(time.time())
+        self.counts = {"requests": 0, "ok": 0, "throttled": 0, "errors": 0, "not_modified": 0,
+                       "bytes": 0, "assets": 0}
+        self.lock = threading.Lock()
+        # Server-side token bucket enforcing the capacity
+        self.tokens = float(capacity or 0)
+        self.updated = time.monotonic()
+
+    def admit(self):
+        """Return True if a request fits in the current capacity"""
+        if not self.capacity:
+            return True
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.capacity)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+    def count(self, key, size=0):
+        with self.lock:
+            self.counts["requests"] += 1
+            self.counts[key] += 1
+            self.counts["bytes"] += size
+
+    def validators_for(self, page):
+        """Return (etag, last_modified timestamp) of a listing page"""
+        if page <= self.fresh_pages:
+            with self.lock:
+                version = self.counts["requests"]
+            return '"fresh-%d"' % version, time.time()
+        return self.etag, self.last_modified
+
+    def heavy_page(self, port):
+        """The listing plus images, fonts, a video and a third-party script"""
+        fonts = "".join(
+            f"@font-face{{font-family:f{i};src:url(/asset/font-{i}.woff2)}} .f{i}{{font-family:f{i}}}"
+            for i in range(HEAVY_FONTS)
+        )
+        assets = "".join(
+            [f"<style>{fonts}</style>"]
+            + [f"<p class='f{i}'>text</p>" for i in range(HEAVY_FONTS)]
+            + [f"<img src='/asset/img-{i}.jpg'>" for i in range(HEAVY_IMAGES)]
+            + ["<video src='/asset/clip.mp4' autoplay muted></video>",
+               f"<script src='http://localhost:{port}/asset/analytics.js'></script>"]
+        )
+        return self.page.replace(b"</body>", assets.encode() + b"</body>", 1)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_body(self, status, body, content_type="text/html; charset=utf-8", headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def do_GET(self):
+        state = self.server.state
+        parsed = urlparse(self.path)
+        if parsed.path == "/stats":
+            self.send_body(200, json.dumps(state.counts).encode(), "application/json")
+            return
+        if parsed.path.startswith("/asset/"):
+            if state.asset_delay:
+                time.sleep(state.asset_delay)
+            state.count("assets")
+            extension = parsed.path[parsed.path.rfind("."):]
+            self.send_body(200, b"\0" * 2048, ASSET_TYPES.get(extension, "application/octet-stream"))
+            return
+        if parsed.path == "/heavy":
+            body = state.heavy_page(self.server.server_address[1])
+            state.count("ok", len(body))
+            self.send_body(200, body)
+            return
+        if state.response_delay:
+            time.sleep(state.response_delay)
+        if not state.admit():
+            state.count("throttled")
+            self.send_body(429, b"Too Many Requests", "text/plain",
+                           {"Retry-After": str(state.retry_after)})
+            return
+        if state.error_rate and random.random() < state.error_rate:
+            state.count("errors")
+            self.send_body(503, b"Service Unavailable", "text/plain")
+            return
+        page = int(parse_qs(parsed.query).get("page", ["1"])[0] or 1)
+        body = state.page if page <= state.pages else EMPTY_PAGE
+        headers = {}
+        if state.validators:
+            etag, modified = state.validators_for(page)
+            if body is EMPTY_PAGE:
+                etag = '"empty"'
+            headers = {"ETag": etag, "Last-Modified": formatdate(modified, usegmt=True)}
+            if self.not_modified(etag, modified):
+                state.count("not_modified")
+                self.send_response(304)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                return
+        state.count("ok", len(body))
+        self.send_body(200, body, headers=headers)
+
+    def not_modified(self, etag, modified):
+        """True if the request's validators still match (If-None-Match wins, as in RFC 9110)"""
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match:
+            return etag in [tag.strip() for tag in if_none_match.split(",")]
+        if_modified_since = self.headers.get("If-Modified-Since")
+        if if_modified_since:
+            try:
+                return int(modified) <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    do_HEAD = do_GET
+
+
+def start_stub_server(port=0, **options):
+    """
+    Start the stub server on a background thread.
+
+    Returns:
+        ThreadingHTTPServer: with .state (StubState) and .base_url set;
+        call .shutdown() when done
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), StubHandler)
+    server.daemon_threads = True
+    server.state = StubState(**options)
+    server.base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def main(argv):
+    port = int(argv[1]) if len(argv) > 1 else DEFAULT_PORT
+    capacity = float(argv[2]) if len(argv) > 2 else None
+    error_rate = float(argv[3]) if len(argv) > 3 else 0.0
+    server = ThreadingHTTPServer(("127.0.0.1", port), StubHandler)
+    server.state = StubState(capacity=capacity, error_rate=error_rate)
+    print(f"Stub server on http://127.0.0.1:{port} (capacity: {capacity or 'unlimited'} req/s, "
+          f"503 rate: {error_rate:.0%})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\nServed: {server.state.counts}")
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -1,20 +1,44 @@
 #!/usr/bin/env python3
 """
 Test script for the WHentai scrapers
+
+The scrapers hit the live site; to run them offline, replay a recorded
+cassette (cassette.py), which the scraper subprocesses pick up from the
+environment (a relative cassette path is taken from this directory):
+
+    WHENTAI_CASSETTE=run.cassette WHENTAI_CASSETTE_MODE=record WHENTAI_FETCH_MODE=http python test_scraper.py
+    WHENTAI_CASSETTE=run.cassette WHENTAI_CASSETTE_MODE=replay WHENTAI_FETCH_MODE=http python test_scraper.py
+
+test_cassette_replay runs the enhanced scraper offline against
+TEST_CASSETTE, a few listing pages recorded from stub_server.py. Record it
+again after changing the stub or the sample page:
+
+    python test_scraper.py record
 """
 
+import os
+import shutil
 import subprocess
 import sys
 import json
+import tempfile
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+TEST_CASSETTE = os.path.join(SCRIPT_DIR, "test_scraper.cassette")
+TEST_CARDS = 4  # cards of sample_page.html on the recorded listing pages
+TEST_BASE = "http://127.0.0.1:8765"  # stub_server.DEFAULT_PORT, part of every recorded URL
+
+def run_script(script, timeout):
+    """Run a scraper in an empty temporary directory, so its videos.json and crawl state stay out of the repo"""
+    with tempfile.TemporaryDirectory(prefix="whentai-test-") as state:
+        return subprocess.run([sys.executable, os.path.join(SCRIPT_DIR, script)],
+                              cwd=state, capture_output=True, text=True, timeout=timeout)
 
 def test_basic_scraper():
     """Test the basic cartoon scraper"""
     print("Testing basic cartoon scraper...")
     try:
-        result = subprocess.run([
-            sys.executable, 
-            'cartoon_scraper.py'
-        ], capture_output=True, text=True, timeout=60)
+        result = run_script('cartoon_scraper.py', timeout=60)
         
         if result.returncode == 0:
             print("✓ Basic scraper test passed")
@@ -34,10 +58,7 @@ def test_enhanced_scraper():
     """Test the enhanced scraper"""
     print("Testing enhanced scraper...")
     try:
-        result = subprocess.run([
-            sys.executable, 
-            'enhanced_scraper.py'
-        ], capture_output=True, text=True, timeout=120)
+        result = run_script('enhanced_scraper.py', timeout=120)
         
         if result.returncode == 0:
             print("✓ Enhanced scraper test passed")
@@ -57,10 +78,7 @@ def test_automated_scraper():
     """Test the automated scraper"""
     print("Testing automated scraper...")
     try:
-        result = subprocess.run([
-            sys.executable, 
-            'automated_scraper.py'
-        ], capture_output=True, text=True, timeout=180)
+        result = run_script('automated_scraper.py', timeout=180)
         
         if result.returncode == 0:
             print("✓ Automated scraper test passed")
@@ -80,7 +98,7 @@ def check_videos_file():
     """Check if videos.json file exists and is valid"""
     print("Checking videos.json file...")
     try:
-        with open('videos.json', 'r', encoding='utf-8') as f:
+        with open(os.path.join(SCRIPT_DIR, 'videos.json'), 'r', encoding='utf-8') as f:
             videos = json.load(f)
         
         print(f"✓ Found {len(videos)} videos in videos.json")
@@ -110,11 +128,86 @@ def check_videos_file():
         print(f"✗ Error checking videos.json: {e}")
         return False
 
+def run_enhanced_scraper(mode):
+    """Run enhanced_scraper.scrape() on TEST_BASE through TEST_CASSETTE in a temporary directory"""
+    import cassette
+    import enhanced_scraper
+
+    cwd = os.getcwd()
+    state = tempfile.mkdtemp(prefix="whentai-test-")
+    original_base = enhanced_scraper.BASE
+    try:
+        os.chdir(state)
+        enhanced_scraper.BASE = TEST_BASE
+        tape = cassette.use_cassette(TEST_CASSETTE, mode)
+        videos = enhanced_scraper.scrape(max_pages=2)
+        return videos, tape.misses
+    finally:
+        cassette.use_cassette(None)
+        enhanced_scraper.BASE = original_base
+        os.chdir(cwd)
+        shutil.rmtree(state, ignore_errors=True)
+
+def record_test_cassette():
+    """Record TEST_CASSETTE from stub_server.py serving the first TEST_CARDS cards of sample_page.html"""
+    from bs4 import BeautifulSoup
+    import rate_limiter
+    from stub_server import DEFAULT_PORT, SAMPLE_PAGE, start_stub_server
+
+    with open(os.path.join(SCRIPT_DIR, SAMPLE_PAGE), 'r', encoding='utf-8') as f:
+        soup = BeautifulSoup(f.read(), 'html.parser')
+    cards = "\n".join(str(card) for card in soup.select("div.card.sub.group")[:TEST_CARDS])
+    page = f"<html><body>{cards}</body></html>".encode('utf-8')
+    if os.path.exists(TEST_CASSETTE):
+        os.remove(TEST_CASSETTE)
+    server = start_stub_server(port=DEFAULT_PORT, pages=1, page=page, response_delay=0)
+    rate_limiter.configure_host(server.base_url, 500.0, burst=50)
+    try:
+        videos, _ = run_enhanced_scraper("record")
+    finally:
+        server.shutdown()
+    print(f"Recorded {TEST_CASSETTE}: {len(videos)} videos")
+    for video in videos:
+        print(f"    ({video['title']!r}, {video['external_url']!r}),")
+    return bool(videos)
+
+# Videos the enhanced scraper finds on the recorded pages, in order
+EXPECTED_CASSETTE_VIDEOS = [
+    ('Mystery Machine Apocalypse: Daphne & Velma vs. the Army of Monsters ( Scooby-Doo Parody )',
+     'https://www.hentaigem.com/videos/100109/mystery-machine-apocalypse-daphne-velma-vs-the-army-of-monsters-scooby-doo-parody/?utm_source=pbweb'),
+    ('Stepmom enjoying step son', 'https://xh.partners/x/xhEilVJ?pw='),
+    ('The Beautiful Wonders of Magic... The Last Ingredient - New Hentai Sex Parody', 'https://xh.partners/x/xhB7EBd?pw='),
+    ("Sex-Crazed Raw Toon Chaos - Matty's Massive Boobs & Large Ramrod Dominate the Screen in 4K ULTRA HD",
+     'https://www.sortporn.com/videos/788271/sex-crazed-raw-toon-chaos-matty-s-massive-boobs-large-ramrod-dominate-the-screen-in-4k-ultra-hd/?utm_source=donnie'),
+]
+
+def check_cassette_replay():
+    """Replay the enhanced scraper offline from TEST_CASSETTE"""
+    print("Testing enhanced scraper against a recorded cassette...")
+    try:
+        videos, misses = run_enhanced_scraper("replay")
+        found = [(video['title'], video['external_url']) for video in videos]
+        if found == EXPECTED_CASSETTE_VIDEOS and not misses:
+            print(f"✓ Cassette replay test passed ({len(found)} videos)")
+            return True
+        print(f"✗ Cassette replay test failed: {len(found)} videos, {misses} requests not recorded")
+        for video in found:
+            print(f"    {video}")
+        return False
+    except Exception as e:
+        print(f"✗ Cassette replay test error: {e}")
+        return False
+
+def test_cassette_replay():
+    """The offline replay, as a pytest test"""
+    assert check_cassette_replay()
+
 def main():
     """Run all tests"""
     print("=== WHentai Scraper Test Suite ===\n")
     
     tests = [
+        check_cassette_replay,
         check_videos_file,
         test_basic_scraper,
         test_enhanced_scraper,
@@ -139,5 +232,8 @@ def main():
         return False
 
 if __name__ == "__main__":
-    success = main()
+    if sys.argv[1:] == ["record"]:
+        success = record_test_cassette()
+    else:
+        success = main()
     sys.exit(0 if success else 1)
\ No newline at end of file
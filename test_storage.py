@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Test script for the WHentai video storage modes
+
+Runs offline in a temporary directory, once per storage mode (json, jsonl,
+sqlite), so the live videos.json is never touched:
+
+    python test_storage.py
+"""
+
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+import types
+
+import catalog
+
+
+class StorageDir:
+    """Run a test in an empty temporary directory with a storage mode"""
+
+    def __init__(self, mode):
+        self.mode = mode
+
+    def __enter__(self):
+        self.cwd = os.getcwd()
+        self.saved_mode = catalog.STORAGE_MODE
+        self.path = tempfile.mkdtemp(prefix="whentai-storage-")
+        os.chdir(self.path)
+        catalog.STORAGE_MODE = self.mode
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        catalog.STORAGE_MODE = self.saved_mode
+        os.chdir(self.cwd)
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+def sample_video(title, token):
+    """A listing card as parse_video_cards returns it, with a per-listing /out/ token"""
+    return {
+        'title': title,
+        'detail_url': f"https://hentai.tv/out/?l={token}",
+        'thumbnail': f"https://hentai.tv/thumbs/{title.lower().replace(' ', '-')}.jpg",
+        'scraped_at': "2024-01-01T00:00:00",
+    }
+
+
+def test_jsonl_rescrape_is_not_appended():
+    """A video listed again under a new /out/ token is not appended to the log twice"""
+    from mega_scraper import store_new_videos
+    from video_log import VideoLog
+    with StorageDir("jsonl"):
+        added, total = store_new_videos([sample_video("Sample Episode 1", "aaa")], [])
+        assert (added, total) == (1, 1)
+        existing = VideoLog().load()
+        added, total = store_new_videos([sample_video("Sample Episode 1", "bbb")], existing)
+        assert (added, total) == (0, 1)
+        assert len(VideoLog().load()) == 1
+
+
+def test_json_save_error_is_raised():
+    """A videos.json that cannot be written is reported, so the crawl frontier is kept"""
+    from mega_scraper import store_new_videos
+    with StorageDir("json"):
+        os.mkdir("videos.json")  # open() for writing fails on a directory
+        try:
+            store_new_videos([sample_video("Sample Episode 1", "aaa")], [])
+        except OSError:
+            pass
+        else:
+            raise AssertionError("store_new_videos did not report the failed save")
+
+
+def check_video_store(mode):
+    """Add, tag and save through pipeline.VideoStore, then load the saved videos again"""
+    from pipeline import VideoStore
+    with StorageDir(mode):
+        with VideoStore() as store:
+            added = store.add([
+                sample_video("Sample Episode 1", "aaa"),
+                sample_video("sample episode 1 ", "bbb"),  # same title, another listing
+                sample_video("Uncensored Sample 2", "ccc"),
+            ])
+            assert [video['title'] for video in added] == ["Sample Episode 1", "Uncensored Sample 2"]
+            store.tag()
+            assert all('categories' in video for video in added)
+            store.save()
+            store.save()  # nothing new since the last save: no duplicates
+            assert len(store) == 2 and store.added == 2
+        with VideoStore() as store:
+            assert len(store) == 2
+            assert store.contains(sample_video("Uncensored Sample 2", "ddd"))
+            assert not store.contains(sample_video("Sample Episode 3", "eee"))
+            store.add([sample_video("Sample Episode 3", "eee")])
+            store.tag()
+            store.save()
+        with VideoStore() as store:
+            assert len(store) == 3
+
+
+def test_video_store_json():
+    check_video_store("json")
+
+
+def test_video_store_jsonl():
+    check_video_store("jsonl")
+
+
+def test_video_store_sqlite():
+    check_video_store("sqlite")
+
+
+def test_pipeline_saves_passes_until_deadline():
+    """Every finished pass is saved, and no pass starts after the deadline"""
+    import pipeline
+    calls = []
+
+    def scrape(is_known, **options):
+        if calls:
+            # The previous pass is already on disk
+            with open("videos.json", encoding="utf-8") as f:
+                assert len(json.load(f)) == len(calls)
+        calls.append(options)
+        time.sleep(0.3)
+        return [sample_video(f"Sample Episode {len(calls)}", str(len(calls)))]
+
+    sys.modules["fake_scraper"] = types.ModuleType("fake_scraper")
+    sys.modules["fake_scraper"].scrape = scrape
+    pipeline.STAGES["fake"] = ("Fake Scraper", "fake_scraper")
+    try:
+        with StorageDir("json"):
+            summary = pipeline.run_pipeline(["fake"], passes=5, deadline=0.5)
+            assert summary["added_per_pass"] == [1, 1]
+            with open("videos.json", encoding="utf-8") as f:
+                assert len(json.load(f)) == 2
+    finally:
+        del pipeline.STAGES["fake"]
+        del sys.modules["fake_scraper"]
+
+
+def _append_titles(prefix, count):
+    from video_log import VideoLog
+    log = VideoLog()
+    for i in range(count):
+        log.append([sample_video(f"{prefix} {i}", f"{prefix}-{i}")])
+
+
+def test_jsonl_appends_survive_compaction():
+    """Appends from other processes while segments are compacted are never lost"""
+    import video_log
+    with StorageDir("jsonl"):
+        saved_max = video_log.SEGMENT_MAX_BYTES
+        video_log.SEGMENT_MAX_BYTES = 512  # roll segments often
+        try:
+            context = multiprocessing.get_context("spawn")
+            writers = [context.Process(target=_append_titles, args=(f"Writer {n}", 100)) for n in range(2)]
+            for writer in writers:
+                writer.start()
+            log = video_log.VideoLog()
+            while any(writer.is_alive() for writer in writers):
+                log.compact()
+            for writer in writers:
+                writer.join()
+            assert all(writer.exitcode == 0 for writer in writers)
+            log.compact()
+            assert len(log.load()) == 200
+        finally:
+            video_log.SEGMENT_MAX_BYTES = saved_max
+
+
+def test_jsonl_compaction_takes_over_stale_lock():
+    """A compaction lock left by a killed compaction does not block compaction forever"""
+    import video_log
+    with StorageDir("jsonl"):
+        log = video_log.VideoLog()
+        log.append([sample_video("Sample Episode 1", "aaa")])
+        # Held by a running process: compaction waits for it
+        with open(log.lock_path, 'w') as f:
+            f.write(str(os.getpid()))
+        assert log.compact() == -1
+        # Held by a process that is gone
+        context = multiprocessing.get_context("spawn")
+        finished = context.Process(target=time.sleep, args=(0,))
+        finished.start()
+        finished.join()
+        with open(log.lock_path, 'w') as f:
+            f.write(str(finished.pid))
+        assert log.compact() == 1
+        assert not os.path.exists(log.lock_path)
+        # Without a process id, once it is older than COMPACT_LOCK_STALE
+        open(log.lock_path, 'w').close()
+        assert log.compact() == -1
+        old = time.time() - video_log.COMPACT_LOCK_STALE - 60
+        os.utime(log.lock_path, (old, old))
+        assert log.compact() == 1
+        assert not os.path.exists(log.lock_path)
+
+
+TESTS = [
+    test_jsonl_rescrape_is_not_appended,
+    test_jsonl_appends_survive_compaction,
+    test_jsonl_compaction_takes_over_stale_lock,
+    test_json_save_error_is_raised,
+    test_video_store_json,
+    test_video_store_jsonl,
+    test_video_store_sqlite,
+    test_pipeline_saves_passes_until_deadline,
+]
+
+
+def main():
+    """Run all tests"""
+    print("=== WHentai Storage Test Suite ===\n")
+    passed = 0
+    for test in TESTS:
+        try:
+            test()
+            print(f"✓ {test.__name__}")
+            passed += 1
+        except Exception as e:
+            print(f"✗ {test.__name__}: {e!r}")
+    print(f"\n=== Test Results: {passed}/{len(TESTS)} tests passed ===")
+    return passed == len(TESTS)
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
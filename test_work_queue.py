@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Test script for the shared work queue of distributed crawls
+
+Runs offline against a queue database in a temporary directory, with one
+WorkQueue per simulated worker:
+
+    python test_work_queue.py
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+import work_queue
+from work_queue import Task, WorkQueue
+
+START_URLS = ["https://hentai.tv/category/a", "https://hentai.tv/category/b"]
+
+
+class QueueDir:
+    """Run a test against a queue database in an empty temporary directory"""
+
+    def __enter__(self):
+        self.path = tempfile.mkdtemp(prefix="whentai-queue-")
+        self.db_path = os.path.join(self.path, "work_queue.db")
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def queue(self, worker, lease_seconds=work_queue.LEASE_SECONDS):
+        """Open the test crawl's queue as a named worker"""
+        return WorkQueue("test", db_path=self.db_path, worker=worker, lease_seconds=lease_seconds)
+
+
+def test_expired_lease_is_leased_again():
+    """A page whose worker stopped heartbeating goes to the next worker"""
+    with QueueDir() as queues:
+        with queues.queue("a", lease_seconds=0.1) as a, queues.queue("b") as b:
+            assert a.seed(START_URLS, 5) == 2
+            assert [task.url for task in a.lease(limit=2)] == START_URLS
+            assert b.lease() == []  # both leases are still running
+            time.sleep(0.2)
+            assert [task.url for task in b.lease()] == START_URLS[:1]
+            assert a.counts()[work_queue.LEASED] == 2
+
+
+def test_heartbeat_keeps_lease():
+    """A heartbeat extends the worker's leases, so nobody else gets its pages"""
+    with QueueDir() as queues:
+        with queues.queue("a", lease_seconds=0.3) as a, queues.queue("b") as b:
+            a.seed(START_URLS[:1], 5)
+            assert len(a.lease()) == 1
+            time.sleep(0.2)
+            a.heartbeat()
+            time.sleep(0.2)
+            assert b.lease() == []
+            assert [worker for worker, _, _ in b.workers()] == ["a"]
+
+
+def test_late_complete_is_a_noop():
+    """The worker that lost its lease cannot overwrite the page or queue pages after it"""
+    with QueueDir() as queues:
+        with queues.queue("a", lease_seconds=0.1) as a, queues.queue("b") as b:
+            a.seed(START_URLS[:1], 5)
+            late_task = a.lease()[0]
+            time.sleep(0.2)
+            task = b.lease()[0]
+            next_task = Task(START_URLS[0] + "?page=2", task.source, task.position, 2)
+            assert b.complete(task, [{"title": "From b"}], [next_task])
+            assert not a.complete(late_task, [{"title": "From a"}],
+                                  [Task(START_URLS[0] + "?page=3", task.source, task.position, 3)])
+            assert (a.pages_done, b.pages_done) == (0, 1)
+            assert list(a.results()) == [(START_URLS[0], 1, [{"title": "From b"}])]
+            assert [queued.url for queued in a.lease(limit=5)] == [next_task.url]
+
+
+def test_pages_fail_after_max_attempts():
+    """A page released MAX_ATTEMPTS times is failed instead of leased forever"""
+    with QueueDir() as queues:
+        with queues.queue("a") as a:
+            a.seed(START_URLS[:1], 5)
+            for _ in range(work_queue.MAX_ATTEMPTS):
+                a.release(a.lease()[0])
+            assert a.lease() == []
+            assert a.counts()[work_queue.FAILED] == 1
+            assert a.finished()
+
+
+def test_claim_merge_succeeds_once():
+    """Of many workers claiming the merge at once, exactly one gets it"""
+    with QueueDir() as queues:
+        with queues.queue("seed") as seeder:
+            seeder.seed(START_URLS, 5)
+        claimers = [queues.queue(f"merger {n}") for n in range(8)]
+        claims = []
+        threads = [threading.Thread(target=lambda queue=queue: claims.append(queue.claim_merge()))
+                   for queue in claimers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert sorted(claims) == [False] * 7 + [True]
+        assert claimers[0].status() == work_queue.MERGED
+        assert not claimers[0].claim_merge()
+        claimers[0].reopen()  # a failed merge can be claimed again
+        assert claimers[1].claim_merge()
+        for queue in claimers:
+            queue.close()
+
+
+def test_reads_while_heartbeating():
+    """Reads share the connection with the heartbeat thread without errors"""
+    with QueueDir() as queues:
+        with queues.queue("a") as a:
+            a.seed(START_URLS, 5)
+            for task in a.lease(limit=2):
+                a.complete(task, [{"title": task.url}] * 50)
+            a.start_heartbeat(interval=0.001)
+            for _ in range(200):
+                assert a.max_pages() == 5 and a.status() == work_queue.RUNNING
+                assert len(list(a.results())) == 2
+                assert [worker for worker, _, _ in a.workers()] == ["a"]
+
+
+TESTS = [
+    test_expired_lease_is_leased_again,
+    test_heartbeat_keeps_lease,
+    test_late_complete_is_a_noop,
+    test_pages_fail_after_max_attempts,
+    test_claim_merge_succeeds_once,
+    test_reads_while_heartbeating,
+]
+
+
+def main():
+    """Run all tests"""
+    print("=== WHentai Work Queue Test Suite ===\n")
+    passed = 0
+    for test in TESTS:
+        try:
+            test()
+            print(f"✓ {test.__name__}")
+            passed += 1
+        except Exception as e:
+            print(f"✗ {test.__name__}: {e!r}")
+    print(f"\n=== Test Results: {passed}/{len(TESTS)} tests passed ===")
+    return passed == len(TESTS)
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -5,14 +5,15 @@ Purpose: Extract original video links and thumbnails for display on our website
 Outputs: videos.json (list of objects with title, thumbnail, detail_url, external_url)
 """
 
-import requests
-from bs4 import BeautifulSoup
 import json
-import time
-import random
 import re
 from urllib.parse import urljoin, urlparse
 
+import html_parser
+import http_client
+from extraction_spec import VIDEO_CARDS
+from out_token import external_url_from_detail_url
+
 # === CONFIG ===
 BASE_URL = "https://www.cartoonpornvideos.com"
 CATEGORY_PATH = "/categories"  # Main categories page
@@ -21,13 +22,9 @@ HEADERS = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
     "Accept-Language": "en-US,en;q=0.9"
 }
-REQUEST_DELAY = (1, 2)  # Delay between requests to be respectful
 TIMEOUT = 15
 MAX_VIDEOS = 5000  # Limit for testing
-
-def quiet_sleep():
-    """Sleep for a random amount of time to be respectful to the server"""
-    time.sleep(random.uniform(*REQUEST_DELAY))
+MAX_DETAIL_FETCHES = 100  # Detail pages fetched when a token cannot be decoded
 
 def make_absolute(href, base=BASE_URL):
     """Convert relative URLs to absolute URLs"""
@@ -47,7 +44,7 @@ def is_external_link(href):
 def fetch_html(url):
     """Fetch HTML content from a URL"""
     try:
-        resp = requests.get(url, headers=HEADERS, timeout=TIMEOUT)
+        resp = http_client.get(url, headers=HEADERS, timeout=TIMEOUT)
         resp.raise_for_status()
         return resp.text
     except Exception as e:
@@ -61,59 +58,17 @@ def extract_video_links_from_category(category_url):
     if not html:
         return []
     
-    soup = BeautifulSoup(html, "html.parser")
     videos = []
-    
-    # Find video items - look for containers with video links
-    video_containers = soup.select("div.item, div.video-item, div.thumb, div.video")
-    
-    for container in video_containers:
-        # Try to find the video link and thumbnail
-        link_elem = container.find("a")
-        if not link_elem:
-            continue
-            
-        if link_elem:
-            detail_url = getattr(link_elem, 'get', lambda x, default='': default)("href", "") if hasattr(link_elem, 'get') else ""
-        else:
-            detail_url = ""
-        if not detail_url:
+    for card in VIDEO_CARDS.extract(html):
+        if not (card["title"] and card["detail_url"]):
             continue
-            
-        # Make absolute URL
-        detail_url = make_absolute(detail_url)
-        
-        # Find thumbnail
-        thumbnail = ""
-        img_elem = container.find("img")
-        if img_elem:
-            thumbnail = getattr(img_elem, 'get', lambda x, default='': default)("src", "") if hasattr(img_elem, 'get') else ""
-            if not thumbnail:
-                thumbnail = getattr(img_elem, 'get', lambda x, default='': default)("data-src", "") if hasattr(img_elem, 'get') else ""
-            thumbnail = make_absolute(thumbnail, detail_url)
-        
-        # Find title
-        title = ""
-        img_elem = container.find("img")
-        if img_elem and hasattr(img_elem, 'get'):
-            alt_text = getattr(img_elem, 'get', lambda x, default='': default)("alt", "")
-            if alt_text and isinstance(alt_text, str):
-                title = alt_text.strip()
-        else:
-            # Try to get title from link text or nearby elements
-            title_elem = container.find("h3") or container.find("h2") or container.find("p")
-            if title_elem:
-                title = title_elem.get_text().strip()
-            else:
-                title = link_elem.get_text().strip()
-        
-        if title and detail_url:
-            videos.append({
-                "title": title,
-                "thumbnail": thumbnail,
-                "detail_url": detail_url,
-                "external_url": ""  # Will be filled later
-            })
+        detail_url = make_absolute(card["detail_url"])
+        videos.append({
+            "title": card["title"],
+            "thumbnail": make_absolute(card["thumbnail"], detail_url),
+            "detail_url": detail_url,
+            "external_url": ""  # Will be filled later
+        })
     
     return videos
 
@@ -124,7 +79,7 @@ def extract_external_link_from_detail(detail_url):
     if not html:
         return ""
     
-    soup = BeautifulSoup(html, "html.parser")
+    soup = html_parser.make_soup(html)
     
     # Look for meta refresh redirects (common pattern)
     meta_refresh = soup.find("meta", attrs={"http-equiv": "refresh"})
@@ -190,7 +145,7 @@ def get_all_categories():
     if not html:
         return []
     
-    soup = BeautifulSoup(html, "html.parser")
+    soup = html_parser.make_soup(html)
     categories = []
     
     # Find category links
@@ -225,9 +180,6 @@ def main():
         print(f"  Found {len(videos)} videos")
         all_videos.extend(videos)
         
-        # Respectful delay
-        quiet_sleep()
-        
         # Limit total videos
         if len(all_videos) >= MAX_VIDEOS:
             break
@@ -242,13 +194,19 @@ def main():
     
     print(f"\nTotal unique videos found: {len(unique_videos)}")
     
-    # Extract external links for each video (limited for testing)
+    # Extract external links for each video: decode the /out/ token offline,
+    # fetch the detail page only when that fails (limited for testing)
     print("\nExtracting external video links...")
-    for i, video in enumerate(unique_videos[:100]):  # Limit to first 100 for testing
-        print(f"Processing video {i+1}/{len(unique_videos[:100])}")
-        external_url = extract_external_link_from_detail(video["detail_url"])
+    fetches = 0
+    for i, video in enumerate(unique_videos):
+        external_url = external_url_from_detail_url(video["detail_url"])
+        if not external_url and fetches < MAX_DETAIL_FETCHES:
+            print(f"Processing video {i+1}/{len(unique_videos)}")
+            external_url = extract_external_link_from_detail(video["detail_url"])
+            fetches += 1
         video["external_url"] = external_url
-        quiet_sleep()
+    print(f"Resolved {sum(1 for v in unique_videos if v['external_url'])} external links "
+          f"({fetches} detail pages fetched)")
     
     # Save to JSON file
     with open(OUT_FILE, "w", encoding="utf-8") as f:
@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+Append-only JSON Lines video log for WHentai
+
+File-based alternative to the SQLite catalog. New scrape results are appended
+to the newest segment file in O(batch), instead of rewriting every record in
+videos.json. A compaction step merges the base file and the sealed segments,
+dropping records superseded by a later write or a deletion.
+
+Layout on disk:
+    videos.jsonl           compacted base, one video per line
+    videos.jsonl.000001    appended segments, replayed in order on load
+    videos.jsonl.lock      held while a compaction runs, with its process id
+    videos.jsonl.append    held while a process appends or a compaction seals segments
+
+    python video_log.py compact            # merge segments into the base
+    python video_log.py export [out.json]  # write videos.json for the frontend
+    python video_log.py import [in.json]   # start a log from videos.json
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+from catalog import JSON_FILE, video_key
+
+# === CONFIG ===
+LOG_FILE = "videos.jsonl"
+SEGMENT_MAX_BYTES = 8 * 1024 * 1024  # roll to a new segment after ~8 MB
+COMPACT_MIN_SEGMENTS = 8             # compact once this many segments exist
+DELETED_FIELD = "_deleted"
+APPEND_LOCK_STALE = 30               # seconds after which an append lock file is left over from a crash
+COMPACT_LOCK_STALE = 6 * 3600        # seconds after which a compaction lock is taken over even if its process lives
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def stale_lock(path, max_age):
+    """
+    True if a lock file was left behind by a crash: the process id it holds
+    no longer runs, or it is older than max_age seconds.
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            holder = f.read().strip()
+        age = time.time() - os.path.getmtime(path)
+    except FileNotFoundError:
+        return False
+    if holder.isdigit() and not _process_alive(int(holder)):
+        return True
+    return age > max_age
+
+
+class VideoLog:
+    def __init__(self, path=LOG_FILE):
+        """
+        Open a JSON Lines video log.
+
+        Args:
+            path (str): Path of the compacted base file; segments live next to it
+        """
+        self.path = path
+        self.lock_path = path + ".lock"
+        self.append_lock_path = path + ".append"
+        self._append_lock = threading.Lock()
+
+    # --- segments ---
+    def segment_numbers(self):
+        """Sequence numbers of the segment files, oldest first"""
+        directory = os.path.dirname(self.path) or "."
+        prefix = os.path.basename(self.path) + "."
+        numbers = []
+        for name in os.listdir(directory):
+            suffix = name[len(prefix):]
+            if name.startswith(prefix) and suffix.isdigit():
+                numbers.append(int(suffix))
+        return sorted(numbers)
+
+    def segment_path(self, number):
+        return f"{self.path}.{number:06d}"
+
+    def _active_segment(self):
+        """Segment new records are appended to, rolling over when it gets large"""
+        numbers = self.segment_numbers()
+        if not numbers:
+            return self.segment_path(1)
+        current = self.segment_path(numbers[-1])
+        if os.path.exists(current) and os.path.getsize(current) >= SEGMENT_MAX_BYTES:
+            return self.segment_path(numbers[-1] + 1)
+        return current
+
+    @contextmanager
+    def _segment_lock(self):
+        """
+        Serialize appends with the sealing step of compact(), across threads
+        and processes, so no record lands in a segment that is being merged.
+        """
+        with self._append_lock:
+            while True:
+                try:
+                    lock_fd = os.open(self.append_lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                    break
+                except FileExistsError:
+                    try:
+                        if time.time() - os.path.getmtime(self.append_lock_path) > APPEND_LOCK_STALE:
+                            print(f"Removing stale {self.append_lock_path}")
+                            os.remove(self.append_lock_path)
+                    except FileNotFoundError:
+                        pass
+                    time.sleep(0.01)
+            try:
+                yield
+            finally:
+                os.close(lock_fd)
+                os.remove(self.append_lock_path)
+
+    def _compaction_lock(self):
+        """
+        Take the compaction lock file, taking over one left behind by a
+        compaction that was killed.
+
+        Returns:
+            int: File descriptor of the lock, or None if another compaction runs
+        """
+        for attempt in range(2):
+            try:
+                lock_fd = os.open(self.lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                if attempt or not stale_lock(self.lock_path, COMPACT_LOCK_STALE):
+                    return None
+                print(f"Removing stale {self.lock_path}")
+                try:
+                    os.remove(self.lock_path)
+                except FileNotFoundError:
+                    pass
+                continue
+            os.write(lock_fd, str(os.getpid()).encode())
+            return lock_fd
+        return None
+
+    # --- writes ---
+    def _append_lines(self, records):
+        lines = [json.dumps(record, ensure_ascii=False, separators=(',', ':')) + "\n" for record in records]
+        if not lines:
+            return 0
+        with self._segment_lock():
+            with open(self._active_segment(), 'a', encoding='utf-8') as f:
+                f.write("".join(lines))
+                f.flush()
+                os.fsync(f.fileno())
+        return len(lines)
+
+    def append(self, videos):
+        """
+        Append new or updated videos to the log.
+
+        Returns:
+            int: Number of records written
+        """
+        return self._append_lines(videos)
+
+    def delete(self, videos):
+        """Append deletion markers for videos"""
+        return self._append_lines({DELETED_FIELD: video_key(video)} for video in videos)
+
+    # --- reads ---
+    def _files(self, segment_numbers=None):
+        if segment_numbers is None:
+            segment_numbers = self.segment_numbers()
+        files = [self.path] if os.path.exists(self.path) else []
+        return files + [self.segment_path(n) for n in segment_numbers]
+
+    def _replay(self, files):
+        """Replay files in order; later records supersede earlier ones with the same key"""
+        videos = {}
+        for file_path in files:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                for line_number, line in enumerate(f, 1):
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A crash mid-append can leave a torn last line; skip it
+                        print(f"Skipping unreadable line {line_number} in {file_path}")
+                        continue
+                    if DELETED_FIELD in record:
+                        videos.pop(record[DELETED_FIELD], None)
+                    else:
+                        videos[video_key(record)] = record
+        return videos
+
+    def load(self):
+        """Return the current videos as a list, in first-seen order"""
+        return list(self._replay(self._files()).values())
+
+    def keys(self):
+        """Return the set of video keys currently in the log"""
+        return set(self._replay(self._files()).keys())
+
+    # --- compaction ---
+    def needs_compaction(self):
+        return len(self.segment_numbers()) >= COMPACT_MIN_SEGMENTS
+
+    def compact(self):
+        """
+        Merge the base file and all sealed segments into a new base file.
+
+        A fresh segment is started first, under the append lock, so concurrent
+        appenders in any process never write into a file that is being merged.
+
+        Returns:
+            int: Number of videos in the compacted base, or -1 if another
+            compaction is already running
+        """
+        lock_fd = self._compaction_lock()
+        if lock_fd is None:
+            print(f"Compaction already running ({self.lock_path} exists)")
+            return -1
+
+        try:
+            with self._segment_lock():
+                sealed = self.segment_numbers()
+                # Start the next segment so appends land outside the merge set
+                next_number = (sealed[-1] + 1) if sealed else 1
+                open(self.segment_path(next_number), 'a', encoding='utf-8').close()
+
+            videos = self._replay(self._files(sealed))
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                for video in videos.values():
+                    f.write(json.dumps(video, ensure_ascii=False, separators=(',', ':')) + "\n")
+            os.replace(tmp_path, self.path)
+
+            for number in sealed:
+                os.remove(self.segment_path(number))
+            print(f"Compacted {len(sealed)} segments into {self.path} ({len(videos)} videos)")
+            return len(videos)
+        finally:
+            os.close(lock_fd)
+            os.remove(self.lock_path)
+
+    def compact_in_background(self):
+        """Run compact() on a worker thread and return the thread"""
+        thread = threading.Thread(target=self.compact, name="video-log-compaction")
+        thread.start()
+        return thread
+
+    # --- JSON bridge ---
+    def import_json(self, file_path=JSON_FILE):
+        """Append every video from a videos.json file"""
+        with open(file_path, 'r', encoding='utf-8') as f:
+            videos = json.load(f)
+        return self.append(videos)
+
+    def export_json(self, file_path=JSON_FILE):
+        """Write the current videos to a JSON array file for the static frontend"""
+        videos = self.load()
+        tmp_path = file_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(videos, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, file_path)
+        return len(videos)
+
+
+def append_new_videos(new_videos, path=LOG_FILE):
+    """Append new videos to the log and start a background compaction when segments pile up"""
+    log = VideoLog(path)
+    count = log.append(new_videos)
+    print(f"Appended {count} videos to {log.path}")
+    if log.needs_compaction():
+        log.compact_in_background()
+    return count
+
+
+def main(argv):
+    """Command line entry point"""
+    if len(argv) < 2 or argv[1] not in ("compact", "export", "import"):
+        print("Usage: python video_log.py compact|export|import [videos.json]")
+        return False
+
+    log = VideoLog()
+    command = argv[1]
+    json_path = argv[2] if len(argv) > 2 else JSON_FILE
+    if command == "compact":
+        return log.compact() >= 0
+    if command == "export":
+        count = log.export_json(json_path)
+        print(f"Exported {count} videos from {log.path} to {json_path}")
+    else:
+        count = log.import_json(json_path)
+        print(f"Appended {count} videos from {json_path} to the log")
+    return True
+
+
+if __name__ == "__main__":
+    success = main(sys.argv)
+    sys.exit(0 if success else 1)
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Compact in-memory video record for WHentai
+
+A loaded videos.json is a list of dicts that each repeat the same keys, the
+same category strings and the same URL host prefixes (for example
+https://c2.ttcache.com/thumbnail/). Video stores the same data in __slots__:
+category strings are interned, URLs are split into a shared prefix id plus
+the unique remainder, and the key order of the source record is shared
+between all records with the same shape.
+
+Video behaves like a read/write mapping (get, [], in, iteration, keys, items)
+so code written against dicts keeps working, and to_dict() rebuilds the
+original record with the same keys in the same order (null fields stay null).
+
+See benchmark_memory.py for bytes-per-video before and after.
+"""
+
+import re
+import sys
+
+from json_stream import iter_videos
+
+# Splits a URL into a reusable prefix and the unique remainder, e.g.
+#   https://c2.ttcache.com/thumbnail/ + XePfBT2Yf5f/288x162/hq.19.webp
+#   https://www.cartoonpornvideos.com/out/?l= + 3AASdM4...
+URL_PREFIX_PATTERN = re.compile(r'^https?://[^/?#]+/(?:[^/?#]+/)?(?:\?[^=&#]+=)?')
+
+CORE_FIELDS = ('title', 'thumbnail', 'detail_url', 'external_url', 'categories')
+
+# Shared tables: prefix id -> prefix string, and the reverse lookup
+URL_PREFIXES = [""]
+_PREFIX_IDS = {"": 0}
+# One tuple object per distinct record shape (key order)
+_KEY_ORDERS = {}
+
+
+def _split_url(url):
+    """Return (prefix_id, remainder) for a URL, registering new prefixes; None stays None"""
+    if not url:
+        return 0, url
+    match = URL_PREFIX_PATTERN.match(url)
+    if not match:
+        return 0, url
+    prefix = match.group(0)
+    prefix_id = _PREFIX_IDS.get(prefix)
+    if prefix_id is None:
+        prefix_id = len(URL_PREFIXES)
+        URL_PREFIXES.append(sys.intern(prefix))
+        _PREFIX_IDS[prefix] = prefix_id
+    return prefix_id, url[match.end():]
+
+
+def _join_url(prefix_id, rest):
+    return rest if rest is None else URL_PREFIXES[prefix_id] + rest
+
+
+def _intern_categories(categories):
+    if categories is None:
+        return None
+    return tuple(sys.intern(c) if isinstance(c, str) else c for c in categories)
+
+
+def _shared_key_order(keys):
+    keys = tuple(keys)
+    return _KEY_ORDERS.setdefault(keys, keys)
+
+
+class Video:
+    __slots__ = (
+        'title',
+        '_thumb_prefix', '_thumb_rest',
+        '_detail_prefix', '_detail_rest',
+        '_external_prefix', '_external_rest',
+        'categories',
+        '_keys',
+        '_extra',
+    )
+
+    def __init__(self, title="", thumbnail="", detail_url="", external_url="", categories=(), **extra):
+        """
+        Create a compact video record.
+
+        Args:
+            title (str): Video title
+            thumbnail (str): Thumbnail URL
+            detail_url (str): Detail (redirect) page URL
+            external_url (str): Partner/original video URL
+            categories (iterable): Category names, stored as a tuple of interned strings
+            **extra: Any other fields (duration, views, scraped_at, ...)
+        """
+        self.title = title
+        self.thumbnail = thumbnail
+        self.detail_url = detail_url
+        self.external_url = external_url
+        self.categories = _intern_categories(categories or ())
+        self._keys = _shared_key_order(CORE_FIELDS + tuple(extra))
+        self._extra = extra or None
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Build a Video from a loaded JSON record, remembering its key order.
+
+        Missing URL fields read back as empty strings; null fields stay None.
+        """
+        video = cls.__new__(cls)
+        video.title = data.get('title', "")
+        video.thumbnail = data.get('thumbnail', "")
+        video.detail_url = data.get('detail_url', "")
+        video.external_url = data.get('external_url', "")
+        video.categories = _intern_categories(data.get('categories', ()))
+        video._keys = _shared_key_order(data.keys())
+        extra = {sys.intern(key): value for key, value in data.items() if key not in CORE_FIELDS}
+        video._extra = extra or None
+        return video
+
+    # --- URL fields are stored as (shared prefix id, remainder) ---
+    @property
+    def thumbnail(self):
+        return _join_url(self._thumb_prefix, self._thumb_rest)
+
+    @thumbnail.setter
+    def thumbnail(self, url):
+        self._thumb_prefix, self._thumb_rest = _split_url(url)
+
+    @property
+    def detail_url(self):
+        return _join_url(self._detail_prefix, self._detail_rest)
+
+    @detail_url.setter
+    def detail_url(self, url):
+        self._detail_prefix, self._detail_rest = _split_url(url)
+
+    @property
+    def external_url(self):
+        return _join_url(self._external_prefix, self._external_rest)
+
+    @external_url.setter
+    def external_url(self, url):
+        prefix_id, rest = _split_url(url)
+        # Partner links repeat heavily, so the remainder is worth interning too
+        self._external_prefix, self._external_rest = prefix_id, sys.intern(rest) if rest else rest
+
+    # --- mapping interface, so dict-based code keeps working ---
+    def __getitem__(self, key):
+        if key in CORE_FIELDS:
+            if key not in self._keys:
+                raise KeyError(key)
+            value = getattr(self, key)
+            return list(value) if key == 'categories' and value is not None else value
+        if self._extra is None:
+            raise KeyError(key)
+        return self._extra[key]
+
+    def __setitem__(self, key, value):
+        if key in CORE_FIELDS:
+            if key == 'categories':
+                value = _intern_categories(value)
+            setattr(self, key, value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+        if key not in self._keys:
+            self._keys = _shared_key_order(self._keys + (key,))
+
+    def __contains__(self, key):
+        return key in self._keys
+
+    def __iter__(self):
+        return self.keys()
+
+    def __len__(self):
+        return len(self._keys)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self):
+        return iter(self._keys)
+
+    def items(self):
+        return ((key, self[key]) for key in self._keys)
+
+    def to_dict(self):
+        """Rebuild the original record as a plain dict"""
+        return {key: self[key] for key in self._keys}
+
+    def __repr__(self):
+        return f"Video(title={self.title!r}, detail_url={self.detail_url!r})"
+
+
+def json_default(obj):
+    """json.dump default= hook that serializes Video records"""
+    if isinstance(obj, Video):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def load_compact_videos(file_path="videos.json"):
+    """Stream a videos file into a list of compact Video records"""
+    return [Video.from_dict(video) for video in iter_videos(file_path)]
@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""
+Shared work queue for crawls split across several machines
+
+One crawl of many listing sources can be spread over workers on different
+machines (and so different IPs, each with its own per-host rate limit). They
+share a SQLite database on storage every worker can reach, with one row per
+listing page:
+
+  - pending: queued, waiting for a worker
+  - leased: a worker is fetching it; the lease runs out after LEASE_SECONDS
+    unless the worker's heartbeat extends it
+  - done: fetched and parsed, with the videos stored in the row
+  - failed: given up after MAX_ATTEMPTS leases
+
+A worker that crashes stops heartbeating, so its leases expire and another
+worker picks the pages up. Leasing happens inside BEGIN IMMEDIATE, so two
+workers never get the same page. The database uses a rollback journal rather
+than WAL because WAL needs shared memory and does not work across machines.
+
+Once every page is done, the results are merged into the catalog exactly once
+(see distributed_crawl.py).
+
+    python work_queue.py           # show the state of every queued crawl
+    python work_queue.py clear     # forget all queued crawls
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+
+# === CONFIG ===
+QUEUE_DB = os.environ.get("WHENTAI_QUEUE_DB", "work_queue.db")  # on storage shared by every worker
+LEASE_SECONDS = 120        # a leased page goes back to the queue after this long without a heartbeat
+HEARTBEAT_INTERVAL = 30    # seconds between heartbeats (must be well under LEASE_SECONDS)
+MAX_ATTEMPTS = 3           # leases per page before it is marked failed
+BUSY_TIMEOUT = 30          # seconds to wait for another worker's write lock
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS crawls (
+    crawl TEXT PRIMARY KEY,
+    max_pages INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    created REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    crawl TEXT NOT NULL,
+    url TEXT NOT NULL,
+    source TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    page INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    worker TEXT,
+    lease_until REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    items TEXT,
+    updated REAL NOT NULL,
+    PRIMARY KEY (crawl, url)
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks (crawl, status, page);
+CREATE TABLE IF NOT EXISTS workers (
+    crawl TEXT NOT NULL,
+    worker TEXT NOT NULL,
+    heartbeat REAL NOT NULL,
+    pages INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (crawl, worker)
+);
+"""
+
+PENDING = "pending"
+LEASED = "leased"
+DONE = "done"
+FAILED = "failed"
+
+RUNNING = "running"
+MERGED = "merged"
+
+Task = namedtuple("Task", "url source position page")
+
+
+def worker_name():
+    """Default name of this worker: host and process id"""
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class WorkQueue:
+    def __init__(self, crawl, db_path=QUEUE_DB, worker=None, lease_seconds=LEASE_SECONDS):
+        """
+        Open the shared queue of one crawl.
+
+        Args:
+            crawl (str): Name of the crawl (e.g. "mega")
+            db_path (str): Path to the shared SQLite database file
+            worker (str): Name recorded on leases and heartbeats (host-pid by default)
+            lease_seconds (int): How long a lease lasts without a heartbeat
+        """
+        self.crawl = crawl
+        self.db_path = db_path
+        self.worker = worker or worker_name()
+        self.lease_seconds = lease_seconds
+        # Autocommit mode: transactions are opened explicitly with BEGIN IMMEDIATE
+        self.conn = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT, isolation_level=None,
+                                    check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=DELETE")
+        self.conn.executescript(SCHEMA)
+        self.lock = threading.Lock()
+        self.pages_done = 0
+        self._heartbeat = None
+        self._stop = threading.Event()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    @contextmanager
+    def _transaction(self):
+        """Write transaction holding the database lock from its first statement"""
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self.conn
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+
+    # --- coordinator ---
+    def seed(self, start_urls, max_pages):
+        """
+        Start the crawl: queue the first page of every source.
+
+        Returns:
+            int: Number of pages queued (0 when the crawl was already seeded)
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            if conn.execute("SELECT 1 FROM crawls WHERE crawl = ?", (self.crawl,)).fetchone():
+                return 0
+            conn.execute("INSERT INTO crawls (crawl, max_pages, status, created) VALUES (?, ?, ?, ?)",
+                         (self.crawl, max_pages, RUNNING, now))
+            conn.executemany(
+                "INSERT OR IGNORE INTO tasks (crawl, url, source, position, page, status, updated) "
+                "VALUES (?, ?, ?, ?, 1, ?, ?)",
+                [(self.crawl, url, url, position, PENDING, now) for position, url in enumerate(start_urls)]
+            )
+        return len(start_urls)
+
+    def max_pages(self):
+        """Pages per source the crawl was seeded with, or None if it was not seeded"""
+        with self.lock:
+            row = self.conn.execute("SELECT max_pages FROM crawls WHERE crawl = ?", (self.crawl,)).fetchone()
+        return row[0] if row else None
+
+    def status(self):
+        """Crawl status (running or merged), or None if it was not seeded"""
+        with self.lock:
+            row = self.conn.execute("SELECT status FROM crawls WHERE crawl = ?", (self.crawl,)).fetchone()
+        return row[0] if row else None
+
+    def counts(self):
+        """Number of pages per task status"""
+        counts = dict.fromkeys((PENDING, LEASED, DONE, FAILED), 0)
+        with self.lock:
+            for status, count in self.conn.execute(
+                "SELECT status, COUNT(*) FROM tasks WHERE crawl = ? GROUP BY status", (self.crawl,)
+            ).fetchall():
+                counts[status] = count
+        return counts
+
+    def finished(self):
+        """True when no page is pending or leased"""
+        counts = self.counts()
+        return counts[PENDING] == 0 and counts[LEASED] == 0
+
+    def results(self):
+        """Yield (source, page, videos) of every done page, sources in seed order"""
+        # Read every row first: the heartbeat thread writes through the same connection
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT source, page, items FROM tasks WHERE crawl = ? AND status = ? ORDER BY position, page",
+                (self.crawl, DONE)
+            ).fetchall()
+        for source, page, items in rows:
+            yield source, page, json.loads(items) if items else []
+
+    def claim_merge(self):
+        """Mark the crawl merged; True for exactly one caller"""
+        with self._transaction() as conn:
+            cursor = conn.execute("UPDATE crawls SET status = ? WHERE crawl = ? AND status = ?",
+                                  (MERGED, self.crawl, RUNNING))
+            return cursor.rowcount == 1
+
+    def reopen(self):
+        """Undo claim_merge after a merge that failed"""
+        with self._transaction() as conn:
+            conn.execute("UPDATE crawls SET status = ? WHERE crawl = ?", (RUNNING, self.crawl))
+
+    def clear(self):
+        """Forget the crawl and all of its pages"""
+        with self._transaction() as conn:
+            for table in ("tasks", "workers", "crawls"):
+                conn.execute(f"DELETE FROM {table} WHERE crawl = ?", (self.crawl,))
+
+    # --- worker ---
+    def lease(self, limit=1):
+        """
+        Take up to `limit` pages: pending ones, or leased ones whose lease ran
+        out (their worker died). Pages out of attempts are marked failed.
+
+        Returns:
+            list: Task(url, source, position, page) tuples, lowest page numbers first
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE tasks SET status = ?, worker = NULL, updated = ? "
+                "WHERE crawl = ? AND status = ? AND lease_until < ? AND attempts >= ?",
+                (FAILED, now, self.crawl, LEASED, now, MAX_ATTEMPTS)
+            )
+            rows = conn.execute(
+                "SELECT url, source, position, page FROM tasks "
+                "WHERE crawl = ? AND (status = ? OR (status = ? AND lease_until < ?)) "
+                "ORDER BY page, position LIMIT ?",
+                (self.crawl, PENDING, LEASED, now, limit)
+            ).fetchall()
+            conn.executemany(
+                "UPDATE tasks SET status = ?, worker = ?, lease_until = ?, attempts = attempts + 1, updated = ? "
+                "WHERE crawl = ? AND url = ?",
+                [(LEASED, self.worker, now + self.lease_seconds, now, self.crawl, row[0]) for row in rows]
+            )
+        return [Task(*row) for row in rows]
+
+    def complete(self, task, items, next_tasks=()):
+        """
+        Store the videos parsed from a leased page and queue the pages it led to.
+
+        A page already completed by another worker (after this worker's lease
+        ran out) keeps the first result, and the late call changes nothing.
+
+        Returns:
+            bool: True if this call completed the page
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE tasks SET status = ?, items = ?, worker = ?, lease_until = NULL, updated = ? "
+                "WHERE crawl = ? AND url = ? AND status != ?",
+                (DONE, json.dumps(items, ensure_ascii=False), self.worker, now, self.crawl, task.url, DONE)
+            )
+            if cursor.rowcount != 1:
+                return False
+            conn.executemany(
+                "INSERT OR IGNORE INTO tasks (crawl, url, source, position, page, status, updated) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(self.crawl, t.url, t.source, t.position, t.page, PENDING, now) for t in next_tasks]
+            )
+        self.pages_done += 1
+        return True
+
+    def release(self, task):
+        """Give a page back after a failed fetch; it is failed once out of attempts"""
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE tasks SET status = CASE WHEN attempts >= ? THEN ? ELSE ? END, "
+                "worker = NULL, lease_until = NULL, updated = ? "
+                "WHERE crawl = ? AND url = ? AND status = ? AND worker = ?",
+                (MAX_ATTEMPTS, FAILED, PENDING, now, self.crawl, task.url, LEASED, self.worker)
+            )
+
+    def heartbeat(self):
+        """Record that this worker is alive and extend its leases"""
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO workers (crawl, worker, heartbeat, pages) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(crawl, worker) DO UPDATE SET heartbeat = excluded.heartbeat, pages = excluded.pages",
+                (self.crawl, self.worker, now, self.pages_done)
+            )
+            conn.execute(
+                "UPDATE tasks SET lease_until = ? WHERE crawl = ? AND status = ? AND worker = ?",
+                (now + self.lease_seconds, self.crawl, LEASED, self.worker)
+            )
+
+    def start_heartbeat(self, interval=HEARTBEAT_INTERVAL):
+        """Heartbeat from a background thread until close()"""
+        def beat():
+            while not self._stop.wait(interval):
+                try:
+                    self.heartbeat()
+                except sqlite3.Error as e:
+                    print(f"Heartbeat failed: {e}")
+        self.heartbeat()
+        self._heartbeat = threading.Thread(target=beat, name="work-queue-heartbeat", daemon=True)
+        self._heartbeat.start()
+
+    def workers(self):
+        """(worker, seconds since its heartbeat, pages done) of every worker seen"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT worker, heartbeat, pages FROM workers WHERE crawl = ? ORDER BY worker", (self.crawl,)
+            ).fetchall()
+        now = time.time()
+        return [(worker, now - heartbeat, pages) for worker, heartbeat, pages in rows]
+
+    def close(self):
+        """Stop the heartbeat and close the database"""
+        self._stop.set()
+        if self._heartbeat is not None:
+            self._heartbeat.join()
+            self._heartbeat = None
+            self.heartbeat()  # final page count
+        if self.conn:
+            self.conn.close()
+            self.conn = None
+
+
+def main(argv):
+    """Show or clear the queued crawls"""
+    conn = sqlite3.connect(QUEUE_DB, timeout=BUSY_TIMEOUT)
+    conn.executescript(SCHEMA)
+    crawls = [crawl for (crawl,) in conn.execute("SELECT crawl FROM crawls ORDER BY created")]
+    conn.close()
+    if len(argv) > 1 and argv[1] == "clear":
+        for crawl in crawls:
+            with WorkQueue(crawl) as queue:
+                queue.clear()
+        print(f"Cleared {QUEUE_DB}")
+        return True
+    if not crawls:
+        print("No queued crawls")
+    for crawl in crawls:
+        with WorkQueue(crawl) as queue:
+            counts = queue.counts()
+            print(f"{crawl} ({queue.status()}, {queue.max_pages()} pages per source): "
+                  + ", ".join(f"{count} {status}" for status, count in counts.items()))
+            for worker, age, pages in queue.workers():
+                print(f"  {worker}: {pages} pages, last heartbeat {age:.0f}s ago")
+    return True
+
+
+if __name__ == "__main__":
+    success = main(sys.argv)
+    sys.exit(0 if success else 1)